@@ -21,6 +21,7 @@ class SearchRequest(BaseModel):
         max_results: Maximum number of results to return (optional)
         originalQuery: Original query before transformation (optional)
         useTransformedQuery: Flag indicating if the query is transformed (optional)
+        includeJudgements: Annotate results with recorded human judgements (optional)
     """
     query: str
     sources: List[str]
@@ -29,6 +30,7 @@ class SearchRequest(BaseModel):
     max_results: Optional[int] = Field(default=20, ge=1, le=1000)
     originalQuery: Optional[str] = None
     useTransformedQuery: Optional[bool] = False
+    includeJudgements: Optional[bool] = False
 
 
 class BoostConfig(BaseModel):
@@ -115,6 +117,7 @@ class SearchResult(BaseModel):
         boost_factors: Dictionary of applied boost factors
         _score: Internal score used for boosting
         source_id: Unique identifier for the result source (original/boosted)
+        judgement: Mean score and count of recorded human judgements (optional)
     """
     title: str
     author: List[str]
@@ -134,6 +137,7 @@ class SearchResult(BaseModel):
     boost_factors: Optional[Dict[str, float]] = None
     _score: Optional[float] = None
     source_id: Optional[str] = None
+    judgement: Optional[Dict[str, Any]] = None
 
 
 class MetricResult(BaseModel):
@@ -19,6 +19,11 @@ from ...services.scholar_service import get_scholar_direct_html, get_scholar_res
 from ...services.semantic_scholar_service import get_semantic_scholar_results, get_paper_details_by_doi
 from ...services.web_of_science_service import get_web_of_science_results
 from ...services.search_service import get_paper_details
+from ...services.citation_distributions import get_citation_distribution_table
+from ...services.quepid_service import get_judgment_store
+from ...utils.cache import get_cache_stats
+from ...utils.http import get_http_metrics
+from ...utils.scheduler import get_scheduler_metrics
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -286,4 +291,90 @@ async def get_request_headers(request: Request) -> Dict[str, Any]:
             "port": request.client.port if request.client else None
         },
         "timestamp": time.time()
-    } 
\ No newline at end of file
+    } 
+
+@router.get("/cache-stats")
+async def get_cache_statistics() -> Dict[str, Any]:
+    """
+    Show hit/miss counters and size information for the result cache.
+    
+    Returns:
+        Dict[str, Any]: Active cache backend and per-tier statistics
+    """
+    return {
+        **get_cache_stats(),
+        "timestamp": time.time()
+    }
+
+
+@router.get("/http-metrics")
+async def get_http_statistics() -> Dict[str, Any]:
+    """
+    Show retry counters and circuit breaker states for upstream sources.
+    
+    Returns:
+        Dict[str, Any]: Per-source request metrics and breaker states
+    """
+    return {
+        "sources": get_http_metrics(),
+        "timestamp": time.time()
+    }
+
+
+@router.get("/scheduler")
+async def get_scheduler_statistics() -> Dict[str, Any]:
+    """
+    Show token bucket levels and per-lane queue depths for upstream sources.
+    
+    Returns:
+        Dict[str, Any]: Per-source scheduler state
+    """
+    return {
+        "sources": get_scheduler_metrics(),
+        "timestamp": time.time()
+    }
+
+
+@router.get("/quepid-store")
+async def get_quepid_store_statistics() -> Dict[str, Any]:
+    """
+    Show lookup counters and stored cases of the Quepid judgment store.
+    
+    Returns:
+        Dict[str, Any]: Store statistics
+    """
+    return {
+        **get_judgment_store().get_stats(),
+        "timestamp": time.time()
+    }
+
+
+@router.post("/quepid-store/invalidate")
+async def invalidate_quepid_store(case_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Force stored Quepid cases to be revalidated on their next lookup.
+    
+    Args:
+        case_id: Case to invalidate (all cases if omitted)
+    
+    Returns:
+        Dict[str, Any]: Confirmation of the invalidated case(s)
+    """
+    get_judgment_store().invalidate(case_id)
+    return {"invalidated": case_id if case_id is not None else "all"}
+
+
+@router.get("/citation-distributions")
+async def get_citation_distribution_summary() -> Dict[str, Any]:
+    """
+    Show which citation distribution tables are loaded for citation boosts.
+    
+    Returns:
+        Dict[str, Any]: Collections, year range and populated distributions
+    """
+    table = get_citation_distribution_table()
+    return {
+        "loaded": table is not None,
+        **(table.summary() if table else {}),
+        "timestamp": time.time()
+    }
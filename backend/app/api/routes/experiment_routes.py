@@ -5,6 +5,8 @@ This module contains route definitions for experiment-related endpoints,
 used for testing new features, performing A/B tests, and collecting
 performance metrics.
 """
+import asyncio
+import itertools
 import logging
 import time
 import random
@@ -18,8 +20,9 @@ import httpx
 import os
 from urllib.parse import urljoin
 
+import numpy as np
 from fastapi import APIRouter, HTTPException, Depends, Query, Request, BackgroundTasks
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 
 from ...services import search_service
 from ...services.ads_service import get_ads_results
@@ -27,14 +30,16 @@ from ...services.quepid_service import (
     evaluate_search_results, 
     load_case_with_judgments, 
     get_quepid_cases,
-    get_case_judgments,
     get_book_judgments,
     extract_doc_id,
     calculate_ndcg,
+    calculate_ndcg_batch,
+    align_judgment_ratings,
     QUEPID_API_KEY,
     QuepidService
 )
 from ...core.config import settings
+from ...utils.http import shared_http_client
 from ..models import (
     ErrorResponse, 
     QuepidEvaluationRequest,
@@ -45,7 +50,9 @@ from ..models import (
     SearchRequest,
     BoostConfig
 )
-from ...services.boost_service import apply_all_boosts
+from ...services.boost_service import apply_all_boosts, boost_config_to_dict, sweep_boost_configs
+from ...services.quepid_evaluation import evaluate_sources, EVALUATION_CUTOFFS
+from ...services.batch_comparison import BATCH_MAX_QUERIES
 from ...services.query_intent.service import QueryIntentService
 
 # Setup logging
@@ -65,6 +72,9 @@ back_compat_router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Upper bound on the number of boost configurations evaluated by one sweep
+BOOST_SWEEP_MAX_CONFIGS = int(os.environ.get("BOOST_SWEEP_MAX_CONFIGS", 500))
+
 # Initialize QuepidService
 quepid_service = QuepidService()
 
@@ -144,6 +154,103 @@ class ExperimentResponse(BaseModel):
     metadata: Dict[str, Any]
 
 
+class BoostSweepRequest(BaseModel):
+    """
+    Request model for a boost parameter sweep.
+    
+    Attributes:
+        query: A single query to sweep (combined with queries)
+        queries: Query set to sweep
+        configs: Explicit boost configurations to evaluate
+        grid: Parameter grid over BoostConfig fields; every combination is
+            evaluated on top of base_config
+        base_config: Configuration the grid values are applied to
+        num_results: Number of candidates retrieved once per query
+        qf: Query field weights used for retrieval
+        case_id: Quepid case to compute nDCG against (optional)
+        ndcg_k: Cutoff for nDCG
+        top_n: Number of top boosted results reported per configuration
+    """
+    query: Optional[str] = None
+    queries: List[str] = Field(default_factory=list)
+    configs: List[BoostConfig] = Field(default_factory=list)
+    grid: Dict[str, List[Any]] = Field(default_factory=dict)
+    base_config: BoostConfig = Field(default_factory=BoostConfig)
+    num_results: int = Field(default=100, ge=1, le=2000)
+    qf: Optional[str] = None
+    case_id: Optional[int] = None
+    ndcg_k: int = Field(default=10, ge=1)
+    top_n: int = Field(default=10, ge=0)
+
+
+class QuepidMatrixEvaluationRequest(BaseModel):
+    """
+    Request model for evaluating several sources against a Quepid case.
+    
+    Attributes:
+        query: A single query to evaluate (combined with queries)
+        queries: Query set to evaluate
+        case_id: The Quepid case ID to use for evaluation
+        sources: Sources to evaluate
+        ks: Rank cutoffs for every metric
+        max_results: Results fetched per source (defaults to the largest cutoff)
+        use_cache: Whether to read source results through the result cache
+    """
+    query: Optional[str] = None
+    queries: List[str] = Field(default_factory=list)
+    case_id: int = Field(default=8862, description="The Quepid case ID to use for evaluation")
+    sources: List[str] = Field(default=["ads"], min_length=1)
+    ks: List[int] = Field(default=list(EVALUATION_CUTOFFS), min_length=1)
+    max_results: Optional[int] = Field(default=None, ge=1, le=2000)
+    use_cache: bool = True
+
+
+def expand_boost_grid(base_config: BoostConfig, grid: Dict[str, List[Any]]) -> List[BoostConfig]:
+    """
+    Expand a parameter grid into one boost configuration per combination.
+    
+    Args:
+        base_config: Configuration supplying the values not in the grid
+        grid: Mapping of BoostConfig field names to candidate values
+    
+    Returns:
+        List[BoostConfig]: Configurations in grid order
+    
+    Raises:
+        HTTPException: If the grid names an unknown field, or adsQueryFields
+            (candidates are retrieved once with the request's qf, so it cannot
+            vary), or if a grid value is invalid for its field
+    """
+    if not grid:
+        return []
+    
+    unknown = set(grid) - set(BoostConfig.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown boost grid fields: {', '.join(sorted(unknown))}")
+    if "adsQueryFields" in grid:
+        raise HTTPException(
+            status_code=422,
+            detail="adsQueryFields cannot be swept: candidates are retrieved once per query with qf"
+        )
+    
+    names = list(grid)
+    configs = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        update = dict(zip(names, values))
+        label = ", ".join(f"{name}={value}" for name, value in update.items())
+        try:
+            configs.append(BoostConfig(**{**base_config.model_dump(), "name": label, **update}))
+        except ValidationError as e:
+            errors = e.errors(include_url=False, include_context=False)
+            raise HTTPException(status_code=422, detail=f"Invalid boost grid values ({label}): {errors}")
+    return configs
+
+
+def boost_grid_size(grid: Dict[str, List[Any]]) -> int:
+    """Count the configurations a parameter grid expands to, without expanding it."""
+    return math.prod(len(values) for values in grid.values()) if grid else 0
+
+
 def find_closest_query(query: str, available_queries: List[str]) -> Optional[str]:
     """
     Find the closest matching query in a list of available queries.
@@ -535,6 +642,141 @@ def calculate_boost_stats(
     return stats
 
 
+@router.post("/boost-sweep")
+async def sweep_boost_parameters(request: BoostSweepRequest) -> Dict[str, Any]:
+    """
+    Evaluate many boost configurations against one retrieval per query.
+    
+    Candidates are fetched from ADS once per query; every configuration is
+    then scored against that candidate set in a single batched pass. When a
+    Quepid case is given, the case is loaded once and nDCG is reported per
+    configuration and query.
+    
+    Args:
+        request: Queries, configurations and evaluation settings
+    
+    Returns:
+        Dict[str, Any]: Per-query rank changes and nDCG for every configuration,
+            plus a summary with the mean nDCG per configuration
+    
+    Raises:
+        HTTPException: If the request is invalid or retrieval fails
+    """
+    queries = ([request.query] if request.query else []) + request.queries
+    if not queries:
+        raise HTTPException(status_code=400, detail="At least one query is required")
+    
+    # Check the size before expanding, so an oversized grid is never built
+    n_configs = len(request.configs) + boost_grid_size(request.grid)
+    if not n_configs:
+        raise HTTPException(status_code=400, detail="At least one boost configuration is required")
+    if n_configs > BOOST_SWEEP_MAX_CONFIGS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Sweep has {n_configs} configurations; the limit is {BOOST_SWEEP_MAX_CONFIGS}"
+        )
+    configs = request.configs + expand_boost_grid(request.base_config, request.grid)
+    config_dicts = [boost_config_to_dict(config) for config in configs]
+    
+    logger.info(f"Boost sweep: {len(configs)} configurations over {len(queries)} queries")
+    
+    try:
+        # Retrieve each query's candidates once, concurrently
+        fields = ["title", "author", "abstract", "doi", "year", "citation_count", "doctype", "property", "url"]
+        retrieval = asyncio.gather(*(
+            get_ads_results(query=query, fields=fields, num_results=request.num_results, qf=request.qf)
+            for query in queries
+        ))
+        if request.case_id is not None:
+            candidate_sets, case = await asyncio.gather(retrieval, load_case_with_judgments(request.case_id))
+            if not case:
+                raise HTTPException(status_code=404, detail=f"Quepid case {request.case_id} not found")
+        else:
+            candidate_sets, case = await retrieval, None
+        
+        query_results = []
+        ndcg_by_config: List[List[float]] = [[] for _ in configs]
+        for query, candidates in zip(queries, candidate_sets):
+            entry: Dict[str, Any] = {"query": query, "candidates": len(candidates), "configs": []}
+            if not candidates:
+                entry["error"] = "No results found for query"
+                query_results.append(entry)
+                continue
+            
+            # orders[c] lists candidate indices in boosted order; positions is its inverse
+            orders = sweep_boost_configs(candidates, config_dicts)
+            positions = np.argsort(orders, axis=1)
+            rank_changes = np.arange(len(candidates)) - positions
+            
+            ndcg = baseline_ndcg = None
+            if case:
+                judged_query = query if query in case.judgments else find_closest_query(query, case.queries)
+                judgments = case.judgments.get(judged_query, {}) if judged_query else {}
+                if judgments:
+                    ratings = align_judgment_ratings(candidates, judgments)
+                    ndcg = calculate_ndcg_batch(ratings[orders], request.ndcg_k)
+                    baseline_ndcg = float(calculate_ndcg_batch(ratings[np.newaxis, :], request.ndcg_k)[0])
+                    entry["judged_query"] = judged_query
+                else:
+                    entry["judged_query"] = None
+            entry["baseline_ndcg"] = baseline_ndcg
+            
+            for c, config in enumerate(configs):
+                changes = rank_changes[c]
+                config_entry = {
+                    "config_index": c,
+                    "name": config.name,
+                    "stats": {
+                        "moved_up": int((changes > 0).sum()),
+                        "moved_down": int((changes < 0).sum()),
+                        "unchanged": int((changes == 0).sum()),
+                        "avg_rank_change": float(np.abs(changes).mean()),
+                        "max_rank_increase": int(max(changes.max(), 0)),
+                        "max_rank_decrease": int(max(-changes.min(), 0))
+                    },
+                    "top_results": [
+                        {
+                            "title": candidates[i].title,
+                            "url": candidates[i].url,
+                            "original_rank": int(i) + 1,
+                            "rank_change": int(changes[i])
+                        }
+                        for i in orders[c, :request.top_n].tolist()
+                    ]
+                }
+                if ndcg is not None:
+                    config_entry[f"ndcg@{request.ndcg_k}"] = float(ndcg[c])
+                    ndcg_by_config[c].append(float(ndcg[c]))
+                entry["configs"].append(config_entry)
+            query_results.append(entry)
+        
+        summary = []
+        for c, config in enumerate(configs):
+            scores = ndcg_by_config[c]
+            summary.append({
+                "config_index": c,
+                "name": config.name,
+                "mean_ndcg": sum(scores) / len(scores) if scores else None,
+                "queries_evaluated": len(scores)
+            })
+        ranked = [item for item in summary if item["mean_ndcg"] is not None]
+        best = max(ranked, key=lambda item: item["mean_ndcg"]) if ranked else None
+        
+        return {
+            "queries": queries,
+            "configs": [config.model_dump() for config in configs],
+            "results": query_results,
+            "summary": summary,
+            "best_config": best
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in boost sweep: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error in boost sweep: {str(e)}")
+
+
 @router.post("/ab-test")
 async def run_ab_test(
     search_request: SearchRequest,
@@ -677,23 +919,19 @@ async def evaluate_search_with_quepid(
             query_id=request.query_id
         )
         
-        # Get case data from Quepid
-        case_data = await get_case_judgments(request.case_id)
-        if not case_data:
+        # Get case judgments from the local judgment store (refreshed from Quepid when stale)
+        case = await load_case_with_judgments(request.case_id)
+        if not case:
             raise HTTPException(
                 status_code=404,
                 detail=f"Case {request.case_id} not found or no data returned from Quepid"
             )
         
         # Get judgments for the query
-        judgments = {}
-        for query_data in case_data.get('queries', []):
-            if query_data['query'] == request.query:
-                judgments = query_data.get('ratings', {})
-                break
+        judgments = case.judgments.get(request.query, {})
+        available_queries = list(case.judgments)
         
         if not judgments:
-            available_queries = [q['query'] for q in case_data.get('queries', [])]
             raise HTTPException(
                 status_code=404,
                 detail=f"No judgments found for query '{request.query}' in case {request.case_id}. Available queries: {', '.join(available_queries)}"
@@ -719,13 +957,13 @@ async def evaluate_search_with_quepid(
         return QuepidEvaluationResponse(
             query=request.query,
             case_id=request.case_id,
-            case_name=case_data.get('case_name', f'Case {request.case_id}'),
+            case_name=case.name or f'Case {request.case_id}',
             source_results=[source_result],
             total_judged=len(judgments),
             total_relevant=sum(1 for j in judgments.values() if 
                 (isinstance(j, dict) and j.get('rating', 0) > 0) or 
                 (isinstance(j, (int, float)) and j > 0)),
-            available_queries=[q['query'] for q in case_data.get('queries', [])],
+            available_queries=available_queries,
             judged_documents=judged_documents  # Add judged documents to response
         )
         
@@ -739,6 +977,57 @@ async def evaluate_search_with_quepid(
         )
 
 
+@router.post("/quepid-evaluation/matrix")
+async def evaluate_sources_with_quepid(request: QuepidMatrixEvaluationRequest) -> Dict[str, Any]:
+    """
+    Evaluate several sources against a Quepid case in one pass.
+    
+    The case is loaded once, every source is fetched concurrently for each
+    query, and nDCG, precision, recall and judged coverage are computed for
+    every source and cutoff together.
+    
+    Args:
+        request: Queries, case, sources and cutoffs
+    
+    Returns:
+        Dict[str, Any]: Column names, a per-source metric row for every query,
+            and the per-source mean over the query set
+    
+    Raises:
+        HTTPException: If the request is invalid, the case cannot be loaded
+            or the evaluation fails
+    """
+    queries = ([request.query] if request.query else []) + request.queries
+    if not queries:
+        raise HTTPException(status_code=400, detail="At least one query is required")
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Evaluation has {len(queries)} queries; the limit is {BATCH_MAX_QUERIES}"
+        )
+    if min(request.ks) < 1:
+        raise HTTPException(status_code=400, detail="Cutoffs must be positive")
+    
+    try:
+        evaluation = await evaluate_sources(
+            request.case_id,
+            queries,
+            request.sources,
+            ks=request.ks,
+            max_results=request.max_results,
+            use_cache=request.use_cache
+        )
+    except Exception as e:
+        logger.error(f"Error in Quepid matrix evaluation: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error evaluating search results: {str(e)}")
+    
+    if evaluation is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Case {request.case_id} not found or no data returned from Quepid"
+        )
+    return evaluation
+
 @router.get(
     "/quepid-cases", 
     responses={
@@ -827,7 +1116,7 @@ async def boost_experiment_legacy(
         
         logger.info(f"Making request to {search_url} with params: {params}")
         
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client("solr") as client:
             try:
                 response = await client.get(
                     search_url, 
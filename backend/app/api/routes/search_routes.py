@@ -5,15 +5,25 @@ This module contains route definitions for search-related endpoints,
 including the main comparison endpoint that handles searching across
 multiple engines and computing similarity metrics.
 """
+import json
+import time
 import logging
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from typing import Dict, List, Any, Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Any, Optional, Tuple
+from pydantic import BaseModel, Field
 
 from ...api.models import SearchRequest, SearchResult, SearchResponse, SearchRequestWithBoosts, BoostConfig
-from ...services.search_service import get_results_with_fallback, compare_results, SearchService
+from ...services.search_service import (
+    get_results_with_metadata, stream_results_with_metadata, compare_results, SearchService
+)
 from ...services.query_transformation import transform_query_with_boosts
-from ...services.boost_service import apply_all_boosts
+from ...services.boost_service import apply_all_boosts, boost_config_to_dict
+from ...services.judgement_enrichment import annotate_with_judgements
+from ...services.batch_comparison import (
+    BATCH_MAX_QUERIES, BatchSummary, iter_batch_comparison, run_batch_comparison
+)
 
 # Create router
 router = APIRouter(
@@ -41,6 +51,77 @@ class SearchRequestWithBoosts(SearchRequest):
     """Extended search request model that includes boost configurations."""
     boost_config: Optional[BoostConfig] = None
 
+class BatchComparisonRequest(BaseModel):
+    """Request model for comparing search engines over a set of queries."""
+    queries: List[str] = Field(..., min_length=1)
+    sources: List[str]
+    metrics: List[str] = ["jaccard", "rankBiased"]
+    fields: List[str] = ["title"]
+    max_results: Optional[int] = Field(default=20, ge=1, le=1000)
+    use_cache: bool = True
+
+def _validate_search_request(search_request: SearchRequest) -> None:
+    """
+    Reject comparison requests without a query, sources or metrics.
+    
+    Args:
+        search_request: The comparison request
+    
+    Raises:
+        HTTPException: If a required part of the request is missing
+    """
+    if not search_request.query:
+        raise HTTPException(status_code=400, detail="Search query cannot be empty")
+    
+    if not search_request.sources:
+        raise HTTPException(status_code=400, detail="At least one source must be specified")
+    
+    if not search_request.metrics:
+        raise HTTPException(status_code=400, detail="At least one metric must be specified")
+
+
+def _query_field_params(
+    boost_config: Optional[BoostConfig]
+) -> Tuple[Optional[str], Optional[Dict[str, float]]]:
+    """
+    Derive the qf parameter and query-transformation field boosts from a boost config.
+    
+    Args:
+        boost_config: The request's boost configuration, if any
+    
+    Returns:
+        Tuple[Optional[str], Optional[Dict[str, float]]]: The qf string and
+            the positive field boosts
+    """
+    qf = None
+    field_boosts = None
+    if not boost_config:
+        return qf, field_boosts
+    
+    # Handle adsQueryFields for qf parameter
+    if boost_config.adsQueryFields:
+        # Filter out fields with zero or negative weights
+        active_fields = {
+            field: weight for field, weight in boost_config.adsQueryFields.items()
+            if weight and float(weight) > 0
+        }
+        if active_fields:
+            qf = " ".join(f"{field}^{weight}" for field, weight in active_fields.items())
+            logger.info(f"Using query field weights (qf): {qf}")
+    
+    # Handle field_boosts for query transformation
+    if boost_config.field_boosts:
+        # Filter out fields with zero or negative weights
+        field_boosts = {
+            field: weight for field, weight in boost_config.field_boosts.items()
+            if weight and float(weight) > 0
+        }
+        if field_boosts:
+            logger.info(f"Using field boosts for query transformation: {field_boosts}")
+    
+    return qf, field_boosts
+
+
 @router.post("/search/compare")
 async def compare_search_engines(
     search_request: SearchRequestWithBoosts
@@ -64,15 +145,7 @@ async def compare_search_engines(
         # Log the incoming request
         logger.info(f"Search request received: {search_request.model_dump_json()}")
         
-        # Validate request
-        if not search_request.query:
-            raise HTTPException(status_code=400, detail="Search query cannot be empty")
-        
-        if not search_request.sources:
-            raise HTTPException(status_code=400, detail="At least one source must be specified")
-        
-        if not search_request.metrics:
-            raise HTTPException(status_code=400, detail="At least one metric must be specified")
+        _validate_search_request(search_request)
         
         # Log if this is a transformed query
         if search_request.useTransformedQuery:
@@ -81,33 +154,10 @@ async def compare_search_engines(
                 logger.info(f"Original query was: {search_request.originalQuery}")
         
         # Format field weights if provided in boost config
-        qf = None
-        field_boosts = None
+        qf, field_boosts = _query_field_params(search_request.boost_config)
         
-        if search_request.boost_config:
-            # Handle adsQueryFields for qf parameter
-            if search_request.boost_config.adsQueryFields:
-                # Filter out fields with zero or negative weights
-                active_fields = {
-                    field: weight for field, weight in search_request.boost_config.adsQueryFields.items()
-                    if weight and float(weight) > 0
-                }
-                if active_fields:
-                    qf = " ".join(f"{field}^{weight}" for field, weight in active_fields.items())
-                    logger.info(f"Using query field weights (qf): {qf}")
-            
-            # Handle field_boosts for query transformation
-            if search_request.boost_config.field_boosts:
-                # Filter out fields with zero or negative weights
-                field_boosts = {
-                    field: weight for field, weight in search_request.boost_config.field_boosts.items()
-                    if weight and float(weight) > 0
-                }
-                if field_boosts:
-                    logger.info(f"Using field boosts for query transformation: {field_boosts}")
-        
-        # Get results from each source with fallback mechanisms
-        results = await get_results_with_fallback(
+        # Get results from each source concurrently, with fallback mechanisms
+        results, search_metadata = await get_results_with_metadata(
             query=search_request.query,
             sources=search_request.sources,
             fields=search_request.fields,
@@ -127,22 +177,21 @@ async def compare_search_engines(
             logger.info(f"Applying boosts with config: {search_request.boost_config.model_dump_json()}")
             for source, source_results in results.items():
                 if source_results:
-                    # Create a boost config dictionary from the BoostConfig model
-                    boost_config = {
-                        "citation_boost": search_request.boost_config.citation_boost,
-                        "min_citations": search_request.boost_config.min_citations,
-                        "recency_boost": search_request.boost_config.recency_boost,
-                        "reference_year": search_request.boost_config.reference_year,
-                        "doctype_boosts": search_request.boost_config.doctype_boosts,
-                        "field_boosts": search_request.boost_config.field_boosts
-                    }
                     boosted_results = await apply_all_boosts(
                         source_results,
-                        boost_config
+                        boost_config_to_dict(search_request.boost_config)
                     )
                     results[source] = boosted_results
                     logger.info(f"Applied boosts to {len(boosted_results)} results from {source}")
         
+        # Annotate results with prior human judgements in one batched lookup
+        if search_request.includeJudgements:
+            try:
+                search_metadata["judgements"] = await annotate_with_judgements(results)
+            except Exception as e:
+                logger.error(f"Error annotating results with judgements: {str(e)}")
+                search_metadata["judgements"] = {"error": str(e)}
+        
         # Compare results if we have multiple sources
         comparison_metrics = {}
         if len(search_request.sources) > 1:
@@ -162,7 +211,8 @@ async def compare_search_engines(
             "field_weights": {
                 "qf": qf,  # Query field weights
                 "field_boosts": field_boosts  # Field boosts for query transformation
-            }
+            },
+            "search_metadata": search_metadata  # Per-source status and timing
         }
         
     except HTTPException:
@@ -172,6 +222,220 @@ async def compare_search_engines(
         logger.error(f"Error in search comparison: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error in search comparison: {str(e)}")
 
+def _format_stream_event(event: str, data: Dict[str, Any], sse: bool) -> str:
+    """
+    Serialize one streaming event as an NDJSON line or a Server-Sent Event.
+    
+    Args:
+        event: Event name
+        data: Event payload
+        sse: Whether to use the SSE wire format
+    
+    Returns:
+        str: The encoded event
+    """
+    payload = json.dumps(jsonable_encoder({"event": event, **data}))
+    if sse:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+@router.post("/search/compare/stream")
+async def stream_compare_search_engines(
+    search_request: SearchRequestWithBoosts,
+    request: Request,
+    format: Optional[str] = Query(default=None, pattern="^(ndjson|sse)$")
+) -> StreamingResponse:
+    """
+    Stream a search comparison as sources finish.
+    
+    Emits a "start" event, then a "source" event with each source's (boosted)
+    results as soon as that source completes, a "comparison" event for each
+    pair of sources as soon as both sides are available, and a final
+    "complete" event with the per-source metadata. Pairwise metrics are
+    computed on the pair alone, so corpus-weighted cosine variants may differ
+    slightly from /search/compare.
+    
+    The response is NDJSON by default, or Server-Sent Events when
+    format=sse or the client accepts text/event-stream.
+    
+    Args:
+        search_request: Request object containing query, sources, metrics, and fields
+        request: The incoming request (used for content negotiation)
+        format: Explicit wire format ("ndjson" or "sse")
+    
+    Returns:
+        StreamingResponse: The event stream
+    
+    Raises:
+        HTTPException: If the request is invalid
+    """
+    _validate_search_request(search_request)
+    sse = format == "sse" or (format is None and "text/event-stream" in request.headers.get("accept", ""))
+    qf, field_boosts = _query_field_params(search_request.boost_config)
+    
+    async def events():
+        start_time = time.perf_counter()
+        yield _format_stream_event("start", {
+            "query": search_request.query,
+            "sources": search_request.sources,
+            "metrics": search_request.metrics,
+            "fields": search_request.fields,
+            "field_weights": {"qf": qf, "field_boosts": field_boosts}
+        }, sse)
+        
+        completed: Dict[str, List[SearchResult]] = {}
+        source_meta: Dict[str, Any] = {}
+        try:
+            async for source, source_results, meta in stream_results_with_metadata(
+                query=search_request.query,
+                sources=search_request.sources,
+                fields=search_request.fields,
+                max_results=search_request.max_results,
+                use_transformed_query=search_request.useTransformedQuery,
+                original_query=search_request.originalQuery,
+                qf=qf,
+                field_boosts=field_boosts
+            ):
+                source_meta[source] = meta
+                if source_results and search_request.boost_config:
+                    source_results = await apply_all_boosts(
+                        source_results,
+                        boost_config_to_dict(search_request.boost_config)
+                    )
+                yield _format_stream_event("source", {
+                    "source": source,
+                    "results": source_results or [],
+                    "metadata": meta
+                }, sse)
+                if not source_results:
+                    continue
+                
+                # Compare the new source with every source that already arrived
+                for other in search_request.sources:
+                    if other not in completed:
+                        continue
+                    available = {other: completed[other], source: source_results}
+                    first, second = sorted(available, key=search_request.sources.index)
+                    pair = compare_results(
+                        {first: available[first], second: available[second]},
+                        search_request.metrics,
+                        search_request.fields
+                    )
+                    yield _format_stream_event("comparison", {
+                        "pair": f"{first}_vs_{second}",
+                        "overlap": pair["overlap"],
+                        "similarity": pair["similarity"]
+                    }, sse)
+                completed[source] = source_results
+        except Exception as e:
+            logger.error(f"Error in streaming search comparison: {str(e)}", exc_info=True)
+            yield _format_stream_event("error", {"detail": f"Error in search comparison: {str(e)}"}, sse)
+            return
+        
+        yield _format_stream_event("complete", {
+            "sources_with_results": list(completed),
+            "search_metadata": {
+                "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1),
+                "sources": source_meta
+            }
+        }, sse)
+    
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@router.post("/search/compare/batch")
+async def compare_search_engines_batch(
+    batch_request: BatchComparisonRequest,
+    request: Request,
+    format: Optional[str] = Query(default=None, pattern="^(json|ndjson|sse)$"),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=BATCH_MAX_QUERIES)
+) -> Any:
+    """
+    Compare search engines over a set of queries.
+    
+    Queries run with a bounded number in flight and per-source upstream
+    limits, reading through the result cache. By default only one page of
+    the queries (``offset``/``limit``) is run, and the response holds its
+    rows and a JSON summary of their overlap, Jaccard and rank-biased overlap
+    distributions. With format=ndjson or format=sse (or an Accept header
+    asking for a stream), every query is run and rows are streamed as
+    queries finish, followed by a "summary" event for the whole set.
+    
+    Args:
+        batch_request: Queries, sources, metrics and fields to compare
+        request: The incoming request (used for content negotiation)
+        format: Response format ("json", "ndjson" or "sse")
+        offset: Index of the first query run for a JSON page
+        limit: Number of queries run for a JSON page
+    
+    Returns:
+        Any: JSON summary and rows, or a StreamingResponse
+    
+    Raises:
+        HTTPException: If the request is invalid
+    """
+    queries = [query.strip() for query in batch_request.queries if query and query.strip()]
+    if not queries:
+        raise HTTPException(status_code=400, detail="At least one non-empty query must be specified")
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BATCH_MAX_QUERIES} queries can be compared in one batch"
+        )
+    if not batch_request.sources:
+        raise HTTPException(status_code=400, detail="At least one source must be specified")
+    
+    accept = request.headers.get("accept", "")
+    if format is None:
+        if "text/event-stream" in accept:
+            format = "sse"
+        elif "application/x-ndjson" in accept:
+            format = "ndjson"
+        else:
+            format = "json"
+    
+    options = {
+        "max_results": batch_request.max_results,
+        "use_cache": batch_request.use_cache
+    }
+    logger.info(f"Batch comparison of {len(queries)} queries across {batch_request.sources}")
+    
+    if format == "json":
+        # Run only the requested page, so paging does not rerun the whole set
+        batch = await run_batch_comparison(
+            queries[offset:offset + limit], batch_request.sources, batch_request.metrics,
+            batch_request.fields, start_index=offset, **options
+        )
+        return {
+            "summary": batch["summary"],
+            "rows": batch["rows"],
+            "offset": offset,
+            "limit": limit,
+            "total": len(queries)
+        }
+    
+    sse = format == "sse"
+    
+    async def events():
+        summary = BatchSummary()
+        yield _format_stream_event("start", {
+            "queries": len(queries),
+            "sources": batch_request.sources,
+            "metrics": batch_request.metrics
+        }, sse)
+        async for row in iter_batch_comparison(
+            queries, batch_request.sources, batch_request.metrics, batch_request.fields,
+            summary=summary, **options
+        ):
+            yield _format_stream_event("row", row, sse)
+        yield _format_stream_event("summary", summary.to_dict(), sse)
+    
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
 @router.post("/search", response_model=SearchResponse)
 async def search(request: SearchRequestWithBoosts) -> SearchResponse:
     """Handle search requests.
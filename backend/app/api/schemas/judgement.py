@@ -52,4 +52,7 @@ class JudgementStats(BaseModel):
 class JudgementBatchCreate(BaseModel):
     """Schema for creating multiple judgements in a batch."""
 
-    judgements: List[JudgementCreate] = Field(..., description="List of judgements to create") 
\ No newline at end of file
+    judgements: List[JudgementCreate] = Field(..., description="List of judgements to create")
+    chunk_size: Optional[int] = Field(
+        None, ge=1, description="Rows written per statement (defaults to the server setting)"
+    ) 
\ No newline at end of file
@@ -61,6 +61,15 @@ class Settings(BaseSettings):
     # Database Configuration
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./search_comparisons.db")
     
+    # Rows written per statement when judgements are submitted in bulk
+    JUDGEMENT_BATCH_CHUNK_SIZE: int = int(os.getenv("JUDGEMENT_BATCH_CHUNK_SIZE", "500"))
+    
+    # Connection pool size and overflow; database calls run on a thread pool
+    # with one worker per pooled connection
+    DATABASE_POOL_SIZE: int = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+    DATABASE_MAX_OVERFLOW: int = int(os.getenv("DATABASE_MAX_OVERFLOW", "5"))
+    DATABASE_POOL_TIMEOUT: float = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+    
     # If using PostgreSQL on Render, convert the URL if needed
     @validator("DATABASE_URL", pre=True)
     def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
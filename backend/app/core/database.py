@@ -1,24 +1,80 @@
-"""Database configuration module."""
+"""Database configuration module.
 
-from typing import Generator
-from sqlalchemy import create_engine
+Routes are async but the SQLAlchemy session is synchronous, so database work
+is run with run_in_db on a dedicated thread pool sized to the connection pool.
+This keeps queries and commits off the event loop without letting database
+traffic take over the default executor used by upstream search clients.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Generator, Optional, TypeVar
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 
 from app.core.config import settings
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
+T = TypeVar("T")
+
+DATABASE_URL = make_url(settings.DATABASE_URL)
+IS_SQLITE = DATABASE_URL.get_backend_name() == "sqlite"
+# In-memory SQLite gets SingletonThreadPool, which takes no pool sizing, and has no journal to tune
+IS_MEMORY_SQLITE = IS_SQLITE and (
+    DATABASE_URL.database in (None, "", ":memory:") or DATABASE_URL.query.get("mode") == "memory"
 )
 
+# Create SQLAlchemy engine
+if IS_MEMORY_SQLITE:
+    engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+elif IS_SQLITE:
+    engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": settings.DATABASE_POOL_TIMEOUT},
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite(dbapi_connection: Any, connection_record: Any) -> None:
+        """Let readers run alongside a writer and wait on locks instead of failing."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+else:
+    engine = create_engine(
+        settings.DATABASE_URL,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create Base class
 Base = declarative_base()
 
+# Created on first use (and again after shutdown_db, e.g. for a later lifespan)
+_db_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_db_executor() -> ThreadPoolExecutor:
+    """Get the database thread pool, creating it if needed."""
+    global _db_executor
+    if _db_executor is None:
+        # One worker per connection the pool can hand out, so workers never queue on the pool
+        _db_executor = ThreadPoolExecutor(
+            max_workers=settings.DATABASE_POOL_SIZE + settings.DATABASE_MAX_OVERFLOW,
+            thread_name_prefix="db",
+        )
+    return _db_executor
+
 
 def get_db() -> Generator[Session, None, None]:
     """Get database session.
@@ -30,4 +86,32 @@ def get_db() -> Generator[Session, None, None]:
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+async def run_in_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking database work on the database thread pool.
+
+    Args:
+        func: Function that uses a session (e.g. a JudgementService method)
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        T: The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_db_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_db() -> None:
+    """Stop the database thread pool and close pooled connections.
+
+    Both are recreated on next use, so the application can start again in
+    the same process.
+    """
+    global _db_executor
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=True)
+        _db_executor = None
+    engine.dispose()
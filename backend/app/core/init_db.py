@@ -1,13 +1,38 @@
 """Database initialization script."""
 
 import logging
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
 from app.core.database import Base, engine
 
 logger = logging.getLogger(__name__)
 
 
+def create_missing_indexes(bind: Optional[Engine] = None) -> None:
+    """Create indexes declared on the models that an existing database lacks.
+
+    create_all only creates indexes together with their table, so this
+    migrates databases created before an index was declared. A unique index
+    that existing duplicate rows violate is skipped with a warning, so the
+    application still starts; it is created once the duplicates are removed.
+
+    Args:
+        bind: Engine to migrate (defaults to the application engine).
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=bind or engine, checkfirst=True)
+            except IntegrityError as e:
+                logger.warning(f"Skipping unique index {index.name}: existing rows violate it ({e.orig})")
+
+
 def init_db() -> None:
-    """Initialize the database by creating all tables."""
+    """Initialize the database by creating all tables and indexes."""
     logger.info("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    create_missing_indexes()
     logger.info("Database tables created successfully.") 
\ No newline at end of file
@@ -4,6 +4,7 @@ Main application module for the search-comparisons backend.
 This module configures and starts the FastAPI application, including middleware,
 exception handlers, and route registration.
 """
+import asyncio
 import logging
 import os
 from typing import Dict, Any
@@ -30,6 +31,12 @@ from .routes.quepid import router as quepid_router
 from .routes.judgement import router as judgement_router
 from .api.models import ErrorResponse
 from .core.init_db import init_db
+from .core.database import shutdown_db
+from .services.scholar_service import shutdown_scholarly_executor
+from .utils.cache import start_cache_sweeper, stop_cache_sweeper
+from .utils.http import http_clients
+from .services.citation_distributions import load_citation_distributions
+from .utils.instrumentation import CorrelationIdFilter, request_context
 from .core.config import settings
 
 # Initialize rate limiter
@@ -89,16 +96,26 @@ logs_dir = Path(__file__).parent.parent / 'logs'
 logs_dir.mkdir(exist_ok=True)
 
 # Configure logging to write to both file and console
+log_handlers = [
+    logging.FileHandler(logs_dir / 'app.log'),
+    logging.StreamHandler()
+]
+for handler in log_handlers:
+    # Stamp every record with the correlation ID of the request that produced it
+    handler.addFilter(CorrelationIdFilter())
 logging.basicConfig(
     level=os.getenv("LOG_LEVEL", "INFO"),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(logs_dir / 'app.log'),
-        logging.StreamHandler()
-    ]
+    format="%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s",
+    handlers=log_handlers
 )
 logger = logging.getLogger(__name__)
 
+# Allow clients to turn on debug logging for a single request via a header
+ALLOW_REQUEST_DEBUG_LOGGING = os.getenv(
+    "ALLOW_REQUEST_DEBUG_LOGGING",
+    "false" if os.getenv("ENVIRONMENT", "local") == "production" else "true"
+).lower() == "true"
+
 # Log API key status (masked)
 ads_api_key = os.environ.get("ADS_API_KEY", "")
 if ads_api_key:
@@ -178,6 +195,32 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def correlation_id_middleware(request: Request, call_next):
+    """
+    Bind a correlation ID to every request and echo it in the response.
+    
+    Uses the client's X-Request-ID header when present. Sending
+    X-Debug-Logging: true enables debug logging for just this request
+    (when ALLOW_REQUEST_DEBUG_LOGGING is set).
+    
+    Args:
+        request: The incoming request
+        call_next: The next handler in the middleware chain
+    
+    Returns:
+        Response: The response with an X-Request-ID header
+    """
+    debug = (
+        ALLOW_REQUEST_DEBUG_LOGGING
+        and request.headers.get("x-debug-logging", "").lower() in ("true", "1", "yes")
+    )
+    with request_context(request.headers.get("x-request-id"), debug=debug) as request_id:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
     """
@@ -266,6 +309,15 @@ async def startup_event() -> None:
     
     # Initialize database
     init_db()
+    
+    # Periodically drop cache entries past their stale grace period
+    start_cache_sweeper()
+    
+    # Load citation distribution tables off the event loop
+    asyncio.get_running_loop().run_in_executor(None, load_citation_distributions)
+    
+    # Open pooled connections to upstream services
+    await http_clients.start()
 
 
 @app.on_event("shutdown")
@@ -276,6 +328,10 @@ async def shutdown_event() -> None:
     Performs cleanup tasks when the application shuts down.
     """
     logger.info("Shutting down Academic Search Results Comparator API")
+    stop_cache_sweeper()
+    await http_clients.aclose()
+    shutdown_db()
+    shutdown_scholarly_executor()
 
 # Note: Both /api/boost-experiment and /api/experiments/boost endpoints are now available
 # for backward compatibility. The old endpoint name will still work,
@@ -4,7 +4,7 @@ from datetime import datetime
 from typing import Optional
 from uuid import UUID, uuid4
 
-from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 
 from app.core.database import Base
@@ -14,6 +14,24 @@ class Judgement(Base):
     """SQLAlchemy model for judgements."""
 
     __tablename__ = "judgements"
+    __table_args__ = (
+        # Lookups by query, optionally narrowed to one record
+        Index("ix_judgements_query_bibcode", "query", "record_bibcode"),
+        Index("ix_judgements_record_bibcode", "record_bibcode"),
+        # Per-rater listings and session windows
+        Index("ix_judgements_rater_created", "rater_id", "created_at"),
+        Index("ix_judgements_created_at", "created_at"),
+        # One judgement per rater, query and record; backs upsert_judgements
+        Index(
+            "uq_judgements_rater_query_bibcode",
+            "rater_id",
+            "query",
+            "record_bibcode",
+            unique=True,
+            sqlite_where=text("record_bibcode IS NOT NULL"),
+            postgresql_where=text("record_bibcode IS NOT NULL"),
+        ),
+    )
 
     id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
     rater_id = Column(PGUUID(as_uuid=True), nullable=False)
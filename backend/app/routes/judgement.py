@@ -12,8 +12,9 @@ from app.api.schemas.judgement import (
     JudgementStats,
     JudgementBatchCreate,
 )
-from app.core.database import get_db
+from app.core.database import get_db, run_in_db
 from app.services.judgement_service import JudgementService
+from app.services.judgement_enrichment import get_summary_cache
 from app.services.session_service import get_current_rater_id
 
 router = APIRouter(prefix="/judgements", tags=["judgements"])
@@ -32,7 +33,7 @@ async def get_all_judgements(
         List[JudgementResponse]: List of all judgements.
     """
     service = JudgementService(db)
-    return service.get_all_judgements()
+    return await run_in_db(service.get_all_judgements)
 
 
 @router.post("", response_model=JudgementResponse)
@@ -53,7 +54,8 @@ async def create_judgement(
     """
     rater_id = get_current_rater_id(request)
     service = JudgementService(db)
-    return service.create_judgement(
+    created = await run_in_db(
+        service.create_judgement,
         rater_id=rater_id,
         query=judgement.query,
         information_need=judgement.information_need,
@@ -64,6 +66,8 @@ async def create_judgement(
         judgement_score=judgement.judgement_score,
         judgement_note=judgement.judgement_note,
     )
+    get_summary_cache().invalidate([created.record_bibcode, created.record_title])
+    return created
 
 
 @router.post("/batch", response_model=List[JudgementResponse])
@@ -72,7 +76,10 @@ async def create_judgements_batch(
     request: Request,
     db: Session = Depends(get_db),
 ) -> List[JudgementResponse]:
-    """Create multiple judgements in a batch.
+    """Create or update multiple judgements in a single transaction.
+
+    A judgement replaces the rater's earlier judgement for the same query
+    and bibcode.
 
     Args:
         batch: The batch of judgements to create.
@@ -80,27 +87,21 @@ async def create_judgements_batch(
         db: Database session.
 
     Returns:
-        List[JudgementResponse]: List of created judgements.
+        List[JudgementResponse]: List of stored judgements.
     """
     rater_id = get_current_rater_id(request)
     service = JudgementService(db)
-    created_judgements = []
-    
-    for judgement in batch.judgements:
-        created = service.create_judgement(
-            rater_id=rater_id,
-            query=judgement.query,
-            information_need=judgement.information_need,
-            record_title=judgement.record_title,
-            publication_year=judgement.publication_year,
-            record_bibcode=judgement.record_bibcode,
-            record_source=judgement.record_source,
-            judgement_score=judgement.judgement_score,
-            judgement_note=judgement.judgement_note,
-        )
-        created_judgements.append(created)
-    
-    return created_judgements
+    stored = await run_in_db(
+        service.upsert_judgements,
+        rater_id=rater_id,
+        judgements=[judgement.model_dump() for judgement in batch.judgements],
+        chunk_size=batch.chunk_size,
+    )
+    # Let search results show the new ratings without waiting for the cache TTL
+    get_summary_cache().invalidate(
+        key for judgement in stored for key in (judgement.record_bibcode, judgement.record_title)
+    )
+    return stored
 
 
 @router.get("/query/{query}", response_model=List[JudgementResponse])
@@ -120,7 +121,7 @@ async def get_judgements_by_query(
         List[JudgementResponse]: List of matching judgements.
     """
     service = JudgementService(db)
-    return service.get_judgements_by_query(query, record_bibcode)
+    return await run_in_db(service.get_judgements_by_query, query, record_bibcode)
 
 
 @router.get("/stats/{query}", response_model=JudgementStats)
@@ -138,7 +139,7 @@ async def get_judgement_stats(
         JudgementStats: Statistics about the judgements.
     """
     service = JudgementService(db)
-    return service.get_judgement_stats(query)
+    return await run_in_db(service.get_judgement_stats, query)
 
 
 @router.get("/rater", response_model=List[JudgementResponse])
@@ -157,4 +158,4 @@ async def get_my_judgements(
     """
     rater_id = get_current_rater_id(request)
     service = JudgementService(db)
-    return service.get_judgements_by_rater(rater_id) 
\ No newline at end of file
+    return await run_in_db(service.get_judgements_by_rater, rater_id) 
\ No newline at end of file
@@ -6,13 +6,11 @@ and retrieving bibliographic information.
 """
 import os
 import logging
-import json
 from typing import List, Dict, Any, Optional, Union, TypedDict, Literal
 
-import httpx
-
 from ..api.models import SearchResult
-from ..utils.http import safe_api_request
+from ..utils.http import safe_api_request, shared_http_client
+from ..utils.instrumentation import log_debug, debug_enabled, LazyJSON
 from ..utils.cache import get_cache_key, load_from_cache, save_to_cache
 
 # Setup logging
@@ -104,7 +102,7 @@ async def get_bibcode_from_doi(doi: str) -> Optional[str]:
         return None
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client("ads") as client:
             # Set headers with API key
             headers = {
                 "Authorization": f"Bearer {ads_api_key}",
@@ -128,6 +126,7 @@ async def get_bibcode_from_doi(doi: str) -> Optional[str]:
                 client, 
                 "GET", 
                 ADS_API_URL, 
+                source="ads",
                 headers=headers, 
                 params=params,
                 timeout=TIMEOUT_SECONDS
@@ -262,14 +261,11 @@ async def get_ads_results(
     """
     try:
         # Log input parameters
-        logger.info("=== ADS API Request Parameters ===")
-        logger.info(f"Query: {query}")
-        logger.info(f"Fields: {fields}")
-        logger.info(f"Num results: {num_results}")
-        logger.info(f"Intent: {intent}")
-        logger.info(f"Sort: {sort}")
-        logger.info(f"QF parameter: {qf}")
-        logger.info(f"Field boosts: {field_boosts}")
+        log_debug(
+            logger,
+            "ADS request: query=%r fields=%s num_results=%s intent=%s sort=%s qf=%r field_boosts=%s",
+            query, fields, num_results, intent, sort, qf, field_boosts
+        )
         
         # Set default fields if not provided
         fields = fields or _get_default_fields()
@@ -284,7 +280,7 @@ async def get_ads_results(
         effective_query = query
         if field_boosts:
             effective_query = transform_query_with_boosts(query, field_boosts)
-            logger.info(f"Transformed query with field boosts: {effective_query}")
+            log_debug(logger, "Transformed query with field boosts: %s", effective_query)
         
         # Check cache first if enabled
         if use_cache:
@@ -295,7 +291,7 @@ async def get_ads_results(
                 logger.info(f"Retrieved {len(cached_results)} results from cache for API query")
                 return cached_results
         
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client("ads") as client:
             # Set headers with API key
             headers = {
                 "Authorization": f"Bearer {ads_api_key}", 
@@ -313,27 +309,22 @@ async def get_ads_results(
             # Add qf parameter if provided
             if qf:
                 try:
-                    logger.info(f"Processing qf parameter: {qf}")
                     # Split into field-weight pairs and validate
                     field_weights = []
                     for fw in qf.split():
-                        logger.info(f"Processing field weight pair: {fw}")
                         if "^" in fw:
                             field, weight = fw.split("^")
                             # Convert field to lowercase for case-insensitive matching
                             field = field.lower()
-                            logger.info(f"Field: {field}, Weight: {weight}")
                             # Check if field exists in mapping
                             if field in ADS_FIELD_MAPPING:
                                 # Use the mapped field name
                                 mapped_field = ADS_FIELD_MAPPING[field]
-                                logger.info(f"Mapped field {field} to {mapped_field}")
                                 try:
                                     # Validate weight is a positive number
                                     weight_float = float(weight)
                                     if weight_float > 0:
                                         field_weights.append(f"{mapped_field}^{weight}")
-                                        logger.info(f"Added field weight: {mapped_field}^{weight}")
                                     else:
                                         logger.warning(f"Invalid weight value in qf parameter: {weight} for field {field}")
                                 except ValueError:
@@ -345,36 +336,37 @@ async def get_ads_results(
                     
                     if field_weights:
                         params["qf"] = " ".join(field_weights)
-                        logger.info(f"Final qf parameter: {params['qf']}")
+                        log_debug(logger, "Final qf parameter: %s", params["qf"])
                     else:
                         logger.warning("No valid field weights found in qf parameter")
                 except Exception as e:
                     logger.error(f"Error formatting qf parameter: {str(e)}")
             
             # Log request details
-            logger.info("=== ADS API Request Details ===")
-            logger.info(f"URL: {ADS_API_URL}")
-            logger.info(f"Query: {effective_query}")
-            logger.info(f"Parameters: {json.dumps(params, indent=2)}")
-            logger.info(f"Field weights (qf): {params.get('qf', 'None')}")
-            logger.info(f"Field boosts: {field_boosts}")
+            log_debug(logger, "ADS API request to %s with params %s", ADS_API_URL, LazyJSON(params))
             
             # Make request
             response_data = await safe_api_request(
                 client, 
                 "GET", 
                 ADS_API_URL, 
+                source="ads",
                 headers=headers, 
                 params=params,
                 timeout=TIMEOUT_SECONDS
             )
             
             # Log response data for debugging
-            logger.info("=== ADS API Response Details ===")
-            logger.info(f"Status: {response_data.get('responseHeader', {}).get('status', 'unknown')}")
-            logger.info(f"Response time: {response_data.get('responseHeader', {}).get('QTime', 'unknown')}ms")
-            logger.info(f"Response params: {json.dumps(response_data.get('responseHeader', {}).get('params', {}), indent=2)}")
-            logger.info(f"Number of results: {response_data.get('response', {}).get('numFound', 'unknown')}")
+            if debug_enabled(logger):
+                response_header = response_data.get("responseHeader", {})
+                log_debug(
+                    logger,
+                    "ADS API response: status=%s qtime=%sms numFound=%s params=%s",
+                    response_header.get("status", "unknown"),
+                    response_header.get("QTime", "unknown"),
+                    response_data.get("response", {}).get("numFound", "unknown"),
+                    LazyJSON(response_header.get("params", {}))
+                )
             
             # Check if we got a response
             docs = response_data.get("response", {}).get("docs", [])
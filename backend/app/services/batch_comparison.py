@@ -0,0 +1,295 @@
+"""
+Batch comparison service for the search-comparisons application.
+
+This module compares search engines over a whole set of queries in one run.
+Queries are scheduled with a bounded number in flight, upstream calls go
+through the batch lane of the per-source request scheduler (so they never
+delay interactive comparisons), results are read through the same cache as
+interactive comparisons, and per-query rows are aggregated into overlap,
+rank-biased overlap and Jaccard distributions.
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+from .search_service import get_results_with_metadata, compare_results
+from ..utils.scheduler import BATCH, traffic_lane
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Maximum number of queries accepted in one batch
+BATCH_MAX_QUERIES = int(os.environ.get("BATCH_MAX_QUERIES", 1000))
+
+# Number of queries processed at the same time
+BATCH_QUERY_CONCURRENCY = int(os.environ.get("BATCH_QUERY_CONCURRENCY", 8))
+
+# Percentiles reported for each metric distribution
+SUMMARY_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Pair metrics collected for every query
+PAIR_METRICS = ("overlap", "overlap_ratio", "jaccard", "rankBiased")
+
+
+def _pair_row(comparison: Dict[str, Any], pair_key: str, count1: int, count2: int) -> Dict[str, Any]:
+    """
+    Extract the scalar metrics for one source pair from a comparison.
+    
+    Args:
+        comparison: Output of compare_results
+        pair_key: Pair key ("source1_vs_source2")
+        count1: Number of results from the first source
+        count2: Number of results from the second source
+    
+    Returns:
+        Dict[str, Any]: Overlap count and ratio, Jaccard and rank-biased overlap
+    """
+    overlap = comparison["overlap"][pair_key]["overlap"]
+    smaller = min(count1, count2)
+    similarity = comparison["similarity"]
+    return {
+        "overlap": overlap,
+        "overlap_ratio": overlap / smaller if smaller else 0.0,
+        "jaccard": similarity.get("jaccard", {}).get(pair_key),
+        "rankBiased": similarity.get("rankBiased", {}).get(pair_key)
+    }
+
+
+async def compare_query(
+    index: int,
+    query: str,
+    sources: List[str],
+    metrics: List[str],
+    fields: List[str],
+    max_results: Optional[int] = None,
+    attempts: int = 2,
+    use_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    Compare sources for one query of a batch.
+    
+    Args:
+        index: Position of the query in the batch
+        query: Search query string
+        sources: Sources to compare
+        metrics: Similarity metrics to compute
+        fields: Fields to retrieve and compare
+        max_results: Maximum number of results per source
+        attempts: Maximum number of attempts per source
+        use_cache: Whether to read through the result cache
+    
+    Returns:
+        Dict[str, Any]: Row with per-source status and per-pair metrics
+    """
+    start_time = time.perf_counter()
+    row: Dict[str, Any] = {"index": index, "query": query, "sources": {}, "pairs": {}}
+    try:
+        # Batch runs rely on the per-attempt source timeouts instead of a request deadline
+        results, metadata = await get_results_with_metadata(
+            query, sources, fields, max_results=max_results, attempts=attempts,
+            deadline=None, use_cache=use_cache
+        )
+    except Exception as e:
+        logger.error(f"Error in batch query {index}: {str(e)}")
+        row["error"] = str(e)
+        return row
+    
+    for source, meta in metadata["sources"].items():
+        row["sources"][source] = {
+            key: meta[key] for key in ("status", "count", "cache", "elapsed_ms") if key in meta
+        }
+    
+    # Keep the request's source order so pair keys are stable across queries
+    ordered = {source: results[source] for source in sources if results.get(source)}
+    if len(ordered) >= 2:
+        comparison = compare_results(ordered, metrics, fields)
+        names = list(ordered)
+        for i, source1 in enumerate(names):
+            for source2 in names[i + 1:]:
+                pair_key = f"{source1}_vs_{source2}"
+                row["pairs"][pair_key] = _pair_row(
+                    comparison, pair_key, len(ordered[source1]), len(ordered[source2])
+                )
+    row["elapsed_ms"] = round((time.perf_counter() - start_time) * 1000, 1)
+    return row
+
+
+def summarize_values(values: List[float]) -> Dict[str, Any]:
+    """
+    Summarize a metric's distribution over queries.
+    
+    Args:
+        values: Metric values (one per query)
+    
+    Returns:
+        Dict[str, Any]: Count, mean, standard deviation, extremes and percentiles
+    """
+    if not values:
+        return {"count": 0}
+    data = np.asarray(values, dtype=float)
+    summary = {
+        "count": int(data.size),
+        "mean": float(data.mean()),
+        "std": float(data.std()),
+        "min": float(data.min()),
+        "max": float(data.max())
+    }
+    for percentile, value in zip(SUMMARY_PERCENTILES, np.percentile(data, SUMMARY_PERCENTILES)):
+        summary[f"p{percentile}"] = float(value)
+    return summary
+
+
+class BatchSummary:
+    """
+    Running aggregate of batch rows.
+    
+    Collects per-pair metric values and per-source status counts as rows
+    arrive, and reduces them to distributions on demand.
+    """
+    
+    def __init__(self):
+        """Initialize an empty summary."""
+        self.queries = 0
+        self.errors = 0
+        self.source_status: Dict[str, Dict[str, int]] = {}
+        self.cache_status: Dict[str, int] = {}
+        self.pair_values: Dict[str, Dict[str, List[float]]] = {}
+    
+    def add(self, row: Dict[str, Any]) -> None:
+        """
+        Fold one query row into the summary.
+        
+        Args:
+            row: Row produced by compare_query
+        """
+        self.queries += 1
+        if "error" in row:
+            self.errors += 1
+        for source, meta in row["sources"].items():
+            counts = self.source_status.setdefault(source, {})
+            counts[meta["status"]] = counts.get(meta["status"], 0) + 1
+            if "cache" in meta:
+                self.cache_status[meta["cache"]] = self.cache_status.get(meta["cache"], 0) + 1
+        for pair_key, metrics in row["pairs"].items():
+            values = self.pair_values.setdefault(pair_key, {metric: [] for metric in PAIR_METRICS})
+            for metric in PAIR_METRICS:
+                if metrics.get(metric) is not None:
+                    values[metric].append(metrics[metric])
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Reduce the collected rows to distributions.
+        
+        Returns:
+            Dict[str, Any]: Query counts, per-source status counts, cache
+                statuses and per-pair metric distributions
+        """
+        return {
+            "queries": self.queries,
+            "errors": self.errors,
+            "sources": self.source_status,
+            "cache": self.cache_status,
+            "pairs": {
+                pair_key: {
+                    metric: summarize_values(values)
+                    for metric, values in metrics.items()
+                }
+                for pair_key, metrics in self.pair_values.items()
+            }
+        }
+
+
+async def iter_batch_comparison(
+    queries: List[str],
+    sources: List[str],
+    metrics: List[str],
+    fields: List[str],
+    max_results: Optional[int] = None,
+    attempts: int = 2,
+    use_cache: bool = True,
+    query_concurrency: int = BATCH_QUERY_CONCURRENCY,
+    summary: Optional[BatchSummary] = None,
+    start_index: int = 0
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Compare sources over a set of queries, yielding rows as queries complete.
+    
+    At most ``query_concurrency`` queries are in flight, and upstream calls are
+    made in the scheduler's batch lane, which yields to interactive traffic
+    and is capped by each source's ``batch_concurrency``. Rows are yielded in
+    completion order; each carries the query's index in the input.
+    
+    Args:
+        queries: Queries to run
+        sources: Sources to compare
+        metrics: Similarity metrics to compute
+        fields: Fields to retrieve and compare
+        max_results: Maximum number of results per source
+        attempts: Maximum number of attempts per source
+        use_cache: Whether to read through the result cache
+        query_concurrency: Maximum number of queries in flight
+        summary: Optional summary that every row is added to
+        start_index: Index of the first query (when running one page of a larger set)
+    
+    Yields:
+        Dict[str, Any]: One row per query
+    """
+    async def run_query(index: int, query: str) -> Dict[str, Any]:
+        # Each task has its own context, so the lane stays scoped to this batch
+        with traffic_lane(BATCH):
+            return await compare_query(
+                index, query, sources, metrics, fields,
+                max_results=max_results, attempts=attempts, use_cache=use_cache
+            )
+    
+    queue = list(enumerate(queries, start=start_index))
+    queue.reverse()
+    pending = set()
+    try:
+        while queue or pending:
+            while queue and len(pending) < max(1, query_concurrency):
+                pending.add(asyncio.create_task(run_query(*queue.pop())))
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                row = task.result()
+                if summary is not None:
+                    summary.add(row)
+                yield row
+    finally:
+        for task in pending:
+            task.cancel()
+        logger.info(f"Batch of {len(queries)} queries finished")
+
+
+async def run_batch_comparison(
+    queries: List[str],
+    sources: List[str],
+    metrics: List[str],
+    fields: List[str],
+    **kwargs: Any
+) -> Dict[str, Any]:
+    """
+    Compare sources over a set of queries and collect every row.
+    
+    Args:
+        queries: Queries to run
+        sources: Sources to compare
+        metrics: Similarity metrics to compute
+        fields: Fields to retrieve and compare
+        **kwargs: Options passed to iter_batch_comparison
+    
+    Returns:
+        Dict[str, Any]: Summary and the rows ordered by query index
+    """
+    summary = BatchSummary()
+    rows = [
+        row async for row in iter_batch_comparison(
+            queries, sources, metrics, fields, summary=summary, **kwargs
+        )
+    ]
+    rows.sort(key=lambda row: row["index"])
+    return {"summary": summary.to_dict(), "rows": rows}
@@ -5,14 +5,19 @@ This module provides functionality to apply various boost factors to search resu
 including citation count, publication recency, document type, and refereed status boosts.
 The boost factors are combined using a weighted sum approach.
 """
+import os
+import re
 import logging
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
-from copy import deepcopy
 import math
+
+import numpy as np
 from dateutil.parser import parse
 
-from ..api.models import SearchResult
+from ..api.models import BoostConfig, SearchResult
+from .citation_distributions import get_citation_distributions
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -51,6 +56,76 @@ DEFAULT_DOCTYPE_RANKS = {
     'other': 8         # Default for unknown types
 }
 
+# Number of distinct publication dates whose decoded value is memoized
+PUBDATE_CACHE_SIZE = int(os.environ.get("PUBDATE_CACHE_SIZE", 65536))
+
+# Publication ages (in months) covered by the precomputed recency tables
+RECENCY_TABLE_MONTHS = 12 * 200
+
+# ADS pubdates: YYYY, YYYY-MM or YYYY-MM-DD, where month and day may be 00
+_PUBDATE_PATTERN = re.compile(r"^(\d{4})(?:-(\d{2})(?:-(\d{2}))?)?$")
+
+
+@lru_cache(maxsize=PUBDATE_CACHE_SIZE)
+def decode_pubdate(pubdate: str) -> Optional[int]:
+    """
+    Decode a publication date into a month index (year * 12 + month - 1).
+    
+    ADS-style dates are decoded directly (an unknown "00" month counts as
+    January); anything else falls back to a general-purpose date parse.
+    Results are memoized, so each distinct date string is decoded once.
+    
+    Args:
+        pubdate: Publication date string (e.g. "2020-05-00")
+    
+    Returns:
+        Optional[int]: Month index, or None if the date cannot be parsed
+    """
+    match = _PUBDATE_PATTERN.match(pubdate.strip())
+    if match and int(match.group(2) or 0) <= 12:
+        return int(match.group(1)) * 12 + max(int(match.group(2) or 0), 1) - 1
+    try:
+        pub_date = parse(pubdate)
+    except (ValueError, TypeError, OverflowError):
+        logger.warning(f"Invalid publication date: {pubdate}")
+        return None
+    return pub_date.year * 12 + pub_date.month - 1
+
+
+def reference_month_index(reference_year: Optional[int] = None, now: Optional[datetime] = None) -> int:
+    """
+    Get the month index publication ages are measured from.
+    
+    Args:
+        reference_year: Measure ages from the end (December) of this year
+        now: Current time (read from the clock if omitted)
+    
+    Returns:
+        int: Month index of the reference date
+    """
+    if reference_year:
+        return int(reference_year) * 12 + 11
+    now = now or datetime.now()
+    return now.year * 12 + now.month - 1
+
+
+@lru_cache(maxsize=32)
+def recency_table(multiplier: float) -> np.ndarray:
+    """
+    Get recency boosts 1 / (1 + multiplier * age) for ages 0..RECENCY_TABLE_MONTHS.
+    
+    Args:
+        multiplier: Tuning parameter that controls decay rate
+    
+    Returns:
+        np.ndarray: Read-only table indexed by age in months
+    """
+    with np.errstate(divide='ignore'):
+        table = 1.0 / (1.0 + multiplier * np.arange(RECENCY_TABLE_MONTHS + 1, dtype=np.float64))
+    table.flags.writeable = False
+    return table
+
+
 def calculate_doctype_boost(doctype: str, doctype_ranks: Dict[str, int] = None) -> float:
     """
     Calculate document type boost based on rank using even distribution.
@@ -84,7 +159,11 @@ def calculate_doctype_boost(doctype: str, doctype_ranks: Dict[str, int] = None)
         
     return 1.0 - (rank_index / (num_unique_ranks - 1))
 
-def calculate_recency_boost(pubdate: str, multiplier: float = 1.0) -> float:
+def calculate_recency_boost(
+    pubdate: str,
+    multiplier: float = 1.0,
+    reference_year: Optional[int] = None
+) -> float:
     """
     Calculate recency boost using reciprocal function.
     
@@ -94,25 +173,20 @@ def calculate_recency_boost(pubdate: str, multiplier: float = 1.0) -> float:
     Args:
         pubdate: Publication date string (YYYY-MM-DD)
         multiplier: Tuning parameter that controls decay rate
+        reference_year: Measure age from the end of this year instead of now
         
     Returns:
         float: Boost factor based on recency
     """
-    try:
-        # Parse publication date
-        pub_date = parse(pubdate)
-        now = datetime.now()
-        
-        # Calculate age in months
-        age_months = ((now.year - pub_date.year) * 12 + 
-                     (now.month - pub_date.month))
-        
-        # Apply reciprocal function
-        return 1.0 / (1.0 + multiplier * age_months)
-        
-    except (ValueError, TypeError):
-        logger.warning(f"Invalid publication date: {pubdate}")
+    pub_months = decode_pubdate(str(pubdate)) if pubdate else None
+    if pub_months is None:
         return 0.0
+    
+    # Calculate age in months (papers dated after the reference count as new)
+    age_months = max(reference_month_index(reference_year) - pub_months, 0)
+    
+    # Apply reciprocal function
+    return 1.0 / (1.0 + multiplier * age_months)
 
 def calculate_citation_boost(
     citation_count: int,
@@ -228,6 +302,380 @@ def combine_boost_factors(
             for boost_type, weight in weights.items()
         )
 
+class BoostColumns:
+    """
+    Columnar view of the fields that boosting reads from a result list.
+    
+    Fields are pulled out of the results in a single pass so every boost
+    factor can be computed as a NumPy expression over the whole batch.
+    Results that lack a field (e.g. SearchResult has no pubdate) simply
+    contribute its default. Unweighted factors are cached, so scoring the
+    same batch under many boost configurations computes each of them once.
+    
+    Attributes:
+        size: Number of results
+        citation_count: Citation counts (missing counted as 0)
+        year: Publication years (None when unknown)
+        collection: Collection names (defaulting to 'general')
+        pubdate: Publication date strings (None when unknown)
+        doctype: Document types (None when unknown)
+        refereed: Whether each result is refereed
+        citation_distributions: Citation distributions by collection and year
+            (the loaded distribution tables when not given)
+    """
+    
+    def __init__(
+        self,
+        results: List[Any],
+        citation_distributions: Dict[str, Dict[int, Dict[str, float]]] = None
+    ):
+        self.results = results
+        self.size = len(results)
+        self.citation_distributions = citation_distributions
+        # One reference time per batch, so every config in a sweep sees the same ages
+        self.reference_time = datetime.now()
+        self._factors: Dict[Tuple[Any, ...], np.ndarray] = {}
+        self.year = [getattr(result, 'year', None) for result in results]
+        self.collection = [getattr(result, 'collection', None) or 'general' for result in results]
+        self.pubdate = [getattr(result, 'pubdate', None) for result in results]
+        self.doctype = [getattr(result, 'doctype', None) for result in results]
+        self.citation_count = np.fromiter(
+            (getattr(result, 'citation_count', None) or 0 for result in results),
+            dtype=np.float64, count=self.size
+        )
+        self.refereed = np.fromiter(
+            (bool(getattr(result, 'is_refereed', None)) for result in results),
+            dtype=bool, count=self.size
+        )
+    
+    def field_magnitudes(self, field: str) -> np.ndarray:
+        """
+        Get the value used for a field boost for every result.
+        
+        Numeric fields contribute their value; string and list fields
+        contribute their length as a proxy for relevance.
+        
+        Args:
+            field: Name of the result field
+        
+        Returns:
+            np.ndarray: Field magnitude per result (0 when missing)
+        """
+        key = ('field', field)
+        magnitudes = self._factors.get(key)
+        if magnitudes is None:
+            magnitudes = np.zeros(self.size, dtype=np.float64)
+            for i, result in enumerate(self.results):
+                value = getattr(result, field, None)
+                if not value:
+                    continue
+                if isinstance(value, (int, float)):
+                    magnitudes[i] = value
+                elif isinstance(value, (str, list)):
+                    magnitudes[i] = len(value)
+            self._factors[key] = magnitudes
+        return magnitudes
+    
+    def citation_boosts(self) -> np.ndarray:
+        """Get the unweighted citation boost of every result (see calculate_citation_boosts)."""
+        key = ('citation',)
+        if key not in self._factors:
+            if self.citation_distributions is None:
+                self.citation_distributions = get_citation_distributions()
+            self._factors[key] = calculate_citation_boosts(self, self.citation_distributions)
+        return self._factors[key]
+    
+    def recency_boosts(self, multiplier: float, reference_year: Optional[int] = None) -> np.ndarray:
+        """Get the unweighted recency boost of every result (see calculate_recency_boosts)."""
+        key = ('recency', multiplier, reference_year)
+        if key not in self._factors:
+            self._factors[key] = calculate_recency_boosts(
+                self.pubdate, multiplier, now=self.reference_time, reference_year=reference_year
+            )
+        return self._factors[key]
+    
+    def doctype_boosts(self, doctype_ranks: Dict[str, int]) -> np.ndarray:
+        """Get the doctype boost of every result (see calculate_doctype_boosts)."""
+        key = ('doctype', tuple(sorted(doctype_ranks.items())))
+        if key not in self._factors:
+            self._factors[key] = calculate_doctype_boosts(self.doctype, doctype_ranks)
+        return self._factors[key]
+
+
+def calculate_citation_boosts(
+    columns: BoostColumns,
+    citation_distributions: Dict[str, Dict[int, Dict[str, float]]]
+) -> np.ndarray:
+    """
+    Calculate citation boosts for a batch of results.
+    
+    The median of each (collection, year) distribution is looked up once,
+    then log1p(citations / median) is computed for the whole batch.
+    
+    Args:
+        columns: Columnar result fields
+        citation_distributions: Dictionary of citation distributions by collection and year
+    
+    Returns:
+        np.ndarray: Citation boost per result (0 where no distribution applies)
+    """
+    medians_by_key: Dict[Tuple[str, Any], float] = {}
+    medians = np.empty(columns.size, dtype=np.float64)
+    for i, key in enumerate(zip(columns.collection, columns.year)):
+        median = medians_by_key.get(key)
+        if median is None:
+            dist = citation_distributions.get(key[0], {}).get(key[1], {})
+            if not dist:
+                logger.warning(f"No citation distribution for {key[0]} {key[1]}")
+            median = medians_by_key[key] = dist.get('median', 0) or 0
+        medians[i] = median
+    
+    boosts = np.zeros(columns.size, dtype=np.float64)
+    has_median = medians > 0
+    boosts[has_median] = np.log1p(columns.citation_count[has_median] / medians[has_median])
+    return boosts
+
+
+def calculate_recency_boosts(
+    pubdates: List[Optional[str]],
+    multiplier: float = 1.0,
+    now: Optional[datetime] = None,
+    reference_year: Optional[int] = None
+) -> np.ndarray:
+    """
+    Calculate recency boosts for a batch of publication dates.
+    
+    Dates are decoded through the memoized decode_pubdate, ages are measured
+    from a single reference date, and boosts are read from the precomputed
+    recency table for the multiplier.
+    
+    Args:
+        pubdates: Publication date strings (None when unknown)
+        multiplier: Tuning parameter that controls decay rate
+        now: Reference time (defaults to the current time)
+        reference_year: Measure ages from the end of this year instead of now
+    
+    Returns:
+        np.ndarray: Recency boost per result; NaN where the date is unknown
+            and 0 where it cannot be parsed
+    """
+    reference = reference_month_index(reference_year, now)
+    ages = np.zeros(len(pubdates), dtype=np.int64)
+    known = np.zeros(len(pubdates), dtype=bool)
+    invalid = np.zeros(len(pubdates), dtype=bool)
+    for i, pubdate in enumerate(pubdates):
+        if not pubdate:
+            continue
+        pub_months = decode_pubdate(str(pubdate))
+        if pub_months is None:
+            invalid[i] = True
+        else:
+            known[i] = True
+            ages[i] = reference - pub_months
+    
+    # Papers dated after the reference count as new
+    np.maximum(ages, 0, out=ages)
+    table = recency_table(multiplier)
+    boosts = np.full(len(pubdates), np.nan)
+    in_table = known & (ages <= RECENCY_TABLE_MONTHS)
+    boosts[in_table] = table[ages[in_table]]
+    beyond = known & ~in_table
+    if beyond.any():
+        boosts[beyond] = 1.0 / (1.0 + multiplier * ages[beyond])
+    boosts[invalid] = 0.0
+    return boosts
+
+
+def calculate_doctype_boosts(
+    doctypes: List[Optional[str]],
+    doctype_ranks: Dict[str, int] = None
+) -> np.ndarray:
+    """
+    Calculate document type boosts for a batch of results.
+    
+    Args:
+        doctypes: Document type per result
+        doctype_ranks: Dictionary mapping doctypes to ranks (lower is better)
+    
+    Returns:
+        np.ndarray: Doctype boost per result
+    """
+    boosts_by_doctype = {
+        doctype: calculate_doctype_boost(doctype, doctype_ranks)
+        for doctype in set(doctypes)
+    }
+    return np.fromiter(
+        (boosts_by_doctype[doctype] for doctype in doctypes),
+        dtype=np.float64, count=len(doctypes)
+    )
+
+
+def combine_boost_arrays(
+    boosts: Dict[str, np.ndarray],
+    weights: Dict[str, float] = None,
+    combination_method: str = 'weighted_sum'
+) -> np.ndarray:
+    """
+    Combine per-result boost factors for a whole batch.
+    
+    Vectorized counterpart of combine_boost_factors: NaN marks a factor that
+    does not apply to a result, and negative or missing factors are ignored
+    exactly as the scalar version ignores them.
+    
+    Args:
+        boosts: Dictionary of boost factor arrays (one value per result)
+        weights: Dictionary of weights for each boost factor. Only used for weighted methods.
+        combination_method: Method to use for combining boosts (see combine_boost_factors)
+    
+    Returns:
+        np.ndarray: Combined boost factor per result
+    """
+    if not boosts:
+        return np.zeros(0, dtype=np.float64)
+    
+    size = len(next(iter(boosts.values())))
+    valid = {
+        boost_type: np.isfinite(values) & (values >= 0)
+        for boost_type, values in boosts.items()
+    }
+    any_valid = np.zeros(size, dtype=bool)
+    for mask in valid.values():
+        any_valid |= mask
+    
+    if combination_method == 'simple_product':
+        combined = np.ones(size, dtype=np.float64)
+        for boost_type, values in boosts.items():
+            combined *= np.where(valid[boost_type], values, 1.0)
+    
+    elif combination_method == 'simple_sum':
+        combined = np.zeros(size, dtype=np.float64)
+        for boost_type, values in boosts.items():
+            combined += np.where(valid[boost_type], values, 0.0)
+    
+    elif combination_method == 'weighted_geometric_mean':
+        weights = weights or DEFAULT_BOOST_WEIGHTS
+        combined = np.ones(size, dtype=np.float64)
+        any_positive = np.zeros(size, dtype=bool)
+        for boost_type, weight in weights.items():
+            if boost_type not in boosts:
+                continue
+            positive = valid[boost_type] & (np.nan_to_num(boosts[boost_type]) > 0)
+            combined *= np.where(positive, np.power(np.where(positive, boosts[boost_type], 1.0), weight), 1.0)
+            any_positive |= positive
+        any_valid &= any_positive
+    
+    else:  # weighted_sum (default)
+        weights = weights or DEFAULT_BOOST_WEIGHTS
+        combined = np.zeros(size, dtype=np.float64)
+        for boost_type, weight in weights.items():
+            if boost_type in boosts:
+                combined += np.where(valid[boost_type], boosts[boost_type], 0.0) * weight
+    
+    return np.where(any_valid, combined, 0.0)
+
+
+def calculate_boost_scores(
+    columns: BoostColumns,
+    boost_config: Dict[str, Any]
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Score a batch of results under one boost configuration.
+    
+    Each result starts from an inverse-rank score that is multiplied by
+    exp(combined boost).
+    
+    Args:
+        columns: Columnar result fields
+        boost_config: Boost configuration (see apply_all_boosts)
+    
+    Returns:
+        Tuple[np.ndarray, Dict[str, np.ndarray]]: Boosted score per result and
+            the individual boost factors (NaN where a factor does not apply)
+    """
+    # Get boost configuration
+    citation_boost = boost_config.get('citation_boost', 0.0)
+    recency_boost = boost_config.get('recency_boost', 0.0)
+    recency_multiplier = boost_config.get('recency_multiplier', 1.0)
+    reference_year = boost_config.get('reference_year')
+    doctype_boosts = boost_config.get('doctype_boosts', {})
+    field_boosts = boost_config.get('field_boosts', {})
+    refereed_boost = boost_config.get('refereed_boost', 0.0)
+    combination_method = boost_config.get('boost_combination_method', 'weighted_sum')
+    boost_weights = boost_config.get('boost_weights', DEFAULT_BOOST_WEIGHTS)
+    
+    # Calculate individual boost factors (NaN where a factor does not apply)
+    boosts: Dict[str, np.ndarray] = {}
+    if citation_boost > 0:
+        boosts['citation'] = columns.citation_boosts() * citation_boost
+    if recency_boost > 0:
+        boosts['recency'] = columns.recency_boosts(recency_multiplier, reference_year) * recency_boost
+    if doctype_boosts:
+        boosts['doctype'] = columns.doctype_boosts(doctype_boosts)
+    if field_boosts:
+        field_boost = np.zeros(columns.size, dtype=np.float64)
+        for field, weight in field_boosts.items():
+            if weight > 0:
+                field_boost += weight * columns.field_magnitudes(field)
+        boosts['field'] = field_boost
+    if refereed_boost > 0:
+        boosts['refereed'] = columns.refereed.astype(np.float64) * refereed_boost
+    
+    # Combine boost factors and apply them to the inverse-rank scores
+    if boosts:
+        final_boost = combine_boost_arrays(boosts, boost_weights, combination_method)
+    else:
+        final_boost = np.zeros(columns.size, dtype=np.float64)
+    original_scores = 1.0 / np.arange(1, columns.size + 1, dtype=np.float64)
+    scores = original_scores * np.exp(final_boost)
+    
+    return scores, boosts
+
+
+def boost_config_to_dict(boost_config: BoostConfig) -> Dict[str, Any]:
+    """Convert a BoostConfig model into the dictionary used by the boost functions."""
+    return {
+        "citation_boost": boost_config.citation_boost,
+        "min_citations": boost_config.min_citations,
+        "recency_boost": boost_config.recency_boost,
+        "reference_year": boost_config.reference_year,
+        "doctype_boosts": boost_config.doctype_boosts,
+        "field_boosts": boost_config.field_boosts
+    }
+
+
+def sweep_boost_configs(
+    results: List[SearchResult],
+    boost_configs: List[Dict[str, Any]],
+    citation_distributions: Dict[str, Dict[int, Dict[str, float]]] = None
+) -> np.ndarray:
+    """
+    Rank one candidate set under many boost configurations.
+    
+    Fields are extracted and unweighted boost factors computed once for the
+    whole sweep; each configuration then only combines, scores and sorts.
+    A configuration that fails to apply keeps the original order, as
+    apply_all_boosts does.
+    
+    Args:
+        results: Candidate results, in their original order
+        boost_configs: Boost configurations (see apply_all_boosts)
+        citation_distributions: Dictionary of citation distributions by collection and year
+    
+    Returns:
+        np.ndarray: (configs x results) matrix whose row c lists the original
+            indices of the results in their boosted order under config c
+    """
+    columns = BoostColumns(results, citation_distributions)
+    orders = np.tile(np.arange(columns.size), (len(boost_configs), 1))
+    for c, boost_config in enumerate(boost_configs):
+        try:
+            scores, _ = calculate_boost_scores(columns, boost_config)
+            orders[c] = np.argsort(-scores, kind='stable')
+        except Exception as e:
+            logger.error(f"Error applying boost config {c}: {str(e)}")
+    return orders
+
+
 async def apply_all_boosts(
     results: List[SearchResult],
     boost_config: Dict[str, Any],
@@ -236,17 +684,24 @@ async def apply_all_boosts(
     """
     Apply all configured boost factors to search results.
     
+    Boosting is columnar: the needed fields are extracted into NumPy arrays
+    once, every boost factor and the combination are computed for the whole
+    batch, and the results are ordered with a single argsort. The returned
+    results are shallow copies that share unchanged data with the inputs.
+    
     Args:
         results: List of search results to boost
         boost_config: Dictionary containing boost configuration including:
             - citation_boost: Overall strength of citation boost
             - recency_boost: Overall strength of recency boost
             - recency_multiplier: Controls decay rate of recency boost
+            - reference_year: Measure publication ages from the end of this year
             - doctype_boosts: Document type boost factors
             - field_boosts: Field-specific boost factors
             - boost_combination_method: Method to combine boosts
             - boost_weights: Weights for weighted combination methods
         citation_distributions: Dictionary of citation distributions by collection and year
+            (defaults to the loaded citation distribution tables)
         
     Returns:
         List[SearchResult]: List of boosted search results
@@ -255,112 +710,36 @@ async def apply_all_boosts(
         return []
         
     try:
-        # Create a deep copy of results to avoid modifying originals
-        boosted_results = [deepcopy(result) for result in results]
+        columns = BoostColumns(results, citation_distributions)
+        scores, boosts = calculate_boost_scores(columns, boost_config)
         
-        # Get boost configuration
-        citation_boost = boost_config.get('citation_boost', 0.0)
-        recency_boost = boost_config.get('recency_boost', 0.0)
-        recency_multiplier = boost_config.get('recency_multiplier', 1.0)
-        doctype_boosts = boost_config.get('doctype_boosts', {})
-        field_boosts = boost_config.get('field_boosts', {})
-        combination_method = boost_config.get('boost_combination_method', 'weighted_sum')
-        boost_weights = boost_config.get('boost_weights', DEFAULT_BOOST_WEIGHTS)
-
-        # Initialize scores and source_id for each result
-        for i, result in enumerate(boosted_results):
-            # Initialize _score based on rank (higher rank = higher score)
-            result._score = 1.0 / (i + 1)  # Inverse of rank for initial score
-            result.source_id = 'boosted'  # Mark as boosted result
-            
-            # Initialize boost factors
-            result.boost_factors = {
-                'citation': 0.0,
-                'recency': 0.0,
-                'doctype': 0.0,
-                'refereed': 0.0,
-                'field': 0.0
-            }
-            
-            # Store original score and rank
-            result.original_score = result._score
-            result.original_rank = i + 1
-            
-            # Calculate individual boost factors
-            boosts = {}
-            
-            # Citation boost
-            if citation_boost > 0:
-                base_boost = calculate_citation_boost(
-                    result.citation_count or 0,
-                    result.collection or 'general',
-                    result.year,
-                    citation_distributions or {}
-                )
-                boosts['citation'] = base_boost * citation_boost
-                result.boost_factors['citation'] = boosts['citation']
-            
-            # Recency boost
-            if recency_boost > 0 and result.pubdate:
-                base_boost = calculate_recency_boost(
-                    result.pubdate,
-                    recency_multiplier
-                )
-                boosts['recency'] = base_boost * recency_boost
-                result.boost_factors['recency'] = boosts['recency']
-            
-            # Document type boost
-            if doctype_boosts:
-                base_boost = calculate_doctype_boost(
-                    result.doctype,
-                    doctype_boosts
-                )
-                boosts['doctype'] = base_boost
-                result.boost_factors['doctype'] = boosts['doctype']
-            
-            # Field boost
-            if field_boosts:
-                field_boost = 0.0
-                for field, weight in field_boosts.items():
-                    if weight > 0:
-                        # Get the field value from the result
-                        field_value = getattr(result, field, None)
-                        if field_value:
-                            # For numeric fields, use the value directly
-                            if isinstance(field_value, (int, float)):
-                                field_boost += weight * field_value
-                            # For string fields, use length as a proxy for relevance
-                            elif isinstance(field_value, str):
-                                field_boost += weight * len(field_value)
-                            # For list fields, use length as a proxy for relevance
-                            elif isinstance(field_value, list):
-                                field_boost += weight * len(field_value)
-                boosts['field'] = field_boost
-                result.boost_factors['field'] = boosts['field']
-            
-            # Refereed boost
-            if boost_config.get('refereed_boost', 0.0) > 0:
-                boosts['refereed'] = calculate_refereed_boost(
-                    result.is_refereed or False
-                ) * boost_config['refereed_boost']
-                result.boost_factors['refereed'] = boosts['refereed']
-            
-            # Combine boost factors using the specified method
-            final_boost = combine_boost_factors(
-                boosts, 
-                boost_weights,
-                combination_method
-            )
-            
-            # Apply final boost to score
-            result._score *= math.exp(final_boost)
-            result.boosted_score = result._score
+        # Stable descending sort keeps the original order among equal scores
+        order = np.argsort(-scores, kind='stable')
+        
+        boost_types = ('citation', 'recency', 'doctype', 'refereed', 'field')
+        factor_columns = {
+            boost_type: np.where(np.isfinite(boosts[boost_type]), boosts[boost_type], 0.0).tolist()
+            if boost_type in boosts else None
+            for boost_type in boost_types
+        }
+        score_list = scores.tolist()
         
-        # Sort by boosted score and update ranks
-        boosted_results.sort(key=lambda x: x._score, reverse=True)
-        for i, result in enumerate(boosted_results):
-            result.rank = i + 1
-            result.rank_change = result.original_rank - result.rank
+        boosted_results = []
+        for new_rank, i in enumerate(order.tolist(), start=1):
+            boosted = results[i].model_copy(update={
+                'source_id': 'boosted',  # Mark as boosted result
+                'boost_factors': {
+                    boost_type: values[i] if values is not None else 0.0
+                    for boost_type, values in factor_columns.items()
+                },
+                'original_score': 1.0 / (i + 1),
+                'original_rank': i + 1,
+                'boosted_score': score_list[i],
+                'rank': new_rank,
+                'rank_change': i + 1 - new_rank
+            })
+            boosted._score = score_list[i]
+            boosted_results.append(boosted)
         
         return boosted_results
         
@@ -0,0 +1,384 @@
+"""
+Citation distribution tables for the search-comparisons application.
+
+This module builds per-collection, per-year citation percentile tables from
+a local snapshot of search results, persists them as a compact NumPy archive
+and loads them lazily. The tables supply the `citation_distributions`
+mapping expected by the boost service, so citation boosts are measured
+against the citation counts typical for a paper's collection and year.
+"""
+import os
+import io
+import json
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
+
+import numpy as np
+
+from ..utils.cache import CACHE_DIR
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Location of the persisted percentile tables
+CITATION_DISTRIBUTIONS_PATH = os.environ.get(
+    "CITATION_DISTRIBUTIONS_PATH", os.path.join(CACHE_DIR, "citation_distributions.npz")
+)
+
+# Minimum number of papers needed before a collection/year gets a distribution
+CITATION_DISTRIBUTION_MIN_COUNT = int(os.environ.get("CITATION_DISTRIBUTION_MIN_COUNT", 10))
+
+# Collection every paper also counts towards (results without a collection use it)
+GENERAL_COLLECTION = "general"
+
+# Percentiles stored per collection and year (0..100)
+PERCENTILES = np.arange(101)
+
+
+class CitationDistributionTable:
+    """
+    Citation percentiles indexed by collection and publication year.
+    
+    Percentiles are held in a dense (collections x years x 101) array, so
+    looking up a percentile is a dictionary lookup plus an array index.
+    
+    Attributes:
+        collections: Collection names, in array order
+        min_year: Publication year of the first year column
+        percentiles: Citation count at each percentile 0..100
+        counts: Number of papers behind each collection/year distribution
+    """
+    
+    def __init__(
+        self,
+        collections: List[str],
+        min_year: int,
+        percentiles: np.ndarray,
+        counts: np.ndarray
+    ):
+        self.collections = list(collections)
+        self.min_year = int(min_year)
+        self.percentiles = percentiles
+        self.counts = counts
+        self._collection_index = {name: i for i, name in enumerate(self.collections)}
+        self._distributions: Optional[Dict[str, Dict[int, Dict[str, float]]]] = None
+    
+    @property
+    def years(self) -> range:
+        """Publication years covered by the table."""
+        return range(self.min_year, self.min_year + self.counts.shape[1])
+    
+    def _cell(self, collection: str, year: Optional[int]) -> Optional[Tuple[int, int]]:
+        c = self._collection_index.get(collection)
+        if c is None or year is None:
+            return None
+        y = int(year) - self.min_year
+        if y < 0 or y >= self.counts.shape[1] or self.counts[c, y] == 0:
+            return None
+        return c, y
+    
+    def percentile(self, collection: str, year: Optional[int], q: int) -> Optional[float]:
+        """
+        Get the citation count at a percentile.
+        
+        Args:
+            collection: Collection name
+            year: Publication year
+            q: Percentile (0..100)
+        
+        Returns:
+            Optional[float]: Citation count, or None if there is no distribution
+        """
+        cell = self._cell(collection, year)
+        if cell is None:
+            return None
+        return float(self.percentiles[cell[0], cell[1], q])
+    
+    def median(self, collection: str, year: Optional[int]) -> Optional[float]:
+        """Get the median citation count of a collection/year (None if unknown)."""
+        return self.percentile(collection, year, 50)
+    
+    def percentile_rank(self, collection: str, year: Optional[int], citation_count: int) -> Optional[float]:
+        """
+        Get the percentile a citation count reaches within its collection/year.
+        
+        Args:
+            collection: Collection name
+            year: Publication year
+            citation_count: Citation count to rank
+        
+        Returns:
+            Optional[float]: Highest percentile (0..100) not above the count,
+                or None if there is no distribution
+        """
+        cell = self._cell(collection, year)
+        if cell is None:
+            return None
+        row = self.percentiles[cell[0], cell[1]]
+        return float(max(np.searchsorted(row, citation_count, side="right") - 1, 0))
+    
+    def as_distributions(self) -> Dict[str, Dict[int, Dict[str, float]]]:
+        """
+        Get the tables in the format used by the boost service.
+        
+        Returns:
+            Dict[str, Dict[int, Dict[str, float]]]: collection -> year ->
+                median, p25, p75, p90, p99 and count
+        """
+        if self._distributions is None:
+            distributions: Dict[str, Dict[int, Dict[str, float]]] = {}
+            for c, collection in enumerate(self.collections):
+                by_year = distributions.setdefault(collection, {})
+                for y in np.flatnonzero(self.counts[c]).tolist():
+                    row = self.percentiles[c, y]
+                    by_year[self.min_year + y] = {
+                        "median": float(row[50]),
+                        "p25": float(row[25]),
+                        "p75": float(row[75]),
+                        "p90": float(row[90]),
+                        "p99": float(row[99]),
+                        "count": int(self.counts[c, y])
+                    }
+            self._distributions = distributions
+        return self._distributions
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the table for diagnostics.
+        
+        Returns:
+            Dict[str, Any]: Collections, year range and number of populated cells
+        """
+        return {
+            "collections": self.collections,
+            "years": [self.min_year, self.min_year + self.counts.shape[1] - 1],
+            "distributions": int(np.count_nonzero(self.counts)),
+            "papers": int(self.counts[self._collection_index[GENERAL_COLLECTION]].sum())
+            if GENERAL_COLLECTION in self._collection_index else int(self.counts.sum())
+        }
+    
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[Tuple[Iterable[str], int, int]],
+        min_count: int = CITATION_DISTRIBUTION_MIN_COUNT
+    ) -> "CitationDistributionTable":
+        """
+        Build percentile tables from (collections, year, citation_count) records.
+        
+        Every record also counts towards the "general" collection.
+        
+        Args:
+            records: Collections, publication year and citation count per paper
+            min_count: Minimum number of papers for a collection/year distribution
+        
+        Returns:
+            CitationDistributionTable: The built table
+        """
+        collection_index: Dict[str, int] = {GENERAL_COLLECTION: 0}
+        rows: List[int] = []
+        years: List[int] = []
+        citations: List[int] = []
+        for collections, year, citation_count in records:
+            names = {GENERAL_COLLECTION, *collections}
+            for name in names:
+                rows.append(collection_index.setdefault(name, len(collection_index)))
+                years.append(year)
+                citations.append(citation_count)
+        
+        collections = list(collection_index)
+        if not rows:
+            return cls(collections, 0, np.zeros((len(collections), 0, len(PERCENTILES)), np.float32),
+                       np.zeros((len(collections), 0), np.int32))
+        
+        row_array = np.asarray(rows, dtype=np.int32)
+        year_array = np.asarray(years, dtype=np.int32)
+        citation_array = np.asarray(citations, dtype=np.float64)
+        min_year = int(year_array.min())
+        year_offsets = year_array - min_year
+        shape = (len(collections), int(year_offsets.max()) + 1)
+        
+        percentiles = np.zeros(shape + (len(PERCENTILES),), dtype=np.float32)
+        counts = np.zeros(shape, dtype=np.int32)
+        
+        # Group papers by cell with one sort, then take percentiles per group
+        cells = row_array * shape[1] + year_offsets
+        order = np.argsort(cells, kind="stable")
+        sorted_cells = cells[order]
+        boundaries = np.flatnonzero(np.diff(sorted_cells)) + 1
+        for group in np.split(order, boundaries):
+            if len(group) < min_count:
+                continue
+            c, y = divmod(int(cells[group[0]]), shape[1])
+            percentiles[c, y] = np.percentile(citation_array[group], PERCENTILES)
+            counts[c, y] = len(group)
+        
+        return cls(collections, min_year, percentiles, counts)
+    
+    def save(self, path: str = CITATION_DISTRIBUTIONS_PATH) -> None:
+        """
+        Persist the table as a compressed NumPy archive (written atomically).
+        
+        Args:
+            path: Destination file
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            collections=np.asarray(self.collections, dtype=str),
+            min_year=np.asarray(self.min_year),
+            percentiles=self.percentiles,
+            counts=self.counts
+        )
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+        logger.info(f"Saved citation distributions for {len(self.collections)} collections to {path}")
+    
+    @classmethod
+    def load(cls, path: str = CITATION_DISTRIBUTIONS_PATH) -> "CitationDistributionTable":
+        """
+        Load a table saved with save().
+        
+        Args:
+            path: Archive file
+        
+        Returns:
+            CitationDistributionTable: The loaded table
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            return cls(
+                archive["collections"].tolist(),
+                int(archive["min_year"]),
+                archive["percentiles"],
+                archive["counts"]
+            )
+
+
+def _snapshot_docs(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield documents from a JSON Lines file, a JSON list or an ADS API response."""
+    with open(path, "r") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("response", {}).get("docs", data.get("results", []))
+    yield from data
+
+
+def records_from_snapshot(paths: Iterable[str]) -> Iterator[Tuple[List[str], int, int]]:
+    """
+    Extract citation records from snapshot files of search results.
+    
+    Accepts ADS documents (collections from `database`) as well as dumped
+    SearchResult records (`collection` if present). Documents without a
+    usable year are skipped; a missing citation count counts as 0.
+    
+    Args:
+        paths: Snapshot files (.jsonl, or .json holding a list or ADS response)
+    
+    Yields:
+        Tuple[List[str], int, int]: Collections, publication year and citation count
+    """
+    for path in paths:
+        for doc in _snapshot_docs(path):
+            try:
+                year = int(str(doc.get("year", ""))[:4])
+            except ValueError:
+                continue
+            collections = doc.get("database", doc.get("collection")) or []
+            if isinstance(collections, str):
+                collections = [collections]
+            yield [str(c).lower() for c in collections], year, int(doc.get("citation_count") or 0)
+
+
+def build_citation_distributions(
+    snapshot_paths: Iterable[str],
+    output_path: str = CITATION_DISTRIBUTIONS_PATH,
+    min_count: int = CITATION_DISTRIBUTION_MIN_COUNT
+) -> CitationDistributionTable:
+    """
+    Build percentile tables from snapshot files and persist them.
+    
+    Args:
+        snapshot_paths: Snapshot files of search results
+        output_path: Where to save the table
+        min_count: Minimum number of papers for a collection/year distribution
+    
+    Returns:
+        CitationDistributionTable: The built table (also installed as the active one)
+    """
+    table = CitationDistributionTable.from_records(records_from_snapshot(snapshot_paths), min_count)
+    table.save(output_path)
+    set_citation_distribution_table(table)
+    return table
+
+
+# Lazily loaded active table
+_table: Optional[CitationDistributionTable] = None
+_table_loaded = False
+_table_lock = threading.Lock()
+
+
+def load_citation_distributions(path: str = CITATION_DISTRIBUTIONS_PATH) -> Optional[CitationDistributionTable]:
+    """
+    Load the active table from disk if it has not been loaded yet.
+    
+    Args:
+        path: Archive file
+    
+    Returns:
+        Optional[CitationDistributionTable]: The table, or None if none is available
+    """
+    global _table, _table_loaded
+    if _table_loaded:
+        return _table
+    with _table_lock:
+        if not _table_loaded:
+            if os.path.exists(path):
+                try:
+                    _table = CitationDistributionTable.load(path)
+                    logger.info(f"Loaded citation distributions from {path}")
+                except (OSError, ValueError, KeyError) as e:
+                    logger.error(f"Error loading citation distributions from {path}: {str(e)}")
+            else:
+                logger.warning(f"No citation distributions at {path}; citation boosts will be 0")
+            _table_loaded = True
+    return _table
+
+
+def get_citation_distribution_table() -> Optional[CitationDistributionTable]:
+    """Get the active table, loading it on first use."""
+    return load_citation_distributions()
+
+
+def set_citation_distribution_table(table: Optional[CitationDistributionTable]) -> None:
+    """
+    Replace the active table (None unloads it so the next use reloads from disk).
+    
+    Args:
+        table: The table to install
+    """
+    global _table, _table_loaded
+    with _table_lock:
+        _table = table
+        _table_loaded = table is not None
+
+
+def get_citation_distributions() -> Dict[str, Dict[int, Dict[str, float]]]:
+    """
+    Get the active citation distributions in the boost service format.
+    
+    Returns:
+        Dict[str, Dict[int, Dict[str, float]]]: collection -> year -> statistics
+            (empty when no table is available)
+    """
+    table = load_citation_distributions()
+    return table.as_distributions() if table else {}
@@ -0,0 +1,215 @@
+"""
+Judgement enrichment for the search-comparisons application.
+
+This module annotates search results with the human judgements already
+recorded for them (mean score and count). All results of a request are
+looked up together: identifiers are first read from a short-lived
+in-process cache, and the misses are resolved with one aggregate query run
+on the database thread pool.
+"""
+import os
+import re
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote
+
+from ..api.models import SearchResult
+from ..core.database import SessionLocal, run_in_db
+from .judgement_service import JudgementService
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Seconds a record's judgement summary is reused before it is read again
+JUDGEMENT_SUMMARY_TTL = int(os.environ.get("JUDGEMENT_SUMMARY_TTL", 60))
+
+# Maximum number of records kept in the summary cache
+JUDGEMENT_SUMMARY_CACHE_SIZE = int(os.environ.get("JUDGEMENT_SUMMARY_CACHE_SIZE", 50000))
+
+ADS_ABSTRACT_URL = re.compile(r"/abs/([^/]+)/")
+
+
+class JudgementSummaryCache:
+    """
+    TTL cache of judgement summaries by record identifier.
+    
+    Records without judgements are cached too (as None), so unjudged results
+    do not cause a database lookup on every request.
+    """
+    
+    def __init__(self, ttl: float = JUDGEMENT_SUMMARY_TTL, max_size: int = JUDGEMENT_SUMMARY_CACHE_SIZE):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            ttl: Seconds an entry stays valid
+            max_size: Entries kept before expired ones are dropped
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get_many(self, keys: Iterable[str]) -> Tuple[Dict[str, Optional[Dict[str, Any]]], List[str]]:
+        """
+        Look up many identifiers.
+        
+        Args:
+            keys: Record identifiers
+        
+        Returns:
+            Tuple[Dict[str, Optional[Dict[str, Any]]], List[str]]: Cached
+                summaries (None for records known to be unjudged) and the
+                identifiers that are missing or expired
+        """
+        now = time.monotonic()
+        found: Dict[str, Optional[Dict[str, Any]]] = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry and entry[0] > now:
+                    found[key] = entry[1]
+                else:
+                    missing.append(key)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+    
+    def put_many(self, summaries: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """
+        Store summaries for a set of identifiers.
+        
+        Args:
+            summaries: Summary (or None) by record identifier
+        """
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) + len(summaries) > self.max_size:
+                self._entries = {key: entry for key, entry in self._entries.items() if entry[0] > now}
+                if len(self._entries) + len(summaries) > self.max_size:
+                    self._entries.clear()
+            expires = now + self.ttl
+            for key, summary in summaries.items():
+                self._entries[key] = (expires, summary)
+    
+    def invalidate(self, keys: Optional[Iterable[str]] = None) -> None:
+        """
+        Drop cached summaries.
+        
+        Args:
+            keys: Identifiers to drop (all entries if None)
+        """
+        with self._lock:
+            if keys is None:
+                self._entries.clear()
+                return
+            for key in keys:
+                self._entries.pop(key, None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit counts."""
+        return {"entries": len(self._entries), "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+
+_summary_cache = JudgementSummaryCache()
+
+
+def get_summary_cache() -> JudgementSummaryCache:
+    """Get the process-wide judgement summary cache."""
+    return _summary_cache
+
+
+def result_bibcode(result: SearchResult) -> Optional[str]:
+    """
+    Get the ADS bibcode of a result from its abstract URL.
+    
+    Args:
+        result: Search result
+    
+    Returns:
+        Optional[str]: The bibcode, or None for results without an ADS URL
+    """
+    match = ADS_ABSTRACT_URL.search(result.url or "")
+    return unquote(match.group(1)) if match else None
+
+
+def _load_summaries(titles: List[str], bibcodes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Read judgement summaries in a session of their own (runs on the database thread pool)."""
+    with SessionLocal() as db:
+        return JudgementService(db).get_judgement_summaries(titles, bibcodes)
+
+
+async def get_judgement_summaries(titles: List[str], bibcodes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Get judgement summaries for many records, through the summary cache.
+    
+    Args:
+        titles: Record titles
+        bibcodes: ADS bibcodes
+    
+    Returns:
+        Dict[str, Dict[str, Any]]: Mean score and count by identifier, for judged records only
+    """
+    cache = get_summary_cache()
+    found, missing = cache.get_many(dict.fromkeys(bibcodes + titles))
+    if missing:
+        missing_set = set(missing)
+        loaded = await run_in_db(
+            _load_summaries,
+            [title for title in titles if title in missing_set],
+            [bibcode for bibcode in bibcodes if bibcode in missing_set]
+        )
+        fetched = {key: loaded.get(key) for key in missing}
+        # Title matches that carry a bibcode come back keyed by it; cache those too
+        fetched.update({key: summary for key, summary in loaded.items() if key not in fetched})
+        cache.put_many(fetched)
+        found.update(fetched)
+    return {key: summary for key, summary in found.items() if summary is not None}
+
+
+async def annotate_with_judgements(results: Dict[str, List[SearchResult]]) -> Dict[str, Any]:
+    """
+    Attach judgement summaries to results from every source.
+    
+    Results are replaced with annotated copies (never modified in place,
+    since result lists may be shared with the result cache). A result takes
+    the summary of its bibcode if judged, otherwise that of its title.
+    
+    Args:
+        results: Results by source (updated in place with annotated copies)
+    
+    Returns:
+        Dict[str, Any]: Number of annotated results and of identifiers looked up
+    """
+    titles: Dict[str, None] = {}
+    bibcodes: Dict[str, None] = {}
+    for source_results in results.values():
+        for result in source_results or []:
+            if result.title:
+                titles[result.title] = None
+            bibcode = result_bibcode(result)
+            if bibcode:
+                bibcodes[bibcode] = None
+    
+    summaries = await get_judgement_summaries(list(titles), list(bibcodes))
+    
+    annotated = 0
+    for source, source_results in results.items():
+        if not source_results:
+            continue
+        updated = []
+        for result in source_results:
+            bibcode = result_bibcode(result)
+            summary = (summaries.get(bibcode) if bibcode else None) or summaries.get(result.title)
+            if summary:
+                result = result.model_copy(update={"judgement": summary})
+                annotated += 1
+            updated.append(result)
+        results[source] = updated
+    
+    return {"annotated": annotated, "records": len(titles) + len(bibcodes)}
@@ -1,12 +1,14 @@
 """Service for managing search result judgements."""
 
-from typing import List, Optional, Dict, Any
-from uuid import UUID
+from typing import List, Optional, Dict, Any, Tuple
+from uuid import UUID, uuid4
 from datetime import datetime
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select, insert, update, tuple_, func
 
+from app.core.config import settings
 from app.models.judgement import Judgement
 
 
@@ -45,7 +47,7 @@ class JudgementService:
         judgement_score: float,
         judgement_note: Optional[str] = None,
     ) -> Judgement:
-        """Create a new judgement.
+        """Create a judgement, replacing the rater's judgement of the same record.
 
         Args:
             rater_id: Unique identifier for the rater.
@@ -59,25 +61,149 @@ class JudgementService:
             judgement_note: Optional note from the rater.
 
         Returns:
-            Judgement: The created judgement.
+            Judgement: The created or updated judgement.
         """
-        judgement = Judgement(
-            rater_id=rater_id,
-            query=query,
-            information_need=information_need,
-            record_title=record_title,
-            publication_year=publication_year,
-            record_bibcode=record_bibcode,
-            record_source=record_source,
-            judgement_score=judgement_score,
-            judgement_note=judgement_note,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
+        # Goes through the upsert so a repeat judgement updates the existing row
+        # instead of violating the unique (rater, query, bibcode) index
+        return self.upsert_judgements(rater_id, [{
+            "query": query,
+            "information_need": information_need,
+            "record_title": record_title,
+            "publication_year": publication_year,
+            "record_bibcode": record_bibcode,
+            "record_source": record_source,
+            "judgement_score": judgement_score,
+            "judgement_note": judgement_note,
+        }])[0]
+
+    def upsert_judgements(
+        self,
+        rater_id: UUID,
+        judgements: List[Dict[str, Any]],
+        chunk_size: Optional[int] = None,
+    ) -> List[Judgement]:
+        """Create or update many judgements in a single transaction.
+
+        A judgement replaces the rater's existing judgement for the same query
+        and bibcode; judgements without a bibcode are always inserted. Within
+        the batch, the last judgement for a query/bibcode pair wins. Rows are
+        written in chunks, each costing one lookup, one executemany UPDATE and
+        one executemany INSERT, and the whole batch is committed once. If a
+        concurrent batch inserts the same judgement between the lookup and
+        the insert, the unique index rejects it and the batch is retried once,
+        now updating that row.
+
+        Args:
+            rater_id: Unique identifier for the rater.
+            judgements: Judgement fields as accepted by create_judgement.
+            chunk_size: Rows per chunk (defaults to JUDGEMENT_BATCH_CHUNK_SIZE).
+
+        Returns:
+            List[Judgement]: The stored judgements, one per distinct judgement
+                in order of first appearance.
+        """
+        chunk_size = max(1, chunk_size or settings.JUDGEMENT_BATCH_CHUNK_SIZE)
+        now = datetime.utcnow()
+
+        # Collapse repeats of the same query/bibcode, keeping the first position
+        rows: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        for index, data in enumerate(judgements):
+            bibcode = data.get("record_bibcode")
+            key = ("bibcode", data["query"], bibcode) if bibcode else ("row", index)
+            rows[key] = data
+
+        items = list(rows.items())
+        for attempt in range(2):
+            try:
+                ids = self._write_judgement_chunks(rater_id, items, chunk_size, now)
+                self.db.commit()
+                break
+            except IntegrityError:
+                self.db.rollback()
+                if attempt:
+                    raise
+            except Exception:
+                self.db.rollback()
+                raise
+
+        stored: Dict[UUID, Judgement] = {}
+        for start in range(0, len(ids), chunk_size):
+            chunk_ids = ids[start:start + chunk_size]
+            stored.update(
+                (judgement.id, judgement)
+                for judgement in self.db.scalars(select(Judgement).where(Judgement.id.in_(chunk_ids)))
+            )
+        return [stored[judgement_id] for judgement_id in ids]
+
+    def _find_existing_judgements(
+        self, rater_id: UUID, pairs: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], UUID]:
+        """Find the rater's judgements for query/bibcode pairs.
+
+        Args:
+            rater_id: Unique identifier for the rater.
+            pairs: (query, bibcode) pairs to look up.
+
+        Returns:
+            Dict[Tuple[str, str], UUID]: Judgement ID by pair, the oldest one
+                for databases that predate the unique index.
+        """
+        existing: Dict[Tuple[str, str], UUID] = {}
+        matches = self.db.execute(
+            select(Judgement.id, Judgement.query, Judgement.record_bibcode)
+            .where(Judgement.rater_id == rater_id)
+            .where(tuple_(Judgement.query, Judgement.record_bibcode).in_(pairs))
+            .order_by(Judgement.created_at)
         )
-        self.db.add(judgement)
-        self.db.commit()
-        self.db.refresh(judgement)
-        return judgement
+        for judgement_id, query, bibcode in matches:
+            existing.setdefault((query, bibcode), judgement_id)
+        return existing
+
+    def _write_judgement_chunks(
+        self,
+        rater_id: UUID,
+        items: List[Tuple[Tuple[Any, ...], Dict[str, Any]]],
+        chunk_size: int,
+        now: datetime,
+    ) -> List[UUID]:
+        """Update or insert collapsed judgements chunk by chunk, without committing.
+
+        Args:
+            rater_id: Unique identifier for the rater.
+            items: (key, fields) pairs as collapsed by upsert_judgements.
+            chunk_size: Rows per chunk.
+            now: Timestamp for created_at/updated_at.
+
+        Returns:
+            List[UUID]: ID of the stored judgement for each item.
+        """
+        ids: List[UUID] = []
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            pairs = [key[1:] for key, _ in chunk if key[0] == "bibcode"]
+            existing = self._find_existing_judgements(rater_id, pairs) if pairs else {}
+
+            inserts, updates = [], []
+            for key, data in chunk:
+                judgement_id = existing.get(key[1:]) if key[0] == "bibcode" else None
+                if judgement_id is None:
+                    judgement_id = uuid4()
+                    inserts.append({
+                        **data,
+                        "id": judgement_id,
+                        "rater_id": rater_id,
+                        "created_at": now,
+                        "updated_at": now,
+                    })
+                else:
+                    updates.append({**data, "id": judgement_id, "updated_at": now})
+                ids.append(judgement_id)
+
+            if updates:
+                self.db.execute(update(Judgement), updates)
+            if inserts:
+                self.db.execute(insert(Judgement), inserts)
+        return ids
 
     def get_judgements_by_query(
         self, query: str, record_bibcode: Optional[str] = None
@@ -119,22 +245,33 @@ class JudgementService:
         Returns:
             Optional[float]: The average score, or None if no judgements exist.
         """
-        judgements = self.get_judgements_by_query(query, record_bibcode)
-        if not judgements:
-            return None
-        return sum(j.judgement_score for j in judgements) / len(judgements)
+        filters = [Judgement.query == query]
+        if record_bibcode:
+            filters.append(Judgement.record_bibcode == record_bibcode)
+        return self.db.execute(
+            select(func.avg(Judgement.judgement_score)).where(*filters)
+        ).scalar()
 
     def get_judgement_stats(self, query: str) -> Dict[str, Any]:
         """Get statistics about judgements for a query.
 
+        The statistics are computed by the database, so no judgement rows
+        are loaded.
+
         Args:
             query: The search query to get stats for.
 
         Returns:
             Dict[str, Any]: Dictionary containing judgement statistics.
         """
-        judgements = self.get_judgements_by_query(query)
-        if not judgements:
+        total, average, raters = self.db.execute(
+            select(
+                func.count(Judgement.id),
+                func.avg(Judgement.judgement_score),
+                func.count(func.distinct(Judgement.rater_id)),
+            ).where(Judgement.query == query)
+        ).one()
+        if not total:
             return {
                 "total_judgements": 0,
                 "average_score": None,
@@ -142,17 +279,17 @@ class JudgementService:
                 "source_distribution": {},
             }
 
-        scores = [j.judgement_score for j in judgements]
-        rater_ids = {j.rater_id for j in judgements}
-        sources = {}
-        for j in judgements:
-            sources[j.record_source] = sources.get(j.record_source, 0) + 1
+        sources = self.db.execute(
+            select(Judgement.record_source, func.count(Judgement.id))
+            .where(Judgement.query == query)
+            .group_by(Judgement.record_source)
+        ).all()
 
         return {
-            "total_judgements": len(judgements),
-            "average_score": sum(scores) / len(scores),
-            "unique_raters": len(rater_ids),
-            "source_distribution": sources,
+            "total_judgements": total,
+            "average_score": average,
+            "unique_raters": raters,
+            "source_distribution": dict(sources),
         }
 
     def get_judgements_by_title(self, title: str) -> List[Judgement]:
@@ -204,6 +341,56 @@ class JudgementService:
 
         return result
 
+    def get_judgement_summaries(
+        self,
+        titles: List[str],
+        bibcodes: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Get the mean score and count of judgements for many records at once.
+
+        Records are matched as in get_judgements_for_enrichment, but the
+        judgements are aggregated by the database in a single query.
+
+        Args:
+            titles: List of record titles to find judgements for.
+            bibcodes: Optional list of ADS bibcodes to find judgements for.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Mean score and count by record identifier
+                (bibcode if available, otherwise title).
+        """
+        filters = []
+        if titles:
+            filters.append(Judgement.record_title.in_(titles))
+        if bibcodes:
+            filters.append(Judgement.record_bibcode.in_(bibcodes))
+
+        if not filters:
+            return {}
+
+        rows = self.db.execute(
+            select(
+                Judgement.record_bibcode,
+                Judgement.record_title,
+                func.count(Judgement.id),
+                func.sum(Judgement.judgement_score),
+            )
+            .where(or_(*filters))
+            .group_by(Judgement.record_bibcode, Judgement.record_title)
+        ).all()
+
+        # Fold groups into the same identifiers get_judgements_for_enrichment uses
+        totals: Dict[str, List[float]] = {}
+        for bibcode, title, count, score_sum in rows:
+            total = totals.setdefault(bibcode or title, [0, 0.0])
+            total[0] += count
+            total[1] += score_sum or 0.0
+
+        return {
+            key: {"mean_score": score_sum / count, "count": count}
+            for key, (count, score_sum) in totals.items()
+        }
+
     def get_judgements_by_session(
         self, 
         rater_id: UUID,
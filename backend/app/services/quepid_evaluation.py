@@ -0,0 +1,254 @@
+"""
+Multi-engine Quepid evaluation for the search-comparisons application.
+
+This module scores several search engines against one Quepid case in a
+single pass: the case is loaded once through the judgment store, every
+source is fetched concurrently for each query, and nDCG, precision, recall
+and judged coverage are computed for every source and every cutoff at once
+on a (sources x depth) rating matrix.
+"""
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .batch_comparison import BATCH_QUERY_CONCURRENCY
+from .quepid_service import (
+    QuepidCase,
+    align_judgments,
+    calculate_ndcg_batch,
+    find_closest_query,
+    load_case_with_judgments
+)
+from .search_service import get_results_with_metadata
+from ..utils.scheduler import BATCH, INTERACTIVE, traffic_lane
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Default rank cutoffs
+EVALUATION_CUTOFFS = (5, 10, 20)
+
+# Metrics reported at every cutoff, in column order
+EVALUATION_METRICS = ("ndcg", "p", "recall", "coverage")
+
+# Fields needed to match results to judgments
+EVALUATION_FIELDS = ["title", "author", "year", "doi", "url"]
+
+
+def metric_columns(ks: Sequence[int]) -> List[str]:
+    """
+    Name the columns of an evaluation matrix.
+    
+    Args:
+        ks: Rank cutoffs
+    
+    Returns:
+        List[str]: Column names ("ndcg@5", "p@5", ...), metric-major
+    """
+    return [f"{metric}@{k}" for metric in EVALUATION_METRICS for k in ks]
+
+
+def evaluate_rankings(
+    ratings: np.ndarray,
+    judged: np.ndarray,
+    counts: np.ndarray,
+    ks: Sequence[int],
+    total_relevant: int
+) -> np.ndarray:
+    """
+    Score many rankings against the same judgments at every cutoff.
+    
+    nDCG@k follows calculate_ndcg (ideal order taken from the ranking's own
+    top k); precision@k divides by k; recall@k divides by the number of
+    relevant judged documents; coverage@k is the judged share of the results
+    actually returned in the top k.
+    
+    Args:
+        ratings: (rankings x depth) ratings in ranked order, 0 when unjudged
+        judged: (rankings x depth) whether each position was judged
+        counts: Number of results per ranking
+        ks: Rank cutoffs
+        total_relevant: Relevant documents among the query's judgments
+    
+    Returns:
+        np.ndarray: (rankings x columns) matrix ordered as metric_columns(ks)
+    """
+    ks_array = np.asarray(ks)
+    depth = int(ks_array.max())
+    pad = max(0, depth - ratings.shape[1])
+    ratings = np.pad(ratings, ((0, 0), (0, pad)))[:, :depth]
+    judged = np.pad(judged, ((0, 0), (0, pad)))[:, :depth]
+    
+    columns = ks_array - 1
+    relevant_at = np.cumsum(ratings > 0, axis=1)[:, columns]
+    judged_at = np.cumsum(judged, axis=1)[:, columns]
+    shown = np.minimum(np.asarray(counts)[:, np.newaxis], ks_array)
+    
+    ndcg = np.column_stack([calculate_ndcg_batch(ratings, k) for k in ks])
+    precision = relevant_at / ks_array
+    recall = relevant_at / total_relevant if total_relevant else np.zeros_like(precision)
+    coverage = np.divide(judged_at, shown, out=np.zeros(shown.shape), where=shown > 0)
+    return np.hstack([ndcg, precision, recall, coverage])
+
+
+async def evaluate_query(
+    case: QuepidCase,
+    query: str,
+    sources: List[str],
+    ks: Sequence[int] = EVALUATION_CUTOFFS,
+    max_results: Optional[int] = None,
+    use_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    Fetch every source for one query and score them against a loaded case.
+    
+    Args:
+        case: Quepid case with judgments
+        query: Query to search
+        sources: Sources to evaluate
+        ks: Rank cutoffs
+        max_results: Results fetched per source (defaults to the largest cutoff)
+        use_cache: Whether to read through the result cache
+    
+    Returns:
+        Dict[str, Any]: Query row with per-source status and a metric row per
+            scored source (None for sources that returned nothing usable)
+    """
+    start_time = time.perf_counter()
+    row: Dict[str, Any] = {"query": query, "sources": {}, "matrix": {}}
+    
+    judged_query = query if query in case.judgments else find_closest_query(query, case.queries)
+    judgments = case.judgments.get(judged_query, {}) if judged_query else {}
+    row["judged_query"] = judged_query
+    if not judgments:
+        row["error"] = f"No judgments found for query '{query}' in case {case.case_id}"
+        return row
+    
+    try:
+        results, metadata = await get_results_with_metadata(
+            query, sources, EVALUATION_FIELDS, max_results=max_results or max(ks),
+            deadline=None, use_cache=use_cache
+        )
+    except Exception as e:
+        logger.error(f"Error fetching results for evaluation of '{query}': {str(e)}")
+        row["error"] = str(e)
+        return row
+    
+    scored = []
+    for source in sources:
+        meta = metadata["sources"].get(source, {})
+        row["sources"][source] = {key: meta[key] for key in ("status", "count", "cache") if key in meta}
+        # Only sources that returned results are scored; a failed or
+        # insufficient source would otherwise count as all-zero metrics
+        if results.get(source):
+            scored.append(source)
+        else:
+            row["matrix"][source] = None
+    
+    total_relevant = sum(
+        1 for j in judgments.values()
+        if (isinstance(j, dict) and j.get('rating', 0) > 0) or (isinstance(j, (int, float)) and j > 0)
+    )
+    row["total_judged"] = len(judgments)
+    row["total_relevant"] = total_relevant
+    
+    if scored:
+        depth = max(max(ks), max(len(results[source]) for source in scored))
+        ratings = np.zeros((len(scored), depth))
+        judged = np.zeros((len(scored), depth), dtype=bool)
+        counts = np.zeros(len(scored), dtype=int)
+        for i, source in enumerate(scored):
+            source_results = results[source]
+            ratings[i, :len(source_results)], judged[i, :len(source_results)] = align_judgments(
+                source_results, judgments
+            )
+            counts[i] = len(source_results)
+        
+        matrix = evaluate_rankings(ratings, judged, counts, ks, total_relevant)
+        for i, source in enumerate(scored):
+            row["matrix"][source] = [round(float(value), 6) for value in matrix[i]]
+    
+    row["elapsed_ms"] = round((time.perf_counter() - start_time) * 1000, 1)
+    return row
+
+
+def summarize_matrices(rows: List[Dict[str, Any]], sources: List[str], n_columns: int) -> Dict[str, Any]:
+    """
+    Average each source's metric rows over the evaluated queries.
+    
+    Args:
+        rows: Query rows from evaluate_query
+        sources: Evaluated sources
+        n_columns: Number of matrix columns
+    
+    Returns:
+        Dict[str, Any]: Per-source mean metric row (None if never scored) and
+            the number of queries it was scored on
+    """
+    matrix: Dict[str, Optional[List[float]]] = {}
+    queries: Dict[str, int] = {}
+    for source in sources:
+        values = [row["matrix"][source] for row in rows if row["matrix"].get(source) is not None]
+        queries[source] = len(values)
+        matrix[source] = (
+            [round(float(value), 6) for value in np.mean(np.asarray(values).reshape(-1, n_columns), axis=0)]
+            if values else None
+        )
+    return {"matrix": matrix, "queries": queries}
+
+
+async def evaluate_sources(
+    case_id: int,
+    queries: List[str],
+    sources: List[str],
+    ks: Sequence[int] = EVALUATION_CUTOFFS,
+    max_results: Optional[int] = None,
+    use_cache: bool = True,
+    query_concurrency: int = BATCH_QUERY_CONCURRENCY
+) -> Optional[Dict[str, Any]]:
+    """
+    Evaluate several sources against a Quepid case over one or more queries.
+    
+    Query sets with more than one query run in the scheduler's batch lane,
+    at most ``query_concurrency`` at a time.
+    
+    Args:
+        case_id: Quepid case ID
+        queries: Queries to evaluate
+        sources: Sources to evaluate
+        ks: Rank cutoffs
+        max_results: Results fetched per source (defaults to the largest cutoff)
+        use_cache: Whether to read through the result cache
+        query_concurrency: Maximum number of queries in flight
+    
+    Returns:
+        Optional[Dict[str, Any]]: Column names, one row per query (in input
+            order) and the mean matrix, or None if the case cannot be loaded
+    """
+    case = await load_case_with_judgments(case_id)
+    if not case:
+        return None
+    
+    ks = sorted(set(ks))
+    columns = metric_columns(ks)
+    lane = BATCH if len(queries) > 1 else INTERACTIVE
+    semaphore = asyncio.Semaphore(max(1, query_concurrency))
+    
+    async def run_query(query: str) -> Dict[str, Any]:
+        async with semaphore:
+            with traffic_lane(lane):
+                return await evaluate_query(case, query, sources, ks, max_results, use_cache)
+    
+    rows = await asyncio.gather(*(run_query(query) for query in queries))
+    logger.info(f"Evaluated {len(sources)} sources on {len(queries)} queries of case {case_id}")
+    return {
+        "case_id": case_id,
+        "case_name": case.name,
+        "sources": sources,
+        "columns": columns,
+        "rows": rows,
+        "summary": summarize_matrices(rows, sources, len(columns))
+    }
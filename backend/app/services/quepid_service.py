@@ -6,6 +6,8 @@ judgments, query document pairs, and other relevance assessment data for
 search algorithm evaluation.
 """
 import os
+import time
+import asyncio
 import logging
 import json
 import math
@@ -14,10 +16,13 @@ from typing import Dict, List, Any, Optional, Tuple, Union
 from urllib.parse import urljoin
 
 import httpx
+import numpy as np
 from fastapi import HTTPException
 
 from ..api.models import SearchResult
-from ..utils.http import safe_api_request
+from ..utils.http import safe_api_request, shared_http_client
+from ..utils.instrumentation import log_debug
+from .quepid_store import QuepidJudgmentStore, JUDGMENT_STORE_TTL
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -92,6 +97,8 @@ class QuepidService:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        # Latest snapshot and book doc_id index per case: case_id -> (fetched_at, snapshot, doc_index)
+        self._judged_snapshots: Dict[int, Tuple[float, Dict[str, Any], Dict[str, Dict[str, Any]]]] = {}
     
     async def _make_request(self, endpoint: str, method: str = "GET", data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
@@ -111,7 +118,7 @@ class QuepidService:
         url = urljoin(self.api_url, endpoint.lstrip('/'))  # Use urljoin to handle paths properly
         try:
             logger.info(f"Making request to Quepid API: {url}")
-            async with httpx.AsyncClient() as client:
+            async with shared_http_client("quepid") as client:
                 response = await client.request(
                     method=method,
                     url=url,
@@ -133,6 +140,70 @@ class QuepidService:
                 detail=f"Error making request to Quepid: {str(e)}"
             )
     
+    async def _get_book_index(self, case_id: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch a case's book judgements and index them by doc_id.
+        
+        Args:
+            case_id: The ID of the Quepid case
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: Book judgement by doc_id (empty if the case has no book)
+        """
+        case_data = await self._make_request(f"cases/{case_id}")
+        if not case_data:
+            logger.warning(f"No case data found for case {case_id}")
+            return {}
+        
+        book_id = case_data.get('book_id')
+        if not book_id:
+            logger.warning(f"No book ID found for case {case_id}")
+            return {}
+        
+        book_data = await self._make_request(f"books/{book_id}/judgements")
+        if not book_data:
+            logger.warning(f"No book data found for book {book_id}")
+            return {}
+        
+        # Keep the first judgement per doc_id, as the linear scan did
+        index: Dict[str, Dict[str, Any]] = {}
+        for doc in book_data.get('judgements', []):
+            index.setdefault(doc.get('doc_id'), doc)
+        return index
+    
+    async def _get_judged_snapshot(self, case_id: int) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """
+        Get the latest snapshot of a case and its book doc_id index.
+        
+        The snapshot request runs concurrently with the case and book
+        requests, and the pair is cached for JUDGMENT_STORE_TTL seconds.
+        
+        Args:
+            case_id: The ID of the Quepid case
+        
+        Returns:
+            Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]: Snapshot data and book judgement by doc_id
+        """
+        cached = self._judged_snapshots.get(case_id)
+        if cached and time.monotonic() - cached[0] < JUDGMENT_STORE_TTL:
+            return cached[1], cached[2]
+        
+        doc_index, snapshot_data = await asyncio.gather(
+            self._get_book_index(case_id),
+            self._make_request(f"cases/{case_id}/snapshots/latest"),
+            return_exceptions=True
+        )
+        if isinstance(doc_index, BaseException):
+            raise doc_index
+        if not doc_index:
+            # Without a book there is nothing to join, whatever the snapshot returned
+            return {}, {}
+        if isinstance(snapshot_data, BaseException):
+            raise snapshot_data
+        if snapshot_data:
+            self._judged_snapshots[case_id] = (time.monotonic(), snapshot_data, doc_index)
+        return snapshot_data, doc_index
+    
     async def get_judged_documents(self, case_id: int, query_id: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get judged documents from a Quepid case.
@@ -148,31 +219,10 @@ class QuepidService:
             HTTPException: If the API request fails
         """
         try:
-            # First get the case data to find the book ID
-            case_url = f"cases/{case_id}"
-            case_data = await self._make_request(case_url)
-            
-            if not case_data:
-                logger.warning(f"No case data found for case {case_id}")
-                return []
-            
-            book_id = case_data.get('book_id')
-            if not book_id:
-                logger.warning(f"No book ID found for case {case_id}")
+            snapshot_data, doc_index = await self._get_judged_snapshot(case_id)
+            if not doc_index:
                 return []
             
-            # Get the book judgments
-            book_url = f"books/{book_id}/judgements"
-            book_data = await self._make_request(book_url)
-            
-            if not book_data:
-                logger.warning(f"No book data found for book {book_id}")
-                return []
-            
-            # Get the latest snapshot for the case
-            snapshot_url = f"cases/{case_id}/snapshots/latest"
-            snapshot_data = await self._make_request(snapshot_url)
-            
             if not snapshot_data:
                 logger.warning(f"No snapshot data found for case {case_id}")
                 return []
@@ -189,7 +239,7 @@ class QuepidService:
                 
                 for doc_id, rating in ratings.items():
                     # Get document details from the book judgments
-                    doc = next((d for d in book_data.get('judgements', []) if d.get('doc_id') == doc_id), None)
+                    doc = doc_index.get(doc_id)
                     if doc:
                         documents.append({
                             'id': doc_id,
@@ -252,8 +302,8 @@ class QuepidService:
         # Get the latest snapshot for the case
         snapshot_url = urljoin(self.api_url, f"cases/{case_id}/snapshots/latest")
         logger.info(f"Fetching snapshot from: {snapshot_url}")
-        async with httpx.AsyncClient(timeout=TIMEOUT_SECONDS) as client:
-            resp = await client.get(snapshot_url, headers=self.headers)
+        async with shared_http_client("quepid") as client:
+            resp = await client.get(snapshot_url, headers=self.headers, timeout=TIMEOUT_SECONDS)
             resp.raise_for_status()
             snapshot = resp.json()
             
@@ -334,7 +384,7 @@ async def get_quepid_cases() -> List[Dict[str, Any]]:
         return []
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client("quepid") as client:
             headers = {
                 "Authorization": f"Bearer {QUEPID_API_KEY}",
                 "Content-Type": "application/json",
@@ -348,6 +398,7 @@ async def get_quepid_cases() -> List[Dict[str, Any]]:
                 client,
                 "GET",
                 url,
+                source="quepid",
                 headers=headers,
                 timeout=TIMEOUT_SECONDS
             )
@@ -374,7 +425,7 @@ async def get_case_judgments(case_id: int) -> Dict[str, Any]:
         return {}
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client("quepid") as client:
             headers = {
                 "Authorization": f"Bearer {QUEPID_API_KEY}",
                 "Content-Type": "application/json",
@@ -418,89 +469,121 @@ async def get_case_judgments(case_id: int) -> Dict[str, Any]:
         return {}
 
 
-async def load_case_with_judgments(case_id: int) -> Optional[QuepidCase]:
-    """Load a case and its judgments from Quepid."""
-    try:
-        # Get case details using the cases endpoint
-        case_url = urljoin(QUEPID_API_URL, f"cases/{case_id}")
-        logger.debug(f"Getting case details from: {case_url}")
-        
-        headers = {
-            "Authorization": f"Bearer {QUEPID_API_KEY}",
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
+def _quepid_headers(etag: Optional[str] = None) -> Dict[str, str]:
+    """Build Quepid request headers, conditional on an ETag if one is given."""
+    headers = {
+        "Authorization": f"Bearer {QUEPID_API_KEY}",
+        "Content-Type": "application/json",
+        "Accept": "application/json"
+    }
+    if etag:
+        headers["If-None-Match"] = etag
+    return headers
 
-        async with httpx.AsyncClient() as client:
-            # Get case details
-            case_response = await client.get(
-                case_url,
-                headers=headers,
-                timeout=TIMEOUT_SECONDS
-            )
-            case_response.raise_for_status()
-            case_data = case_response.json()
-            
-            if not case_data:
-                logger.error(f"No case data found for case {case_id}")
-                return None
 
-            # Get judgments using the export endpoint
-            export_url = urljoin(QUEPID_API_URL, f"export/ratings/{case_id}")
-            logger.debug(f"Getting judgments from export endpoint: {export_url}")
-            
-            judgments_response = await client.get(
-                export_url,
-                headers=headers,
-                timeout=TIMEOUT_SECONDS
-            )
-            judgments_response.raise_for_status()
-            judgments_data = judgments_response.json()
-            
-            if judgments_data and 'queries' in judgments_data:
-                logger.debug(f"Received judgments data: {judgments_data}")
-                
-                # Process judgments into the expected format
-                processed_judgments = {}
-                
-                # Handle the new response format
-                for query_data in judgments_data['queries']:
-                    query = query_data['query']
-                    ratings = query_data.get('ratings', {})
-                    
-                    if query not in processed_judgments:
-                        processed_judgments[query] = {}
-                    
-                    # Add all ratings for this query
-                    processed_judgments[query].update(ratings)
+async def fetch_case_payloads(
+    case_id: int,
+    case_etag: Optional[str] = None,
+    ratings_etag: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Fetch a case and its ratings export from Quepid, conditionally on ETags.
+    
+    Args:
+        case_id: The Quepid case ID
+        case_etag: ETag of the stored case payload, if any
+        ratings_etag: ETag of the stored ratings export, if any
+    
+    Returns:
+        Dict[str, Any]: "case" and "ratings" payloads (None when Quepid
+            answered 304 Not Modified) and their "case_etag" and "ratings_etag"
+    
+    Raises:
+        httpx.HTTPError: If either request fails
+    """
+    case_url = urljoin(QUEPID_API_URL, f"cases/{case_id}")
+    export_url = urljoin(QUEPID_API_URL, f"export/ratings/{case_id}")
+    log_debug(logger, "Fetching Quepid case %s and ratings export", case_id)
+    
+    async with shared_http_client("quepid") as client:
+        case_response, ratings_response = await asyncio.gather(
+            client.get(case_url, headers=_quepid_headers(case_etag), timeout=TIMEOUT_SECONDS),
+            client.get(export_url, headers=_quepid_headers(ratings_etag), timeout=TIMEOUT_SECONDS)
+        )
+    
+    payloads: Dict[str, Any] = {}
+    for key, response, etag in (
+        ("case", case_response, case_etag),
+        ("ratings", ratings_response, ratings_etag)
+    ):
+        if response.status_code == 304:
+            payloads[key] = None
+        else:
+            response.raise_for_status()
+            payloads[key] = response.json()
+            etag = None
+        payloads[f"{key}_etag"] = response.headers.get("etag") or etag
+    return payloads
 
-                logger.debug(f"Available queries with judgments: {list(processed_judgments.keys())}")
-                logger.debug(f"Number of judgments per query: {[(q, len(j)) for q, j in processed_judgments.items()]}")
-                
-                case = QuepidCase(
-                    case_id=case_data["case_id"],
-                    name=case_data["case_name"],
-                    queries=[try_data.get("args", {}).get("q", [""])[0] for try_data in case_data.get("tries", [])],
-                    judgments=processed_judgments
-                )
-                
-                logger.debug(f"Created case object with name: {case.name}")
-                logger.debug(f"Case has {len(case.queries)} queries")
-                logger.debug(f"Case has judgments for queries: {list(case.judgments.keys())}")
-                logger.debug(f"Judgments for 'weak lensing': {case.judgments.get('weak lensing', {})}")
-                
-                return case
 
-            logger.error(f"No judgments found for case {case_id}")
-            return None
+_judgment_store: Optional[QuepidJudgmentStore] = None
 
-    except httpx.HTTPError as e:
-        logger.error(f"HTTP error loading case {case_id}: {str(e)}")
-        return None
+
+def get_judgment_store() -> QuepidJudgmentStore:
+    """
+    Get the shared Quepid judgment store, creating it on first use.
+    
+    Returns:
+        QuepidJudgmentStore: The store
+    """
+    global _judgment_store
+    if _judgment_store is None:
+        _judgment_store = QuepidJudgmentStore(fetch_case_payloads)
+    return _judgment_store
+
+
+def set_judgment_store(store: Optional[QuepidJudgmentStore]) -> None:
+    """
+    Replace the shared Quepid judgment store (None resets it).
+    
+    Args:
+        store: The store to use
+    """
+    global _judgment_store
+    _judgment_store = store
+
+
+async def load_case_with_judgments(case_id: int, force_refresh: bool = False) -> Optional[QuepidCase]:
+    """
+    Load a case and its judgments through the local judgment store.
+    
+    The store only contacts Quepid when the case is not stored yet or its TTL
+    has passed, and then revalidates with conditional requests.
+    
+    Args:
+        case_id: The Quepid case ID
+        force_refresh: Revalidate with Quepid even if the stored case is fresh
+    
+    Returns:
+        Optional[QuepidCase]: The case, or None if it cannot be loaded
+    """
+    try:
+        record = await get_judgment_store().get_case(case_id, force_refresh=force_refresh)
     except Exception as e:
         logger.error(f"Error loading case {case_id} with judgments: {str(e)}")
         logger.exception("Full traceback:")
         return None
+    
+    if record is None:
+        logger.error(f"No judgments found for case {case_id}")
+        return None
+    
+    return QuepidCase(
+        case_id=record.case_id,
+        name=record.name,
+        queries=record.queries,
+        judgments=record.judgments
+    )
 
 
 async def evaluate_search_results(
@@ -865,6 +948,91 @@ def calculate_ndcg(ratings: List[int], k: int) -> float:
     return dcg / idcg 
 
 
+def calculate_ndcg_batch(ratings: np.ndarray, k: int) -> np.ndarray:
+    """
+    Calculate nDCG@k for many rankings of rated results at once.
+    
+    Row-wise equivalent of calculate_ndcg(row[:k], k): the ideal ordering is
+    taken from the same top-k ratings.
+    
+    Args:
+        ratings: (rankings x results) matrix of relevance ratings in ranked order
+        k: Number of results to consider
+    
+    Returns:
+        np.ndarray: nDCG score per ranking, between 0 and 1
+    """
+    top = np.asarray(ratings, dtype=np.float64)[:, :k]
+    discounts = 1.0 / np.log2(np.arange(2, top.shape[1] + 2))
+    gains = np.power(2.0, top) - 1
+    dcg = gains @ discounts
+    idcg = -np.sort(-gains, axis=1) @ discounts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(idcg > 0, dcg / idcg, 0.0)
+
+
+def align_judgments(
+    results: List[SearchResult],
+    judgments: Dict[str, Any]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Look up the judgment of each result, matching by document ID then title.
+    
+    Args:
+        results: Search results in their original order
+        judgments: Judgments for one query (doc ID -> rating or judgment dict)
+    
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Rating per result (0 for unjudged results)
+            and whether each result was judged
+    """
+    ratings_by_id: Dict[str, float] = {}
+    ratings_by_title: Dict[str, float] = {}
+    for doc_id, judgment_data in judgments.items():
+        if isinstance(judgment_data, dict):
+            rating = float(judgment_data.get('rating', 0) or 0)
+            title = str(judgment_data.get('title', '') or '').lower().strip()
+            if title:
+                ratings_by_title.setdefault(title, rating)
+        else:
+            rating = float(judgment_data)
+        ratings_by_id[str(doc_id)] = rating
+    
+    ratings = np.zeros(len(results), dtype=np.float64)
+    judged = np.zeros(len(results), dtype=bool)
+    for i, result in enumerate(results):
+        doc_id = extract_doc_id(result)
+        if doc_id in ratings_by_id:
+            ratings[i] = ratings_by_id[doc_id]
+            judged[i] = True
+            continue
+        title = result.get('title', '') if isinstance(result, dict) else getattr(result, 'title', '')
+        if isinstance(title, list):
+            title = title[0] if title else ''
+        title = str(title or '').lower().strip()
+        if title in ratings_by_title:
+            ratings[i] = ratings_by_title[title]
+            judged[i] = True
+    return ratings, judged
+
+
+def align_judgment_ratings(
+    results: List[SearchResult],
+    judgments: Dict[str, Any]
+) -> np.ndarray:
+    """
+    Look up the judged rating of each result, matching by document ID then title.
+    
+    Args:
+        results: Search results in their original order
+        judgments: Judgments for one query (doc ID -> rating or judgment dict)
+    
+    Returns:
+        np.ndarray: Rating per result (0 for unjudged results)
+    """
+    return align_judgments(results, judgments)[0]
+
+
 async def get_book_judgments(book_id: int) -> Dict[str, Any]:
     """
     Retrieve all judgments for a specific book from Quepid.
@@ -880,7 +1048,7 @@ async def get_book_judgments(book_id: int) -> Dict[str, Any]:
         return {}
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client("quepid") as client:
             headers = {
                 "Authorization": f"Bearer {QUEPID_API_KEY}",
                 "Content-Type": "application/json",
@@ -894,6 +1062,7 @@ async def get_book_judgments(book_id: int) -> Dict[str, Any]:
                 client,
                 "GET",
                 url,
+                source="quepid",
                 headers=headers,
                 timeout=TIMEOUT_SECONDS
             )
@@ -918,7 +1087,7 @@ async def get_judgments_for_query(case_id: int, query: str) -> List[Dict[str, An
     """
     # Get all queries for the case to find the query_id
     case_url = urljoin(QUEPID_API_URL, f"cases/{case_id}")
-    async with httpx.AsyncClient() as client:
+    async with shared_http_client("quepid") as client:
         resp = await client.get(case_url, headers={
             "Authorization": f"Bearer {QUEPID_API_KEY}",
             "Content-Type": "application/json",
@@ -938,7 +1107,7 @@ async def get_judgments_for_query(case_id: int, query: str) -> List[Dict[str, An
 
     # Get the latest snapshot for the case
     snapshot_url = urljoin(QUEPID_API_URL, f"cases/{case_id}/snapshots/latest")
-    async with httpx.AsyncClient() as client:
+    async with shared_http_client("quepid") as client:
         snapshot_resp = await client.get(snapshot_url, headers={
             "Authorization": f"Bearer {QUEPID_API_KEY}",
             "Content-Type": "application/json",
@@ -0,0 +1,384 @@
+"""
+Local Quepid judgment store for the search-comparisons application.
+
+This module keeps Quepid cases and their ratings in an in-memory index backed
+by a SQLite file, keyed by case and query. Cases are revalidated against
+Quepid only after a TTL, with conditional requests (ETags), and a changed
+ratings export is applied incrementally: only queries whose ratings changed
+are rewritten. Repeated evaluations against the same case therefore cost no
+Quepid round trips.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..utils.cache import CACHE_DIR
+from ..utils.instrumentation import log_debug
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Store configuration
+JUDGMENT_STORE_PATH = os.environ.get("JUDGMENT_STORE_PATH", os.path.join(CACHE_DIR, "quepid_judgments.sqlite3"))
+JUDGMENT_STORE_TTL = int(os.environ.get("JUDGMENT_STORE_TTL", 600))  # Seconds before revalidating with Quepid
+
+# Fetches the case and ratings export; see QuepidJudgmentStore.__init__
+CaseFetcher = Callable[[int, Optional[str], Optional[str]], Awaitable[Dict[str, Any]]]
+
+
+def ratings_digest(ratings: Dict[str, Any]) -> str:
+    """
+    Compute a version string for one query's ratings.
+    
+    Args:
+        ratings: Ratings by document ID
+    
+    Returns:
+        str: Digest that changes whenever a rating is added, removed or changed
+    """
+    payload = json.dumps(ratings, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def judgments_from_export(ratings_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Group a Quepid ratings export by query.
+    
+    Args:
+        ratings_data: Response of the export/ratings endpoint
+    
+    Returns:
+        Dict[str, Dict[str, Any]]: Ratings by document ID, by query text
+    """
+    judgments: Dict[str, Dict[str, Any]] = {}
+    for query_data in ratings_data.get("queries", []):
+        judgments.setdefault(query_data["query"], {}).update(query_data.get("ratings", {}))
+    return judgments
+
+
+class CaseRecord:
+    """
+    A stored case with its judgments and revalidation state.
+    
+    Attributes:
+        case_id: The Quepid case ID
+        name: The case name
+        queries: Query texts of the case's tries
+        judgments: Ratings by document ID, by query text
+        digests: Ratings digest by query text
+        case_etag: ETag of the last case response
+        ratings_etag: ETag of the last ratings export response
+        checked_at: Time the record was last confirmed against Quepid
+    """
+    __slots__ = ("case_id", "name", "queries", "judgments", "digests", "case_etag", "ratings_etag", "checked_at")
+    
+    def __init__(
+        self,
+        case_id: int,
+        name: str,
+        queries: List[str],
+        judgments: Dict[str, Dict[str, Any]],
+        digests: Optional[Dict[str, str]] = None,
+        case_etag: Optional[str] = None,
+        ratings_etag: Optional[str] = None,
+        checked_at: float = 0.0
+    ):
+        self.case_id = case_id
+        self.name = name
+        self.queries = queries
+        self.judgments = judgments
+        self.digests = digests if digests is not None else {
+            query: ratings_digest(ratings) for query, ratings in judgments.items()
+        }
+        self.case_etag = case_etag
+        self.ratings_etag = ratings_etag
+        self.checked_at = checked_at
+    
+    def is_fresh(self, ttl: float, now: Optional[float] = None) -> bool:
+        """
+        Check whether the record can be served without revalidating.
+        
+        Args:
+            ttl: Seconds a record stays fresh after being checked
+            now: Current time (defaults to time.time())
+        
+        Returns:
+            bool: True if the record is within its TTL
+        """
+        return (now or time.time()) - self.checked_at < ttl
+
+
+class QuepidJudgmentStore:
+    """
+    In-memory index of Quepid cases backed by SQLite.
+    
+    Lookups are served from memory, then from SQLite, and only go to Quepid
+    when the record is missing or past its TTL. Concurrent lookups of the
+    same case share one refresh.
+    """
+    
+    def __init__(self, fetcher: CaseFetcher, path: Optional[str] = None, ttl: float = JUDGMENT_STORE_TTL):
+        """
+        Initialize the store.
+        
+        Args:
+            fetcher: Coroutine ``fetcher(case_id, case_etag, ratings_etag)``
+                returning a dict with "case" and "ratings" payloads (None
+                when Quepid answered 304 Not Modified) and their new
+                "case_etag" and "ratings_etag"
+            path: Path to the SQLite database file
+            ttl: Seconds a case is served before revalidating with Quepid
+        """
+        self.fetcher = fetcher
+        self.path = path or JUDGMENT_STORE_PATH
+        self.ttl = ttl
+        self._cases: Dict[int, CaseRecord] = {}
+        self._refreshes: Dict[int, "asyncio.Task[Optional[CaseRecord]]"] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "not_modified": 0, "refreshed": 0, "stale_served": 0}
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database lazily so importing this module never touches disk."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cases ("
+                "case_id INTEGER PRIMARY KEY, "
+                "name TEXT NOT NULL, "
+                "queries TEXT NOT NULL, "
+                "case_etag TEXT, "
+                "ratings_etag TEXT, "
+                "checked_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS case_queries ("
+                "case_id INTEGER NOT NULL, "
+                "query TEXT NOT NULL, "
+                "digest TEXT NOT NULL, "
+                "ratings TEXT NOT NULL, "
+                "PRIMARY KEY (case_id, query))"
+            )
+            self._conn = conn
+        return self._conn
+    
+    def _read(self, case_id: int) -> Optional[CaseRecord]:
+        """Load a case record from SQLite."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT name, queries, case_etag, ratings_etag, checked_at FROM cases WHERE case_id = ?",
+                (case_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            query_rows = conn.execute(
+                "SELECT query, digest, ratings FROM case_queries WHERE case_id = ?", (case_id,)
+            ).fetchall()
+        name, queries, case_etag, ratings_etag, checked_at = row
+        return CaseRecord(
+            case_id,
+            name,
+            json.loads(queries),
+            {query: json.loads(ratings) for query, _, ratings in query_rows},
+            digests={query: digest for query, digest, _ in query_rows},
+            case_etag=case_etag,
+            ratings_etag=ratings_etag,
+            checked_at=checked_at
+        )
+    
+    def _write(self, record: CaseRecord, changed: List[str], removed: List[str]) -> None:
+        """
+        Persist a case record, rewriting only the queries that changed.
+        
+        Args:
+            record: The record to persist
+            changed: Queries whose ratings were added or changed
+            removed: Queries that no longer have ratings
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cases (case_id, name, queries, case_etag, ratings_etag, checked_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (record.case_id, record.name, json.dumps(record.queries),
+                     record.case_etag, record.ratings_etag, record.checked_at)
+                )
+                conn.executemany(
+                    "DELETE FROM case_queries WHERE case_id = ? AND query = ?",
+                    [(record.case_id, query) for query in removed]
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO case_queries (case_id, query, digest, ratings) VALUES (?, ?, ?, ?)",
+                    [
+                        (record.case_id, query, record.digests[query], json.dumps(record.judgments[query]))
+                        for query in changed
+                    ]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    
+    def _touch(self, record: CaseRecord) -> None:
+        """Persist a successful revalidation that changed nothing."""
+        with self._lock:
+            self._connect().execute(
+                "UPDATE cases SET case_etag = ?, ratings_etag = ?, checked_at = ? WHERE case_id = ?",
+                (record.case_etag, record.ratings_etag, record.checked_at, record.case_id)
+            )
+    
+    async def _refresh(self, case_id: int, current: Optional[CaseRecord]) -> Optional[CaseRecord]:
+        """
+        Revalidate a case with Quepid and apply any changes.
+        
+        Args:
+            case_id: The Quepid case ID
+            current: The stored record, if any
+        
+        Returns:
+            Optional[CaseRecord]: The up-to-date record, the stored record if
+                Quepid could not be reached, or None if neither is available
+        """
+        try:
+            payloads = await self.fetcher(
+                case_id,
+                current.case_etag if current else None,
+                current.ratings_etag if current else None
+            )
+        except Exception as e:
+            logger.error(f"Error refreshing Quepid case {case_id}: {str(e)}")
+            if current is not None:
+                self.stats["stale_served"] += 1
+                logger.warning(f"Serving stored judgments for case {case_id}")
+            return current
+        
+        case_data = payloads.get("case")
+        ratings_data = payloads.get("ratings")
+        now = time.time()
+        
+        if current is not None and case_data is None and ratings_data is None:
+            # Both payloads are unchanged (304 Not Modified)
+            self.stats["not_modified"] += 1
+            current.checked_at = now
+            self._touch(current)
+            return current
+        
+        if current is None and (not case_data or ratings_data is None):
+            logger.error(f"No case data found for case {case_id}")
+            return None
+        
+        if case_data:
+            name = case_data.get("case_name", current.name if current else "")
+            queries = [try_data.get("args", {}).get("q", [""])[0] for try_data in case_data.get("tries", [])]
+        else:
+            name, queries = current.name, current.queries
+        
+        if ratings_data is None:
+            judgments, digests = current.judgments, current.digests
+        else:
+            if "queries" not in ratings_data:
+                logger.error(f"No judgments found for case {case_id}")
+                return current
+            judgments = judgments_from_export(ratings_data)
+            digests = {query: ratings_digest(ratings) for query, ratings in judgments.items()}
+        
+        previous = current.digests if current else {}
+        changed = [query for query, digest in digests.items() if previous.get(query) != digest]
+        removed = [query for query in previous if query not in digests]
+        record = CaseRecord(
+            case_id, name, queries, judgments,
+            digests=digests,
+            case_etag=payloads.get("case_etag"),
+            ratings_etag=payloads.get("ratings_etag"),
+            checked_at=now
+        )
+        self._write(record, changed, removed)
+        self.stats["refreshed"] += 1
+        log_debug(
+            logger, "Refreshed Quepid case %s: %s queries changed, %s removed",
+            case_id, len(changed), len(removed)
+        )
+        return record
+    
+    async def get_case(self, case_id: int, force_refresh: bool = False) -> Optional[CaseRecord]:
+        """
+        Get a case with its judgments, revalidating with Quepid only when stale.
+        
+        Args:
+            case_id: The Quepid case ID
+            force_refresh: Revalidate even if the stored record is fresh
+        
+        Returns:
+            Optional[CaseRecord]: The case record, or None if it cannot be loaded
+        """
+        record = self._cases.get(case_id)
+        if record is not None and not force_refresh and record.is_fresh(self.ttl):
+            self.stats["memory_hits"] += 1
+            return record
+        
+        if record is None:
+            record = self._read(case_id)
+            if record is not None:
+                self._cases[case_id] = record
+                if not force_refresh and record.is_fresh(self.ttl):
+                    self.stats["disk_hits"] += 1
+                    return record
+        
+        task = self._refreshes.get(case_id)
+        if task is None:
+            task = asyncio.create_task(self._refresh(case_id, record))
+            self._refreshes[case_id] = task
+            task.add_done_callback(lambda _: self._refreshes.pop(case_id, None))
+        record = await asyncio.shield(task)
+        if record is not None:
+            self._cases[case_id] = record
+        return record
+    
+    def invalidate(self, case_id: Optional[int] = None) -> None:
+        """
+        Force the next lookup of a case (or of every case) to revalidate.
+        
+        Args:
+            case_id: Case to invalidate (None for all cases)
+        """
+        records = [self._cases[case_id]] if case_id in self._cases else []
+        if case_id is None:
+            records = list(self._cases.values())
+        for record in records:
+            record.checked_at = 0.0
+        with self._lock:
+            if case_id is None:
+                self._connect().execute("UPDATE cases SET checked_at = 0")
+            else:
+                self._connect().execute("UPDATE cases SET checked_at = 0 WHERE case_id = ?", (case_id,))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Report store usage.
+        
+        Returns:
+            Dict[str, Any]: Lookup counters and the cases held in memory
+        """
+        return {
+            **self.stats,
+            "ttl": self.ttl,
+            "cases": {
+                case_id: {
+                    "queries": len(record.judgments),
+                    "judgments": sum(len(ratings) for ratings in record.judgments.values()),
+                    "age_s": round(time.time() - record.checked_at, 1)
+                }
+                for case_id, record in self._cases.items()
+            }
+        }
@@ -11,13 +11,13 @@ import datetime
 import requests
 from requests.exceptions import RequestException
 from pydantic import BaseModel
-import aiohttp
 import re
 
 from .config import LLM_CONFIG, LLMModel, DEFAULT_MODEL, DEFAULT_TEMPERATURE, DEFAULT_MAX_TOKENS
 from ..ads_service import get_ads_results
 from .documentation_service import DocumentationService
 from app.core.config import settings
+from app.utils.http import get_aiohttp_session
 
 # Configure logger for this module
 logger = logging.getLogger(__name__)
@@ -432,13 +432,13 @@ class LLMService:
             try:
                 # For Ollama, we can check if the model is available
                 if self.provider == "ollama":
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(f"{self.api_endpoint}/tags") as response:
-                            if response.status == 200:
-                                models = await response.json()
-                                if not any(m['name'] == self.model_name for m in models.get('models', [])):
-                                    logger.warning(f"Model {self.model_name} not found, falling back to phi:2.7b")
-                                    self.model_name = "phi:2.7b"
+                    session = get_aiohttp_session("llm")
+                    async with session.get(f"{self.api_endpoint}/tags") as response:
+                        if response.status == 200:
+                            models = await response.json()
+                            if not any(m['name'] == self.model_name for m in models.get('models', [])):
+                                logger.warning(f"Model {self.model_name} not found, falling back to phi:2.7b")
+                                self.model_name = "phi:2.7b"
                 
                 self._model_loaded = True
                 logger.info(f"Model {self.model_name} is ready for use")
@@ -488,34 +488,34 @@ class LLMService:
             
             # Make the request using aiohttp
             logger.info(f"Making request to {self.api_endpoint}")
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.api_endpoint,
-                    json=request_data,
-                    headers={"Content-Type": "application/json"},
-                    timeout=30
-                ) as response:
-                    logger.info(f"Response status code: {response.status}")
-                    logger.info(f"Response headers: {response.headers}")
-                    
-                    response.raise_for_status()
-                    response_data = await response.json()
-                    logger.info(f"Response data: {response_data}")
-                    
-                    # Extract response text based on provider format
-                    if self.provider == "ollama":
-                        response_text = response_data.get("response", "")
-                        logger.info(f"Extracted response text: {response_text}")
-                        return response_text
-                    elif self.provider == "openai":
-                        response_text = response_data.get("choices", [{}])[0].get("message", {}).get("content", "")
-                        logger.info(f"Extracted response text: {response_text}")
-                        return response_text
-                    else:
-                        response_text = response_data.get("output", "")
-                        logger.info(f"Extracted response text: {response_text}")
-                        return response_text
+            session = get_aiohttp_session("llm")
+            async with session.post(
+                self.api_endpoint,
+                json=request_data,
+                headers={"Content-Type": "application/json"},
+                timeout=30
+            ) as response:
+                logger.info(f"Response status code: {response.status}")
+                logger.info(f"Response headers: {response.headers}")
                 
+                response.raise_for_status()
+                response_data = await response.json()
+                logger.info(f"Response data: {response_data}")
+                
+                # Extract response text based on provider format
+                if self.provider == "ollama":
+                    response_text = response_data.get("response", "")
+                    logger.info(f"Extracted response text: {response_text}")
+                    return response_text
+                elif self.provider == "openai":
+                    response_text = response_data.get("choices", [{}])[0].get("message", {}).get("content", "")
+                    logger.info(f"Extracted response text: {response_text}")
+                    return response_text
+                else:
+                    response_text = response_data.get("output", "")
+                    logger.info(f"Extracted response text: {response_text}")
+                    return response_text
+            
         except Exception as e:
             logger.error(f"Error querying LLM: {str(e)}")
             logger.error(f"Request data: {request_data}")
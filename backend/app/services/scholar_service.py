@@ -6,10 +6,11 @@ and fallback mechanisms using Scholarly or direct HTML scraping when needed.
 """
 import os
 import re
-import time
 import logging
 import asyncio
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 
@@ -24,7 +25,8 @@ except ImportError:
     SCHOLARLY_AVAILABLE = False
 
 from ..api.models import SearchResult
-from ..utils.http import safe_api_request, timeout
+from ..utils.http import safe_api_request, shared_http_client, parse_retry_after
+from ..utils.scheduler import source_blocked_for, throttle_source
 from ..utils.cache import get_cache_key, save_to_cache, load_from_cache
 
 # Setup logging
@@ -37,35 +39,42 @@ MAX_RETRIES = int(os.getenv('SCHOLAR_MAX_RETRIES', '3'))
 RETRY_DELAY = int(os.getenv('SCHOLAR_RETRY_DELAY', '5'))
 BLOCK_DELAY = int(os.getenv('SCHOLAR_BLOCK_DELAY', '300'))  # 5 minutes delay after being blocked
 USER_AGENT = os.getenv('SCHOLAR_USER_AGENT', "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+SCHOLARLY_WORKERS = int(os.getenv('SCHOLARLY_WORKERS', '2'))  # Concurrent scholarly searches
+
+# scholarly is synchronous: its searches run on this pool, never on the event loop.
+# Created on first use, and again after shutdown_scholarly_executor.
+_scholarly_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_scholarly_executor() -> ThreadPoolExecutor:
+    """Get the scholarly worker pool, creating it if needed."""
+    global _scholarly_executor
+    if _scholarly_executor is None:
+        _scholarly_executor = ThreadPoolExecutor(max_workers=SCHOLARLY_WORKERS, thread_name_prefix="scholarly")
+    return _scholarly_executor
 
-# Track block status
-last_block_time = 0
-is_blocked = False
 
 def is_currently_blocked() -> bool:
     """
     Check if we're currently blocked by Google Scholar.
     
+    Blocks are tracked as pauses of the "scholar" request scheduler, so they
+    hold back every caller, including batch runs.
+    
     Returns:
         bool: True if we're currently blocked, False otherwise
     """
-    global is_blocked, last_block_time
-    if is_blocked:
-        # Check if block period has passed
-        if time.time() - last_block_time > BLOCK_DELAY:
-            is_blocked = False
-            logger.info("Block period has passed, resuming normal operation")
-        return is_blocked
-    return False
+    return source_blocked_for("scholar") > 0
 
-def mark_as_blocked() -> None:
+def mark_as_blocked(seconds: float = BLOCK_DELAY) -> None:
     """
     Mark the service as blocked by Google Scholar.
+    
+    Args:
+        seconds: How long to stop sending requests to Google Scholar
     """
-    global is_blocked, last_block_time
-    is_blocked = True
-    last_block_time = time.time()
-    logger.warning(f"Marked as blocked by Google Scholar. Will retry after {BLOCK_DELAY} seconds")
+    throttle_source("scholar", seconds)
+    logger.warning(f"Marked as blocked by Google Scholar. Will retry after {seconds} seconds")
 
 async def get_scholar_direct_html(
     query: str, 
@@ -110,7 +119,7 @@ async def get_scholar_direct_html(
     
     for attempt in range(MAX_RETRIES):
         try:
-            async with httpx.AsyncClient(timeout=TIMEOUT_SECONDS) as client:
+            async with shared_http_client("scholar") as client:
                 # Add random delay to avoid looking like a bot
                 await asyncio.sleep(random.uniform(2.0, 5.0))
                 
@@ -130,8 +139,11 @@ async def get_scholar_direct_html(
                     return response.text
                 elif response.status_code == 429:  # Too Many Requests
                     logger.warning("Rate limited by Google Scholar, waiting before retry...")
-                    mark_as_blocked()
-                    await asyncio.sleep(RETRY_DELAY * (attempt + 1))  # Exponential backoff
+                    retry_after = parse_retry_after(response.headers.get("retry-after"))
+                    delay = retry_after if retry_after is not None else RETRY_DELAY * (attempt + 1)
+                    # Pause the scheduler so other Scholar requests back off as well
+                    mark_as_blocked(delay)
+                    await asyncio.sleep(delay)
                     continue
                 elif response.status_code == 403:  # Forbidden
                     logger.warning("Access denied by Google Scholar (403)")
@@ -253,6 +265,58 @@ async def parse_scholar_html(html_content: str) -> List[SearchResult]:
         return []
 
 
+def _search_scholarly(query: str, num_results: int, cancelled: threading.Event) -> List[SearchResult]:
+    """
+    Run a scholarly search on the calling thread.
+    
+    Meant for the scholarly worker pool. Each result page is a blocking
+    request to Google Scholar, so cancellation is checked between results:
+    a cancelled search stops after the request in progress.
+    
+    Args:
+        query: Search query string
+        num_results: Maximum number of results to return
+        cancelled: Set by the caller to stop the search
+    
+    Returns:
+        List[SearchResult]: Results collected before completion or cancellation
+    """
+    results: List[SearchResult] = []
+    if cancelled.is_set():
+        return results
+    
+    # Create search query object
+    search_query = scholarly.search_pubs(query)
+    
+    for rank, pub in enumerate(search_query, 1):
+        if rank > num_results or cancelled.is_set():
+            break
+        
+        # Extract fields from scholarly result
+        abstract = pub.get('bib', {}).get('abstract', None)
+        title = pub.get('bib', {}).get('title', "Unknown Title")
+        authors = pub.get('bib', {}).get('author', [])
+        year_str = pub.get('bib', {}).get('pub_year', None)
+        year = int(year_str) if year_str and year_str.isdigit() else None
+        citation_count = pub.get('num_citations', None)
+        url = pub.get('pub_url', None)
+        
+        # Create result object
+        result = SearchResult(
+            title=title,
+            author=authors if isinstance(authors, list) else [authors],
+            abstract=abstract,
+            year=year,
+            url=url,
+            source="scholar",
+            rank=rank,
+            citation_count=citation_count
+        )
+        results.append(result)
+    
+    return results
+
+
 async def get_scholar_results_scholarly(
     query: str, 
     fields: List[str],
@@ -262,7 +326,9 @@ async def get_scholar_results_scholarly(
     Get search results from Google Scholar using the Scholarly library.
     
     Uses the scholarly package to search Google Scholar and extract structured
-    publication data with proper error handling.
+    publication data with proper error handling. The search runs on a bounded
+    worker pool; if it does not finish within TIMEOUT_SECONDS (including time
+    spent waiting for a free worker), it is cancelled and no results are returned.
     
     Args:
         query: Search query string
@@ -276,54 +342,35 @@ async def get_scholar_results_scholarly(
         logger.warning("Scholarly package not available")
         return []
     
+    cancelled = threading.Event()
+    search = asyncio.get_running_loop().run_in_executor(
+        _get_scholarly_executor(), _search_scholarly, query, num_results, cancelled
+    )
     try:
-        # Refresh proxy if needed
-        await refresh_scholarly_proxy_if_needed()
-        
-        # Create search query object
-        search_query = scholarly.search_pubs(query)
-        
-        # Collect results
-        results: List[SearchResult] = []
-        
-        with timeout(TIMEOUT_SECONDS, timeout_message="Scholarly search timed out"):
-            for rank, pub in enumerate(search_query, 1):
-                if rank > num_results:
-                    break
-                
-                # Extract fields from scholarly result
-                abstract = pub.get('bib', {}).get('abstract', None)
-                title = pub.get('bib', {}).get('title', "Unknown Title")
-                authors = pub.get('bib', {}).get('author', [])
-                year_str = pub.get('bib', {}).get('pub_year', None)
-                year = int(year_str) if year_str and year_str.isdigit() else None
-                citation_count = pub.get('num_citations', None)
-                url = pub.get('pub_url', None)
-                
-                # Create result object
-                result = SearchResult(
-                    title=title,
-                    author=authors if isinstance(authors, list) else [authors],
-                    abstract=abstract,
-                    year=year,
-                    url=url,
-                    source="scholar",
-                    rank=rank,
-                    citation_count=citation_count
-                )
-                results.append(result)
-        
+        results = await asyncio.wait_for(search, TIMEOUT_SECONDS)
         logger.info(f"Retrieved {len(results)} results from Google Scholar using Scholarly")
         return results
         
-    except TimeoutError:
+    except asyncio.TimeoutError:
+        cancelled.set()
         logger.error("Timeout while retrieving results from Google Scholar via Scholarly")
         return []
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
     except Exception as e:
         logger.error(f"Error retrieving results from Google Scholar via Scholarly: {str(e)}")
         return []
 
 
+def shutdown_scholarly_executor() -> None:
+    """Stop the scholarly worker pool, dropping searches that have not started."""
+    global _scholarly_executor
+    if _scholarly_executor is not None:
+        _scholarly_executor.shutdown(wait=False, cancel_futures=True)
+        _scholarly_executor = None
+
+
 async def get_scholar_results(
     query: str, 
     fields: List[str],
@@ -359,7 +406,7 @@ async def get_scholar_results(
     
     # Log the environment for debugging
     logger.info(f"Google Scholar search environment: TIMEOUT={TIMEOUT_SECONDS}s, MAX_RETRIES={MAX_RETRIES}, "
-                f"SCHOLARLY_AVAILABLE={SCHOLARLY_AVAILABLE}, BLOCKED={is_blocked}")
+                f"SCHOLARLY_AVAILABLE={SCHOLARLY_AVAILABLE}, BLOCKED={is_currently_blocked()}")
     
     # First try with Scholarly if available
     if SCHOLARLY_AVAILABLE:
@@ -5,14 +5,26 @@ This module coordinates search operations across different search engines,
 handles fallbacks, and computes similarity metrics between results.
 """
 import os
+import time
 import logging
 import asyncio
-from typing import Dict, List, Any, Set, Tuple, Optional
+from typing import Dict, List, Any, Set, Tuple, Optional, AsyncIterator, Callable, Awaitable
+
+import numpy as np
 
 from ..api.models import SearchResult
-from ..utils.cache import get_cache_key, save_to_cache, load_from_cache
+from ..utils.cache import get_cache_key, save_to_cache, lookup_cache, CACHE_HIT, CACHE_MISS
 from ..utils.text_processing import preprocess_text
-from ..utils.similarity import calculate_jaccard_similarity, calculate_rank_based_overlap, calculate_cosine_similarity
+from ..utils.instrumentation import log_debug
+from ..utils.scheduler import configure_source_schedulers, current_lane, request_slot, source_blocked_for
+from ..utils.similarity import (
+    calculate_pairwise_rank_based_overlap,
+    build_vocabulary,
+    build_term_matrix,
+    calculate_idf_weights,
+    calculate_pairwise_cosine_similarity,
+    calculate_pairwise_jaccard_similarity
+)
 
 # Import specific search services
 from .ads_service import get_ads_results
@@ -114,30 +126,577 @@ SERVICE_CONFIG = {
         "priority": 1,  # Lower number = higher priority
         "timeout": 15,  # seconds
         "min_results": 5,  # Minimum acceptable results
+        "rate": 5.0,  # Upstream calls per second (token bucket refill rate)
+        "burst": 10,  # Upstream calls allowed back to back
+        "batch_concurrency": 4,  # Batch-lane calls in flight
     },
     "scholar": {
         "enabled": True,
         "priority": 2,
         "timeout": 20,
         "min_results": 3,
+        "rate": 0.2,
+        "burst": 1,
+        "batch_concurrency": 1,
     },
     "semanticScholar": {
         "enabled": True,
         "priority": 3,
         "timeout": 15,
         "min_results": 5,
+        "rate": 1.0,
+        "burst": 2,
+        "batch_concurrency": 2,
     },
     "webOfScience": {
         "enabled": True,
         "priority": 4,
         "timeout": 20,
         "min_results": 3,
+        "rate": 2.0,
+        "burst": 4,
+        "batch_concurrency": 2,
     }
 }
 
+# Rate-limit upstream calls with the per-source token buckets configured above
+configure_source_schedulers(SERVICE_CONFIG)
+
 # Default number of results if not specified
 DEFAULT_NUM_RESULTS = 20
 
+# Global deadline (seconds) for a whole multi-source request. Sources that have
+# not finished when it expires are cancelled and reported as such.
+DEFAULT_REQUEST_DEADLINE = float(os.environ.get("SEARCH_REQUEST_DEADLINE", 45))
+
+# Upstream fetches currently in flight, keyed by cache key and traffic lane,
+# so that concurrent identical requests share a single call. Fetches are not
+# shared across lanes: an interactive request must not wait behind a fetch
+# queued in the batch lane. Values are (task, task metadata).
+_inflight_fetches: Dict[
+    Tuple[str, str], Tuple["asyncio.Task[Optional[List[SearchResult]]]", Dict[str, Any]]
+] = {}
+
+
+def _get_effective_query(
+    source: str,
+    query: str,
+    use_transformed_query: bool,
+    original_query: Optional[str]
+) -> str:
+    """
+    Determine which query string should be sent to a given source.
+    
+    Transformed queries use ADS syntax, so only ADS receives them; every other
+    source gets the original query.
+    
+    Args:
+        source: Search engine source name
+        query: Search query string (possibly transformed)
+        use_transformed_query: Whether the query has been transformed
+        original_query: The original query before transformation
+    
+    Returns:
+        str: The query to send to the source
+    """
+    if use_transformed_query and source != "ads":
+        return original_query or query
+    return query
+
+
+async def _query_source(
+    source: str,
+    query: str,
+    fields: List[str],
+    num_results: int,
+    attempt_count: int,
+    qf: Optional[str] = None,
+    field_boosts: Optional[Dict[str, float]] = None
+) -> List[SearchResult]:
+    """
+    Run a single query attempt against one source.
+    
+    Args:
+        source: Search engine source name
+        query: Query string to send to the source
+        fields: List of fields to retrieve
+        num_results: Maximum number of results to return
+        attempt_count: 1-based attempt number (Scholar switches to its fallback after the first)
+        qf: Query field weights (ADS only)
+        field_boosts: Field boosts for query transformation (ADS only)
+    
+    Returns:
+        List[SearchResult]: Results returned by the source
+    """
+    if source == "ads":
+        return await get_ads_results(
+            query,
+            fields,
+            num_results,
+            qf=qf,
+            field_boosts=field_boosts
+        )
+    elif source == "scholar":
+        if attempt_count == 1:
+            return await get_scholar_results(query, fields, num_results)
+        return await get_scholar_results_fallback(query, num_results)
+    elif source == "semanticScholar":
+        return await get_semantic_scholar_results(query, fields, num_results)
+    elif source == "webOfScience":
+        return await get_web_of_science_results(query, fields, num_results)
+    
+    logger.error(f"Unknown source: {source}")
+    return []
+
+
+async def _run_fallback_chain(
+    source: str,
+    query: str,
+    fields: List[str],
+    num_results: int,
+    attempts: int,
+    qf: Optional[str],
+    field_boosts: Optional[Dict[str, float]],
+    cache_key: str,
+    source_meta: Dict[str, Any]
+) -> Optional[List[SearchResult]]:
+    """
+    Run the attempt/fallback chain for a single source against the upstream engine.
+    
+    ``source_meta`` is updated in place as attempts progress, so that the
+    caller still has accurate status if this coroutine is cancelled by the
+    request deadline. Successful results are written to the cache.
+    
+    Args:
+        source: Search engine source name
+        query: Query string to send to the source
+        fields: List of fields to retrieve
+        num_results: Maximum number of results to return
+        attempts: Maximum number of attempts for the source
+        qf: Query field weights (e.g., "title^50 author^30")
+        field_boosts: Field boosts for query transformation
+        cache_key: Cache key under which successful results are stored
+        source_meta: Per-source metadata dictionary to populate
+    
+    Returns:
+        Optional[List[SearchResult]]: Results if the source succeeded, None otherwise
+    """
+    timeout = SERVICE_CONFIG[source]["timeout"]
+    min_results = SERVICE_CONFIG[source]["min_results"]
+    
+    for attempt_count in range(1, attempts + 1):
+        source_meta["attempts"] = attempt_count
+        logger.info(f"Attempt {attempt_count} for {source}")
+        
+        # Don't queue behind a pause that outlasts the attempt (e.g. a Scholar block)
+        blocked_for = source_blocked_for(source)
+        if blocked_for > timeout:
+            logger.warning(f"Skipping {source}: throttled for another {blocked_for:.0f} seconds")
+            source_meta["status"] = "throttled"
+            break
+        
+        try:
+            # Wait for the source's rate limit outside the attempt timeout
+            async with request_slot(source):
+                source_results = await asyncio.wait_for(
+                    _query_source(
+                        source,
+                        query,
+                        fields,
+                        num_results,
+                        attempt_count,
+                        qf=qf,
+                        field_boosts=field_boosts
+                    ),
+                    timeout=timeout
+                )
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout after {timeout} seconds for {source}")
+            source_meta["status"] = "timeout"
+            continue
+        except Exception as e:
+            logger.error(f"Error fetching results from {source}: {str(e)}")
+            source_meta["status"] = "error"
+            source_meta["error"] = str(e)
+            continue
+        
+        source_meta["count"] = len(source_results)
+        if len(source_results) >= min_results:
+            logger.info(f"Successfully retrieved {len(source_results)} results from {source}")
+            source_meta["status"] = "ok"
+            source_meta.pop("error", None)
+            save_to_cache(cache_key, source_results)
+            return source_results
+        
+        logger.warning(f"Insufficient results from {source}: {len(source_results)} < {min_results}")
+        source_meta["status"] = "insufficient"
+    
+    logger.error(f"All attempts failed for {source}")
+    return None
+
+
+async def _fetch_source_with_fallback(
+    source: str,
+    query: str,
+    fields: List[str],
+    num_results: int,
+    attempts: int,
+    use_transformed_query: bool,
+    original_query: Optional[str],
+    qf: Optional[str],
+    field_boosts: Optional[Dict[str, float]],
+    source_meta: Dict[str, Any],
+    use_cache: bool = True
+) -> Optional[List[SearchResult]]:
+    """
+    Get results for a single source, reading through the result cache.
+    
+    Fresh cache entries are returned without contacting the source. Otherwise
+    the attempt/fallback chain runs as a shared in-flight task, so concurrent
+    identical requests wait on one upstream call instead of each issuing their
+    own. If the refresh fails and a stale entry exists, the stale results are
+    served instead.
+    
+    Args:
+        source: Search engine source name
+        query: Search query string
+        fields: List of fields to retrieve
+        num_results: Maximum number of results to return
+        attempts: Maximum number of attempts for the source
+        use_transformed_query: Whether the query has been transformed
+        original_query: The original query before transformation
+        qf: Query field weights (e.g., "title^50 author^30")
+        field_boosts: Field boosts for query transformation
+        source_meta: Per-source metadata dictionary to populate
+        use_cache: Whether to read through the result cache
+    
+    Returns:
+        Optional[List[SearchResult]]: Results if available, None otherwise
+    """
+    start_time = time.perf_counter()
+    effective_query = _get_effective_query(source, query, use_transformed_query, original_query)
+    cache_key = get_cache_key(
+        source=source,
+        query=effective_query,
+        fields=fields,
+        num_results=num_results,
+        qf=qf,
+        field_boosts=field_boosts
+    )
+    
+    source_meta.update({"status": "pending", "attempts": 0, "count": 0, "cache": CACHE_MISS})
+    shared_meta: Dict[str, Any] = {}
+    
+    try:
+        cached_results: Optional[List[SearchResult]] = None
+        if use_cache:
+            cached_results, cache_status = lookup_cache(cache_key)
+            source_meta["cache"] = cache_status
+            if cache_status == CACHE_HIT:
+                logger.info(f"Cache hit for {source}: {len(cached_results)} results")
+                source_meta.update({"status": "ok", "count": len(cached_results)})
+                return cached_results
+        
+        inflight_key = (cache_key, current_lane())
+        inflight = _inflight_fetches.get(inflight_key)
+        if inflight is None:
+            shared_meta = {"status": "pending", "attempts": 0, "count": 0}
+            task = asyncio.create_task(_run_fallback_chain(
+                source,
+                effective_query,
+                fields,
+                num_results,
+                attempts,
+                qf,
+                field_boosts,
+                cache_key,
+                shared_meta
+            ))
+            _inflight_fetches[inflight_key] = (task, shared_meta)
+            task.add_done_callback(lambda _: _inflight_fetches.pop(inflight_key, None))
+        else:
+            logger.info(f"Joining in-flight request for {source}")
+            task, shared_meta = inflight
+            source_meta["coalesced"] = True
+        
+        # Shield the shared task so one caller's deadline does not cancel it for the others
+        source_results = await asyncio.shield(task)
+        
+        if source_results is None and cached_results:
+            logger.warning(f"Serving {len(cached_results)} stale cached results for {source}")
+            source_meta["served_stale"] = True
+            return cached_results
+        return source_results
+    finally:
+        if shared_meta:
+            for key in ("status", "attempts", "count", "error"):
+                if key in shared_meta:
+                    source_meta[key] = shared_meta[key]
+        source_meta["elapsed_ms"] = round((time.perf_counter() - start_time) * 1000, 1)
+
+
+def _prepare_source_fetches(
+    query: str,
+    sources: List[str],
+    fields: List[str],
+    max_results: Optional[int],
+    attempts: int,
+    use_transformed_query: bool,
+    original_query: Optional[str],
+    qf: Optional[str],
+    field_boosts: Optional[Dict[str, float]],
+    use_cache: bool
+) -> Tuple[List[str], Dict[str, Dict[str, Any]], Callable[[str], Awaitable[Optional[List[SearchResult]]]]]:
+    """
+    Resolve which sources to query and build the per-source fetch coroutine.
+    
+    Args:
+        query: Search query string (a list is joined into one string)
+        sources: Requested sources
+        fields: List of fields to retrieve
+        max_results: Maximum number of results to return per source
+        attempts: Maximum number of retry attempts per source
+        use_transformed_query: Whether to use the transformed query
+        original_query: The original query before transformation
+        qf: Query field weights
+        field_boosts: Field boosts for query transformation
+        use_cache: Whether to read through the result cache
+    
+    Returns:
+        Tuple: Enabled sources (deduplicated, in request order), per-source
+            metadata (disabled sources already marked), and a function that
+            starts the fetch for a source
+    """
+    # Convert query to string if it's a list
+    if isinstance(query, list):
+        query = " ".join(str(item) for item in query)
+        logger.warning(f"Query was a list, converted to string: {query}")
+    
+    # Set number of results
+    num_results = max_results or DEFAULT_NUM_RESULTS
+    
+    source_meta: Dict[str, Dict[str, Any]] = {}
+    active_sources = []
+    for source in sources:
+        if source not in SERVICE_CONFIG or not SERVICE_CONFIG[source]["enabled"]:
+            logger.warning(f"Source {source} is not enabled or not configured")
+            source_meta[source] = {"status": "disabled", "attempts": 0, "count": 0, "elapsed_ms": 0.0}
+            continue
+        if source in source_meta:
+            continue
+        source_meta[source] = {}
+        active_sources.append(source)
+    
+    def fetch(source: str) -> Awaitable[Optional[List[SearchResult]]]:
+        return _fetch_source_with_fallback(
+            source,
+            query,
+            fields,
+            num_results,
+            attempts,
+            use_transformed_query,
+            original_query,
+            qf,
+            field_boosts,
+            source_meta[source],
+            use_cache=use_cache
+        )
+    
+    return active_sources, source_meta, fetch
+
+
+async def _iter_completed_fetches(
+    active_sources: List[str],
+    fetch: Callable[[str], Awaitable[Optional[List[SearchResult]]]],
+    source_meta: Dict[str, Dict[str, Any]],
+    deadline: Optional[float]
+) -> AsyncIterator[Tuple[str, Optional[List[SearchResult]]]]:
+    """
+    Run every source concurrently and yield each one as soon as it finishes.
+    
+    Sources still running when the deadline expires are cancelled and
+    yielded last with a deadline_exceeded status. If the consumer stops
+    iterating early, the remaining fetches are cancelled.
+    
+    Args:
+        active_sources: Sources to fetch
+        fetch: Function starting the fetch for a source
+        source_meta: Per-source metadata, updated with failure statuses
+        deadline: Global request deadline in seconds (None to disable)
+    
+    Yields:
+        Tuple[str, Optional[List[SearchResult]]]: Source and its results
+            (None when the source failed or timed out)
+    """
+    tasks = {asyncio.create_task(fetch(source)): source for source in active_sources}
+    pending = set(tasks)
+    expires_at = None if deadline is None else time.perf_counter() + deadline
+    try:
+        while pending:
+            timeout = None if expires_at is None else max(expires_at - time.perf_counter(), 0)
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in sorted(done, key=lambda t: active_sources.index(tasks[t])):
+                source = tasks[task]
+                if task.exception() is not None:
+                    logger.error(f"Error fetching results from {source}: {task.exception()}")
+                    source_meta[source]["status"] = "error"
+                    source_meta[source]["error"] = str(task.exception())
+                    yield source, None
+                else:
+                    yield source, task.result()
+        
+        if pending:
+            for task in pending:
+                task.cancel()
+            # Let cancelled tasks unwind so their metadata is finalised
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in sorted(pending, key=lambda t: active_sources.index(tasks[t])):
+                source = tasks[task]
+                logger.error(f"Request deadline of {deadline}s exceeded before {source} finished")
+                source_meta[source]["status"] = "deadline_exceeded"
+                yield source, None
+            pending = set()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def stream_results_with_metadata(
+    query: str,
+    sources: List[str],
+    fields: List[str],
+    max_results: Optional[int] = None,
+    attempts: int = 2,
+    use_transformed_query: bool = False,
+    original_query: Optional[str] = None,
+    qf: Optional[str] = None,
+    field_boosts: Optional[Dict[str, float]] = None,
+    deadline: Optional[float] = DEFAULT_REQUEST_DEADLINE,
+    use_cache: bool = True
+) -> AsyncIterator[Tuple[str, Optional[List[SearchResult]], Dict[str, Any]]]:
+    """
+    Query sources concurrently and yield each source as soon as it completes.
+    
+    Streaming counterpart of get_results_with_metadata: disabled sources are
+    yielded first, then sources in completion order, then any that missed
+    the deadline.
+    
+    Args:
+        query: Search query string
+        sources: List of search engine sources to query
+        fields: List of fields to retrieve
+        max_results: Maximum number of results to return per source
+        attempts: Maximum number of retry attempts per source
+        use_transformed_query: Whether to use the transformed query
+        original_query: The original query before transformation
+        qf: Query field weights (e.g., "title^50 author^30")
+        field_boosts: Dictionary mapping field names to boost values for query transformation
+        deadline: Global request deadline in seconds (None to disable)
+        use_cache: Whether to read through the result cache before querying sources
+    
+    Yields:
+        Tuple[str, Optional[List[SearchResult]], Dict[str, Any]]: Source, its
+            results (None if unavailable) and its status/attempts/count/cache
+            metadata
+    """
+    active_sources, source_meta, fetch = _prepare_source_fetches(
+        query, sources, fields, max_results, attempts, use_transformed_query,
+        original_query, qf, field_boosts, use_cache
+    )
+    for source, meta in source_meta.items():
+        if source not in active_sources:
+            yield source, None, meta
+    
+    async for source, source_results in _iter_completed_fetches(active_sources, fetch, source_meta, deadline):
+        yield source, source_results, source_meta[source]
+
+
+async def get_results_with_metadata(
+    query: str, 
+    sources: List[str], 
+    fields: List[str], 
+    max_results: Optional[int] = None,
+    attempts: int = 2,
+    use_transformed_query: bool = False,
+    original_query: Optional[str] = None,
+    qf: Optional[str] = None,
+    field_boosts: Optional[Dict[str, float]] = None,
+    concurrent: bool = True,
+    deadline: Optional[float] = DEFAULT_REQUEST_DEADLINE,
+    use_cache: bool = True
+) -> Tuple[Dict[str, List[SearchResult]], Dict[str, Any]]:
+    """
+    Get search results from multiple sources along with per-source metadata.
+    
+    In concurrent mode every source runs its attempt/fallback chain as its own
+    task, so the request costs roughly the slowest source rather than the sum of
+    all of them. Sources still running when ``deadline`` expires are cancelled;
+    results from the sources that did finish are returned as-is.
+    
+    Args:
+        query: Search query string
+        sources: List of search engine sources to query
+        fields: List of fields to retrieve
+        max_results: Maximum number of results to return per source
+        attempts: Maximum number of retry attempts per source
+        use_transformed_query: Whether to use the transformed query
+        original_query: The original query before transformation
+        qf: Query field weights (e.g., "title^50 author^30")
+        field_boosts: Dictionary mapping field names to boost values for query transformation
+        concurrent: Whether to query sources concurrently (default) or one at a time
+        deadline: Global request deadline in seconds (None to disable)
+        use_cache: Whether to read through the result cache before querying sources
+    
+    Returns:
+        Tuple[Dict[str, List[SearchResult]], Dict[str, Any]]: Results by source, and
+            metadata with a per-source status/attempts/count/cache/elapsed_ms entry
+            plus a summary of cache statuses
+    """
+    results: Dict[str, List[SearchResult]] = {}
+    start_time = time.perf_counter()
+    
+    active_sources, source_meta, fetch = _prepare_source_fetches(
+        query, sources, fields, max_results, attempts, use_transformed_query,
+        original_query, qf, field_boosts, use_cache
+    )
+    
+    if concurrent:
+        async for source, source_results in _iter_completed_fetches(active_sources, fetch, source_meta, deadline):
+            if source_results:
+                results[source] = source_results
+    else:
+        for source in active_sources:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - (time.perf_counter() - start_time)
+                if remaining <= 0:
+                    source_meta[source].update({"status": "deadline_exceeded", "attempts": 0, "count": 0, "elapsed_ms": 0.0})
+                    continue
+            try:
+                source_results = await asyncio.wait_for(fetch(source), timeout=remaining)
+            except asyncio.TimeoutError:
+                logger.error(f"Request deadline of {deadline}s exceeded before {source} finished")
+                source_meta[source]["status"] = "deadline_exceeded"
+                continue
+            if source_results:
+                results[source] = source_results
+    
+    cache_summary: Dict[str, int] = {}
+    for meta in source_meta.values():
+        if "cache" in meta:
+            cache_summary[meta["cache"]] = cache_summary.get(meta["cache"], 0) + 1
+    
+    metadata = {
+        "concurrent": concurrent,
+        "deadline": deadline,
+        "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1),
+        "cache": cache_summary,
+        "sources": source_meta
+    }
+    return results, metadata
+
 
 async def get_results_with_fallback(
     query: str, 
@@ -148,11 +707,17 @@ async def get_results_with_fallback(
     use_transformed_query: bool = False,
     original_query: Optional[str] = None,
     qf: Optional[str] = None,  # Query field weights for qf parameter
-    field_boosts: Optional[Dict[str, float]] = None  # Field boosts for query transformation
+    field_boosts: Optional[Dict[str, float]] = None,  # Field boosts for query transformation
+    concurrent: bool = True,
+    deadline: Optional[float] = DEFAULT_REQUEST_DEADLINE,
+    use_cache: bool = True
 ) -> Dict[str, List[SearchResult]]:
     """
     Get search results from multiple sources with fallback mechanisms.
     
+    Thin wrapper around get_results_with_metadata for callers that only need
+    the results.
+    
     Args:
         query: Search query string
         sources: List of search engine sources to query
@@ -163,124 +728,333 @@ async def get_results_with_fallback(
         original_query: The original query before transformation
         qf: Query field weights (e.g., "title^50 author^30")
         field_boosts: Dictionary mapping field names to boost values for query transformation
+        concurrent: Whether to query sources concurrently (default) or one at a time
+        deadline: Global request deadline in seconds (None to disable)
+        use_cache: Whether to read through the result cache before querying sources
     
     Returns:
         Dict[str, List[SearchResult]]: Dictionary mapping source names to result lists
     """
-    results: Dict[str, List[SearchResult]] = {}
+    results, _ = await get_results_with_metadata(
+        query=query,
+        sources=sources,
+        fields=fields,
+        max_results=max_results,
+        attempts=attempts,
+        use_transformed_query=use_transformed_query,
+        original_query=original_query,
+        qf=qf,
+        field_boosts=field_boosts,
+        concurrent=concurrent,
+        deadline=deadline,
+        use_cache=use_cache
+    )
+    return results
+
+
+def _result_value(result: Any, field: str, default: Any = None) -> Any:
+    """
+    Read a field from a SearchResult object or a result dictionary.
     
-    # Convert query to string if it's a list
-    if isinstance(query, list):
-        query = " ".join(str(item) for item in query)
-        logger.warning(f"Query was a list, converted to string: {query}")
+    Args:
+        result: SearchResult object or dictionary
+        field: Name of the field to read
+        default: Value returned when the field is missing
     
-    # Set number of results
-    num_results = max_results or DEFAULT_NUM_RESULTS
+    Returns:
+        Any: The field value
+    """
+    if isinstance(result, dict):
+        return result.get(field, default)
+    return getattr(result, field, default)
+
+
+def _first_value(value: Any) -> Any:
+    """Unwrap list-valued fields (e.g. Solr's title lists) to their first element."""
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def _normalize_doi(doi: Any) -> Optional[str]:
+    """
+    Normalize a DOI for matching.
     
-    # Process each source
-    for source in sources:
-        if source not in SERVICE_CONFIG or not SERVICE_CONFIG[source]["enabled"]:
-            logger.warning(f"Source {source} is not enabled or not configured")
-            continue
-        
-        success = False
-        attempt_count = 0
+    Args:
+        doi: Raw DOI value (string, list or None)
+    
+    Returns:
+        Optional[str]: Lowercased DOI without resolver prefixes, or None
+    """
+    doi = _first_value(doi)
+    if not doi:
+        return None
+    doi = str(doi).strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "http://dx.doi.org/", "doi:"):
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+            break
+    return doi or None
+
+
+def _normalize_title(title: Any) -> str:
+    """
+    Normalize a title for matching.
+    
+    Args:
+        title: Raw title value (string, list or None)
+    
+    Returns:
+        str: Lowercased title with collapsed whitespace ('' if missing)
+    """
+    title = _first_value(title)
+    if not title:
+        return ""
+    return " ".join(str(title).lower().split())
+
+
+class SourceFeatures:
+    """
+    Normalized identifiers and features for one source's results.
+    
+    Built once per source per comparison and shared by every metric and every
+    source pair, so dict/SearchResult access, list-valued fields and
+    normalization are handled in a single pass. Per-field features are
+    computed lazily the first time a metric asks for them.
+    
+    Attributes:
+        results: The source's results (SearchResult objects or dictionaries)
+        dois: Normalized DOI -> position of the (last) result carrying it
+        titles: Normalized title -> position
+        no_doi_titles: Normalized title -> position, for results without a DOI
+        bibcodes: Bibcode -> position
+        doi_by_position: Normalized DOI (or None) for each result
+        ranks: Rank of each result
+        identifiers: DOI, or "title:..." for results without one
+        ranked_ids: "doi:..." or "title:..." per result, in rank order
+        match_ids: Every "doi:..." and "title:..." identifier of the source
+        stem: Whether text features are stemmed
+    """
+    
+    def __init__(self, results: List[Any], stem: bool = True):
+        self.results = results
+        self.stem = stem
+        self.dois: Dict[str, int] = {}
+        self.titles: Dict[str, int] = {}
+        self.no_doi_titles: Dict[str, int] = {}
+        self.bibcodes: Dict[str, int] = {}
+        self.doi_by_position: List[Optional[str]] = []
+        self.ranks: List[int] = []
+        self.identifiers: Set[str] = set()
+        self.ranked_ids: List[str] = []
+        self.match_ids: Set[str] = set()
+        self._field_values: Dict[str, Set[str]] = {}
+        self._term_counts: Dict[str, Dict[str, int]] = {}
+        self._document_frequencies: Dict[str, Dict[str, int]] = {}
         
-        while attempt_count < attempts and not success:
-            attempt_count += 1
-            logger.info(f"Attempt {attempt_count} for {source}")
+        for idx, result in enumerate(results):
+            doi = _normalize_doi(_result_value(result, "doi"))
+            title = _normalize_title(_result_value(result, "title", ""))
+            bibcode = _first_value(_result_value(result, "bibcode"))
             
-            try:
-                # Determine which query to use based on source and transformation settings
-                effective_query = query
-                if use_transformed_query:
-                    if source == "ads":
-                        # For ADS, use the transformed query directly
-                        effective_query = query
-                        logger.info(f"Using transformed query for ADS: {effective_query}")
-                    else:
-                        # For other sources, use the original query
-                        effective_query = original_query or query
-                        logger.info(f"Using original query for {source}: {effective_query}")
-                
-                # Set timeout based on service config
-                timeout = SERVICE_CONFIG[source]["timeout"] if source in SERVICE_CONFIG else 15
-                
-                # Create a task for the source query with timeout
-                async def query_source():
-                    if source == "ads":
-                        return await get_ads_results(
-                            effective_query, 
-                            fields, 
-                            num_results, 
-                            qf=qf,  # Pass qf parameter
-                            field_boosts=field_boosts  # Pass field boosts
-                        )
-                    elif source == "scholar":
-                        if attempt_count == 1:
-                            return await get_scholar_results(effective_query, fields, num_results)
-                        else:
-                            return await get_scholar_results_fallback(effective_query, num_results)
-                    elif source == "semanticScholar":
-                        return await get_semantic_scholar_results(effective_query, fields, num_results)
-                    elif source == "webOfScience":
-                        return await get_web_of_science_results(effective_query, fields, num_results)
-                    else:
-                        logger.error(f"Unknown source: {source}")
-                        return []
-                
-                # Execute query with timeout
-                try:
-                    source_results = await asyncio.wait_for(query_source(), timeout=timeout)
-                except asyncio.TimeoutError:
-                    logger.error(f"Timeout after {timeout} seconds for {source}")
-                    continue
-                
-                # Check if we got enough results
-                min_results = SERVICE_CONFIG[source]["min_results"] if source in SERVICE_CONFIG else 1
-                if len(source_results) >= min_results:
-                    success = True
-                    logger.info(f"Successfully retrieved {len(source_results)} results from {source}")
-                else:
-                    logger.warning(f"Insufficient results from {source}: {len(source_results)} < {min_results}")
-            
-            except Exception as e:
-                logger.error(f"Error fetching results from {source}: {str(e)}")
-                if attempt_count == attempts:
-                    logger.error(f"All attempts failed for {source}")
+            self.doi_by_position.append(doi)
+            self.ranks.append(_result_value(result, "rank", 0))
+            if doi:
+                self.identifiers.add(doi)
+                self.dois[doi] = idx
+                self.match_ids.add(f"doi:{doi}")
+                self.ranked_ids.append(f"doi:{doi}")
+            else:
+                self.identifiers.add(f"title:{title}")
+                self.no_doi_titles[title] = idx
+                if title:
+                    self.ranked_ids.append(f"title:{title}")
+            if title:
+                self.titles[title] = idx
+                self.match_ids.add(f"title:{title}")
+            if bibcode:
+                self.bibcodes[str(bibcode).strip()] = idx
+    
+    def field_values(self, field: str) -> Set[str]:
+        """
+        Get the set of normalized values of a field across all results.
         
-        # Save results to cache if successful
-        if success and source_results:
-            # Generate cache key with all parameters
-            cache_key = get_cache_key(
-                source=source,
-                query=effective_query,  # Use the effective query that was actually used
-                fields=fields,
-                num_results=num_results,
-                qf=qf,
-                field_boosts=field_boosts
-            )
-            save_to_cache(cache_key, source_results)
-            results[source] = source_results
+        List-valued fields (e.g. author) contribute each item separately.
+        
+        Args:
+            field: Name of the result field
+        
+        Returns:
+            Set[str]: Lowercased, stripped, non-empty values
+        """
+        values = self._field_values.get(field)
+        if values is None:
+            values = set()
+            for result in self.results:
+                value = _result_value(result, field, "") or ""
+                items = value if isinstance(value, list) else [value]
+                for item in items:
+                    item = str(item).lower().strip()
+                    if item:
+                        values.add(item)
+            self._field_values[field] = values
+        return values
     
-    return results
+    def term_counts(self, field: str) -> Dict[str, int]:
+        """
+        Get term frequencies of a text field, preprocessed once per document.
+        
+        Args:
+            field: Name of the text field (e.g. title, abstract)
+        
+        Returns:
+            Dict[str, int]: Term -> frequency across all results
+        """
+        counts = self._term_counts.get(field)
+        if counts is None:
+            counts = {}
+            document_frequencies: Dict[str, int] = {}
+            for result in self.results:
+                terms = preprocess_text(_result_value(result, field, "") or "", apply_stemming=self.stem).split()
+                for term in terms:
+                    counts[term] = counts.get(term, 0) + 1
+                for term in set(terms):
+                    document_frequencies[term] = document_frequencies.get(term, 0) + 1
+            self._term_counts[field] = counts
+            self._document_frequencies[field] = document_frequencies
+        return counts
+    
+    def document_frequencies(self, field: str) -> Dict[str, int]:
+        """
+        Get the number of results whose text field contains each term.
+        
+        Args:
+            field: Name of the text field (e.g. title, abstract)
+        
+        Returns:
+            Dict[str, int]: Term -> number of results containing it
+        """
+        self.term_counts(field)
+        return self._document_frequencies[field]
+
+
+def _compare_identifier_indexes(features1: SourceFeatures, features2: SourceFeatures) -> Dict[str, Any]:
+    """
+    Compute overlap statistics for a pair of sources from their identifier indexes.
+    
+    Results are matched by DOI first; titles only add matches for papers not
+    already matched by DOI.
+    
+    Args:
+        features1: Features of the first source
+        features2: Features of the second source
+    
+    Returns:
+        Dict[str, Any]: Overlap counts, matching identifiers and same-rank matches
+    """
+    overlap_doi = features1.dois.keys() & features2.dois.keys()
+    overlap_title_no_doi = features1.no_doi_titles.keys() & features2.no_doi_titles.keys()
+    all_title_matches = features1.titles.keys() & features2.titles.keys()
+    overlap_bibcode = features1.bibcodes.keys() & features2.bibcodes.keys()
+    
+    # Title matches whose papers also match by DOI are already counted
+    doi_title_overlap = set()
+    for title in all_title_matches:
+        doi1 = features1.doi_by_position[features1.titles[title]]
+        if doi1 and doi1 == features2.doi_by_position[features2.titles[title]]:
+            doi_title_overlap.add(title)
+    
+    unique_title_matches = all_title_matches - doi_title_overlap
+    total_overlap = len(overlap_doi) + len(unique_title_matches)
+    
+    # Calculate same rank matches, DOI matches first, then titles of papers without DOIs
+    same_rank_matches = []
+    for doi in overlap_doi:
+        idx1 = features1.dois[doi]
+        if features1.ranks[idx1] == features2.ranks[features2.dois[doi]]:
+            same_rank_matches.append({
+                "doi": doi,
+                "rank": features1.ranks[idx1],
+                "title": _result_value(features1.results[idx1], "title", "")
+            })
+    for title in overlap_title_no_doi:
+        idx1 = features1.no_doi_titles[title]
+        if features1.ranks[idx1] == features2.ranks[features2.no_doi_titles[title]]:
+            same_rank_matches.append({
+                "title": title,
+                "rank": features1.ranks[idx1]
+            })
+    
+    return {
+        "overlap": total_overlap,
+        "source1_only": len(features1.identifiers) - total_overlap,
+        "source2_only": len(features2.identifiers) - total_overlap,
+        # Add matching pairs for reference
+        "matching_dois": list(overlap_doi),
+        "matching_titles": list(overlap_title_no_doi),
+        "all_matching_titles": list(all_title_matches),
+        "unique_title_matches": list(unique_title_matches),
+        "matching_bibcodes": list(overlap_bibcode),
+        "same_rank_matches": same_rank_matches,
+        "same_rank_count": len(same_rank_matches)
+    }
+
+
+def _text_similarity_matrix(
+    source_features: List[SourceFeatures], 
+    field: str, 
+    weighting: str = "tf"
+) -> np.ndarray:
+    """
+    Calculate cosine similarity of a text field between all sources at once.
+    
+    Each source becomes one row of a term matrix over a vocabulary shared by
+    all sources in the request.
+    
+    Args:
+        source_features: Feature records of the sources to compare
+        field: Text field to compare (e.g. title, abstract)
+        weighting: "tf" for raw term frequencies, "tfidf" to weight terms by
+            inverse document frequency across all results
+    
+    Returns:
+        np.ndarray: Symmetric source-by-source similarity matrix
+    """
+    counts = [features.term_counts(field) for features in source_features]
+    vocabulary = build_vocabulary(counts)
+    matrix = build_term_matrix(counts, vocabulary)
+    
+    if weighting == "tfidf":
+        document_frequencies: Dict[str, int] = {}
+        for features in source_features:
+            for term, frequency in features.document_frequencies(field).items():
+                document_frequencies[term] = document_frequencies.get(term, 0) + frequency
+        num_documents = sum(len(features.results) for features in source_features)
+        matrix *= calculate_idf_weights(document_frequencies, num_documents, vocabulary)
+    
+    return calculate_pairwise_cosine_similarity(matrix)
 
 
 def compare_results(
     sources_results: Dict[str, List[SearchResult]], 
     metrics: List[str], 
-    fields: List[str]
+    fields: List[str],
+    cosine_weighting: str = "tf",
+    stem: bool = True
 ) -> Dict[str, Any]:
     """
     Compare search results from different sources using specified metrics.
     
     Computes similarity scores between results from different sources based
-    on various similarity metrics and fields.
+    on various similarity metrics and fields. Set-based and text metrics are
+    computed for all source pairs at once as matrix operations.
     
     Args:
         sources_results: Dictionary mapping source names to result lists
         metrics: List of similarity metrics to compute
         fields: List of fields to use for comparisons
+        cosine_weighting: Term weighting for cosine similarity ("tf" or "tfidf")
+        stem: Whether to stem text before computing cosine similarity
     
     Returns:
         Dict[str, Any]: Dictionary with comparison results
@@ -304,491 +1078,68 @@ def compare_results(
         logger.warning("Not enough sources with results to compare")
         return comparison_results
     
+    # Normalize each source once; every pair and metric reuses these records
+    source_features = [SourceFeatures(sources_results[source], stem=stem) for source in active_sources]
+    
+    # Initialize metric specific dictionaries
+    for metric in metrics:
+        comparison_results["similarity"].setdefault(metric, {})
+    
+    # Score all source pairs at once for the set-based and text metrics
+    jaccard_requested = "jaccard" in metrics or "exact_match" in metrics
+    cosine_requested = "cosine" in metrics or "content_similarity" in metrics
+    rbo_requested = "rankBiased" in metrics or "rank_correlation" in metrics
+    identifier_jaccard = None
+    rank_overlap = None
+    field_jaccard: Dict[str, np.ndarray] = {}
+    field_cosine: Dict[str, np.ndarray] = {}
+    if jaccard_requested:
+        identifier_jaccard = calculate_pairwise_jaccard_similarity(
+            [features.match_ids for features in source_features], empty_value=0.0
+        )
+        for field in fields:
+            field_jaccard[field] = calculate_pairwise_jaccard_similarity(
+                [features.field_values(field) for features in source_features]
+            )
+    if rbo_requested:
+        # Rank lists use DOI identifiers where available, then titles
+        rank_overlap = calculate_pairwise_rank_based_overlap([features.ranked_ids for features in source_features])
+    if cosine_requested:
+        for field in fields:
+            if field in ("title", "abstract"):
+                field_cosine[field] = _text_similarity_matrix(source_features, field, cosine_weighting)
+    
     # Calculate overlap and similarity for each pair of sources
     for i, source1 in enumerate(active_sources):
-        for j, source2 in enumerate(active_sources):
-            if i >= j:  # Skip self-comparisons and redundant pairs
-                continue
-            
-            # Get results for both sources
-            results1 = sources_results[source1]
-            results2 = sources_results[source2]
-            
-            # Skip if either source has no results
-            if not results1 or not results2:
-                continue
-            
-            # Create pair key
+        for j in range(i + 1, len(active_sources)):
+            source2 = active_sources[j]
+            features1 = source_features[i]
+            features2 = source_features[j]
             pair_key = f"{source1}_vs_{source2}"
             
-            # Calculate overlap
-            # Get sets of DOIs or titles for unique identification
-            identifiers1: Set[str] = set()
-            identifiers2: Set[str] = set()
-            
-            # Track which results have DOIs
-            results1_with_doi = {}
-            results2_with_doi = {}
-            results1_no_doi = {}
-            results2_no_doi = {}
+            comparison_results["overlap"][pair_key] = _compare_identifier_indexes(features1, features2)
             
-            # Categorize results by whether they have DOIs
-            for idx, result in enumerate(results1):
-                # Handle both SearchResult objects and dictionaries
-                if isinstance(result, dict):
-                    doi = result.get('doi')
-                    title = result.get('title', '')
-                else:
-                    doi = getattr(result, 'doi', None)
-                    title = getattr(result, 'title', '')
-                
-                # Ensure doi and title are strings
-                if isinstance(doi, list):
-                    doi = doi[0] if doi else None
-                if isinstance(title, list):
-                    title = title[0] if title else ''
+            if jaccard_requested:
+                # Jaccard similarity is based on overlap in DOIs or titles
+                jaccard_sim = float(identifier_jaccard[i, j])
+                log_debug(logger, "Jaccard similarity for %s vs %s: %s", source1, source2, jaccard_sim)
+                comparison_results["similarity"].setdefault("jaccard", {})[pair_key] = jaccard_sim
                 
-                if doi:
-                    identifiers1.add(str(doi).lower())
-                    results1_with_doi[str(doi).lower()] = idx
-                else:
-                    identifiers1.add(f"title:{str(title).lower()}")
-                    results1_no_doi[str(title).lower()] = idx
-                
-                # Always track title for potential title matching
-                if title:
-                    # Store title with index regardless of DOI status
-                    if "titles" not in results1_with_doi:
-                        results1_with_doi["titles"] = {}
-                    results1_with_doi["titles"][str(title).lower()] = idx
+                # Also store field-specific Jaccard similarities
+                for field, similarities in field_jaccard.items():
+                    comparison_results["similarity"]["jaccard"][f"{pair_key}_{field}"] = float(similarities[i, j])
             
-            for idx, result in enumerate(results2):
-                # Handle both SearchResult objects and dictionaries
-                if isinstance(result, dict):
-                    doi = result.get('doi')
-                    title = result.get('title', '')
-                else:
-                    doi = getattr(result, 'doi', None)
-                    title = getattr(result, 'title', '')
-                
-                # Ensure doi and title are strings
-                if isinstance(doi, list):
-                    doi = doi[0] if doi else None
-                if isinstance(title, list):
-                    title = title[0] if title else ''
-                
-                if doi:
-                    identifiers2.add(str(doi).lower())
-                    results2_with_doi[str(doi).lower()] = idx
-                else:
-                    identifiers2.add(f"title:{str(title).lower()}")
-                    results2_no_doi[str(title).lower()] = idx
-                
-                # Always track title for potential title matching
-                if title:
-                    # Store title with index regardless of DOI status
-                    if "titles" not in results2_with_doi:
-                        results2_with_doi["titles"] = {}
-                    results2_with_doi["titles"][str(title).lower()] = idx
-            
-            # First, find overlap by DOI (most precise)
-            overlap_doi = set(results1_with_doi.keys()) & set(results2_with_doi.keys())
-            if "titles" in overlap_doi:
-                overlap_doi.remove("titles")  # Remove the "titles" key from the overlap calculation
-            
-            # Then find overlap by title, but only for entries without DOIs
-            overlap_title_no_doi = set(results1_no_doi.keys()) & set(results2_no_doi.keys())
-            
-            # Find all title matches regardless of DOI status
-            all_title_matches = set()
-            if "titles" in results1_with_doi and "titles" in results2_with_doi:
-                all_title_matches = set(results1_with_doi["titles"].keys()) & set(results2_with_doi["titles"].keys())
-            
-            # Find which papers were matched by both DOI and title (to avoid double counting)
-            # Papers matched by title that also have DOIs matched
-            doi_title_overlap = set()
-            for title in all_title_matches:
-                # Get corresponding papers for this title
-                papers1 = []
-                for idx, r in enumerate(results1):
-                    if idx in results1_with_doi.get("titles", {}).values():
-                        # Handle both SearchResult objects and dictionaries
-                        if isinstance(r, dict):
-                            r_title = r.get('title', '')
-                        else:
-                            r_title = getattr(r, 'title', '')
-                        
-                        # Ensure title is a string
-                        if isinstance(r_title, list):
-                            r_title = r_title[0] if r_title else ''
-                        
-                        if str(r_title).lower() == title:
-                            papers1.append(r)
-                
-                papers2 = []
-                for idx, r in enumerate(results2):
-                    if idx in results2_with_doi.get("titles", {}).values():
-                        # Handle both SearchResult objects and dictionaries
-                        if isinstance(r, dict):
-                            r_title = r.get('title', '')
-                        else:
-                            r_title = getattr(r, 'title', '')
-                        
-                        # Ensure title is a string
-                        if isinstance(r_title, list):
-                            r_title = r_title[0] if r_title else ''
-                        
-                        if str(r_title).lower() == title:
-                            papers2.append(r)
-                
-                # Check if any of these papers also match by DOI
-                for p1 in papers1:
-                    for p2 in papers2:
-                        # Handle both SearchResult objects and dictionaries
-                        if isinstance(p1, dict):
-                            p1_doi = p1.get('doi')
-                        else:
-                            p1_doi = getattr(p1, 'doi', None)
-                        
-                        if isinstance(p2, dict):
-                            p2_doi = p2.get('doi')
-                        else:
-                            p2_doi = getattr(p2, 'doi', None)
-                        
-                        # Ensure doi is a string
-                        if isinstance(p1_doi, list):
-                            p1_doi = p1_doi[0] if p1_doi else None
-                        if isinstance(p2_doi, list):
-                            p2_doi = p2_doi[0] if p2_doi else None
-                        
-                        if p1_doi and p2_doi and str(p1_doi).lower() == str(p2_doi).lower():
-                            doi_title_overlap.add(title)
-                            break
-            
-            # Calculate total unique matches (DOI matches + title-only matches)
-            # Papers matched by DOI plus papers matched only by title (no DOI match)
-            unique_title_matches = all_title_matches - doi_title_overlap
-            total_overlap = len(overlap_doi) + len(unique_title_matches)
+            if rbo_requested:
+                rbo_similarity = float(rank_overlap[i, j])
+                log_debug(logger, "Rank-biased overlap for %s vs %s: %s", source1, source2, rbo_similarity)
+                comparison_results["similarity"].setdefault("rankBiased", {})[pair_key] = rbo_similarity
             
-            # Store overlap results
-            comparison_results["overlap"][pair_key] = {
-                "overlap": total_overlap,
-                "source1_only": len(identifiers1) - total_overlap,
-                "source2_only": len(identifiers2) - total_overlap,
-                # Add matching pairs for reference
-                "matching_dois": list(overlap_doi),
-                "matching_titles": list(overlap_title_no_doi),
-                "all_matching_titles": list(all_title_matches),
-                "unique_title_matches": list(unique_title_matches)
-            }
-            
-            # Calculate same rank matches
-            same_rank_matches = []
-            # Check DOI matches first
-            for doi in overlap_doi:
-                if doi == "titles":  # Skip the titles key
-                    continue
-                idx1 = results1_with_doi.get(doi)
-                idx2 = results2_with_doi.get(doi)
-                if idx1 is not None and idx2 is not None:
-                    r1 = results1[idx1]
-                    r2 = results2[idx2]
-                    rank1 = r1.get('rank') if isinstance(r1, dict) else getattr(r1, 'rank', 0)
-                    rank2 = r2.get('rank') if isinstance(r2, dict) else getattr(r2, 'rank', 0)
-                    if rank1 == rank2:
-                        title1 = r1.get('title', '') if isinstance(r1, dict) else getattr(r1, 'title', '')
-                        same_rank_matches.append({
-                            "doi": doi,
-                            "rank": rank1,
-                            "title": title1
-                        })
-            
-            # Then check title matches for papers without DOIs
-            for title in overlap_title_no_doi:
-                idx1 = results1_no_doi.get(title)
-                idx2 = results2_no_doi.get(title)
-                if idx1 is not None and idx2 is not None:
-                    r1 = results1[idx1]
-                    r2 = results2[idx2]
-                    rank1 = r1.get('rank') if isinstance(r1, dict) else getattr(r1, 'rank', 0)
-                    rank2 = r2.get('rank') if isinstance(r2, dict) else getattr(r2, 'rank', 0)
-                    if rank1 == rank2:
-                        same_rank_matches.append({
-                            "title": title,
-                            "rank": rank1
-                        })
-            
-            # Add to results
-            comparison_results["overlap"][pair_key]["same_rank_matches"] = same_rank_matches
-            comparison_results["overlap"][pair_key]["same_rank_count"] = len(same_rank_matches)
-            
-            # Initialize similarity results for this pair
-            if "similarity" not in comparison_results:
-                comparison_results["similarity"] = {}
-            
-            # Initialize metric specific dictionaries if they don't exist
-            for metric in metrics:
-                if metric not in comparison_results["similarity"]:
-                    comparison_results["similarity"][metric] = {}
-            
-            # Calculate similarity metrics
-            for metric in metrics:
-                if metric == "jaccard" or metric == "exact_match":
-                    # Jaccard similarity is based on overlap in DOIs or titles
-                    jaccard_sim = 0.0
-                    
-                    # Normalize the identifiers for better matching
-                    norm_identifiers1 = set()
-                    norm_identifiers2 = set()
-                    
-                    # Log the identifiers for debugging
-                    logger.info(f"Calculating jaccard similarity for {source1} vs {source2}")
-                    logger.info(f"Source1 ({source1}) has {len(results1)} results")
-                    logger.info(f"Source2 ({source2}) has {len(results2)} results")
-                    
-                    # Prepare normalized identifiers
-                    for r in results1:
-                        # Handle both SearchResult objects and dictionaries
-                        if isinstance(r, dict):
-                            doi = r.get('doi')
-                            title = r.get('title', '')
-                        else:
-                            doi = getattr(r, 'doi', None)
-                            title = getattr(r, 'title', '')
-                        
-                        # Ensure doi and title are strings
-                        if isinstance(doi, list):
-                            doi = doi[0] if doi else None
-                        if isinstance(title, list):
-                            title = title[0] if title else ''
-                        
-                        if doi:
-                            # Clean and normalize DOI
-                            clean_doi = str(doi).lower().strip()
-                            norm_identifiers1.add(f"doi:{clean_doi}")
-                            logger.debug(f"Source1 DOI: {clean_doi}")
-                        if title:
-                            # Clean and normalize title
-                            clean_title = str(title).lower().strip()
-                            norm_identifiers1.add(f"title:{clean_title}")
-                            logger.debug(f"Source1 Title: {clean_title}")
-                    
-                    for r in results2:
-                        # Handle both SearchResult objects and dictionaries
-                        if isinstance(r, dict):
-                            doi = r.get('doi')
-                            title = r.get('title', '')
-                        else:
-                            doi = getattr(r, 'doi', None)
-                            title = getattr(r, 'title', '')
-                        
-                        # Ensure doi and title are strings
-                        if isinstance(doi, list):
-                            doi = doi[0] if doi else None
-                        if isinstance(title, list):
-                            title = title[0] if title else ''
-                        
-                        if doi:
-                            # Clean and normalize DOI
-                            clean_doi = str(doi).lower().strip()
-                            norm_identifiers2.add(f"doi:{clean_doi}")
-                            logger.debug(f"Source2 DOI: {clean_doi}")
-                        if title:
-                            # Clean and normalize title
-                            clean_title = str(title).lower().strip()
-                            norm_identifiers2.add(f"title:{clean_title}")
-                            logger.debug(f"Source2 Title: {clean_title}")
-                    
-                    # Calculate intersection and union
-                    intersection = norm_identifiers1.intersection(norm_identifiers2)
-                    union = norm_identifiers1.union(norm_identifiers2)
-                    
-                    logger.info(f"Found {len(intersection)} matching identifiers out of {len(union)} total identifiers")
-                    
-                    if union:  # Avoid division by zero
-                        jaccard_sim = len(intersection) / len(union)
-                    
-                    logger.info(f"Jaccard similarity for {source1} vs {source2}: {jaccard_sim}")
-                    
-                    # Store in both formats for compatibility
-                    comparison_results["similarity"]["jaccard"][pair_key] = jaccard_sim
-                    
-                    # Also calculate field-specific Jaccard similarities
-                    for field in fields:
-                        # Extract values from results
-                        values1 = []
-                        for r in results1:
-                            # Handle both SearchResult objects and dictionaries
-                            if isinstance(r, dict):
-                                value = r.get(field, "") or ""
-                            else:
-                                value = getattr(r, field, "") or ""
-                            # Convert list to tuple if necessary (lists are unhashable)
-                            if isinstance(value, list):
-                                for item in value:
-                                    values1.append(str(item).lower().strip())
-                            else:
-                                values1.append(str(value).lower().strip())
-                        values1 = {v for v in values1 if v}
-                        
-                        values2 = []
-                        for r in results2:
-                            # Handle both SearchResult objects and dictionaries
-                            if isinstance(r, dict):
-                                value = r.get(field, "") or ""
-                            else:
-                                value = getattr(r, field, "") or ""
-                            # Convert list to tuple if necessary (lists are unhashable)
-                            if isinstance(value, list):
-                                for item in value:
-                                    values2.append(str(item).lower().strip())
-                            else:
-                                values2.append(str(value).lower().strip())
-                        values2 = {v for v in values2 if v}
-                        
-                        # Calculate Jaccard similarity for this field
-                        field_sim = calculate_jaccard_similarity(values1, values2)
-                        
-                        # Store result with field name
-                        comparison_results["similarity"]["jaccard"][f"{pair_key}_{field}"] = field_sim
-                
-                elif metric == "rankBiased" or metric == "rank_correlation":
-                    # Extract identifiers from each source, matching by DOI first, then title
-                    logger.info(f"Calculating rank-biased overlap for {source1} vs {source2}")
-                    
-                    # Create lists to preserve the ranking order
-                    items1 = []
-                    items2 = []
-                    
-                    # Create maps between identifiers and their indices
-                    id_to_index1 = {}
-                    id_to_index2 = {}
-                    
-                    # Process results and build ranked lists with both DOI and title identifiers
-                    for idx, r in enumerate(results1):
-                        # Handle both SearchResult objects and dictionaries
-                        if isinstance(r, dict):
-                            doi = r.get('doi')
-                            title = r.get('title', '')
-                        else:
-                            doi = getattr(r, 'doi', None)
-                            title = getattr(r, 'title', '')
-                        
-                        # Ensure doi and title are strings
-                        if isinstance(doi, list):
-                            doi = doi[0] if doi else None
-                        if isinstance(title, list):
-                            title = title[0] if title else ''
-                        
-                        identifier = None
-                        if doi:
-                            clean_doi = str(doi).lower().strip()
-                            identifier = f"doi:{clean_doi}"
-                        elif title:
-                            clean_title = str(title).lower().strip()
-                            identifier = f"title:{clean_title}"
-                        
-                        if identifier:
-                            items1.append(identifier)
-                            id_to_index1[identifier] = idx
-                            
-                            # Also add title as alternative identifier if DOI exists
-                            if doi and title:
-                                alt_id = f"title:{str(title).lower().strip()}"
-                                id_to_index1[alt_id] = idx
-                    
-                    for idx, r in enumerate(results2):
-                        # Handle both SearchResult objects and dictionaries
-                        if isinstance(r, dict):
-                            doi = r.get('doi')
-                            title = r.get('title', '')
-                        else:
-                            doi = getattr(r, 'doi', None)
-                            title = getattr(r, 'title', '')
-                        
-                        # Ensure doi and title are strings
-                        if isinstance(doi, list):
-                            doi = doi[0] if doi else None
-                        if isinstance(title, list):
-                            title = title[0] if title else ''
-                        
-                        identifier = None
-                        if doi:
-                            clean_doi = str(doi).lower().strip()
-                            identifier = f"doi:{clean_doi}"
-                        elif title:
-                            clean_title = str(title).lower().strip()
-                            identifier = f"title:{clean_title}"
-                        
-                        if identifier:
-                            items2.append(identifier)
-                            id_to_index2[identifier] = idx
-                            
-                            # Also add title as alternative identifier if DOI exists
-                            if doi and title:
-                                alt_id = f"title:{str(title).lower().strip()}"
-                                id_to_index2[alt_id] = idx
-                    
-                    # Log the items for debugging
-                    logger.info(f"Source1 ({source1}) ranked list has {len(items1)} items")
-                    logger.info(f"Source2 ({source2}) ranked list has {len(items2)} items")
-                    
-                    # Find overlapping items for debugging
-                    overlap_items = set([i for i in items1 if i in items2 or i.replace("doi:", "title:") in items2 or i.replace("title:", "doi:") in items2])
-                    logger.info(f"Found {len(overlap_items)} overlapping items in rank lists")
-                    
-                    # Calculate rank-based overlap
-                    rbo_similarity = calculate_rank_based_overlap(items1, items2)
-                    logger.info(f"Rank-biased overlap for {source1} vs {source2}: {rbo_similarity}")
-                    
-                    # Store in both formats for compatibility
-                    comparison_results["similarity"]["rankBiased"][pair_key] = rbo_similarity
-                
-                elif metric == "cosine" or metric == "content_similarity":
-                    # Calculate cosine similarity based on text content
-                    for field in fields:
-                        if field in ["title", "abstract"]:
-                            # Extract and preprocess text
-                            texts1 = []
-                            for r in results1:
-                                # Handle both SearchResult objects and dictionaries
-                                if isinstance(r, dict):
-                                    text = r.get(field, "") or ""
-                                else:
-                                    text = getattr(r, field, "") or ""
-                                texts1.append(preprocess_text(text))
-                            texts1 = [t for t in texts1 if t]
-                            
-                            texts2 = []
-                            for r in results2:
-                                # Handle both SearchResult objects and dictionaries
-                                if isinstance(r, dict):
-                                    text = r.get(field, "") or ""
-                                else:
-                                    text = getattr(r, field, "") or ""
-                                texts2.append(preprocess_text(text))
-                            texts2 = [t for t in texts2 if t]
-                            
-                            # Skip if either list is empty
-                            if not texts1 or not texts2:
-                                continue
-                            
-                            # Convert to term frequency dictionaries
-                            vec1: Dict[str, int] = {}
-                            for text in texts1:
-                                for term in text.split():
-                                    vec1[term] = vec1.get(term, 0) + 1
-                            
-                            vec2: Dict[str, int] = {}
-                            for text in texts2:
-                                for term in text.split():
-                                    vec2[term] = vec2.get(term, 0) + 1
-                            
-                            # Calculate cosine similarity
-                            cosine_sim = calculate_cosine_similarity(vec1, vec2)
-                            
-                            # Store result
-                            comparison_results["similarity"]["cosine"][f"{pair_key}_{field}"] = cosine_sim
+            if cosine_requested:
+                for field, similarities in field_cosine.items():
+                    # Skip fields with no text in either source
+                    if not features1.term_counts(field) or not features2.term_counts(field):
+                        continue
+                    comparison_results["similarity"].setdefault("cosine", {})[f"{pair_key}_{field}"] = float(similarities[i, j])
     
     return comparison_results
 
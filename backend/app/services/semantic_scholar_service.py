@@ -7,14 +7,11 @@ searching for publications and retrieving bibliographic information.
 import os
 import logging
 import time
-import random
-import asyncio
 from typing import List, Dict, Any, Optional
 
-import httpx
 
 from ..api.models import SearchResult
-from ..utils.http import safe_api_request
+from ..utils.http import safe_api_request, shared_http_client
 from ..utils.cache import get_cache_key, save_to_cache, load_from_cache
 
 # Setup logging
@@ -93,113 +90,78 @@ async def get_semantic_scholar_results(
         "fields": ",".join(API_FIELDS)
     }
     
-    # Implement progressive backoff for retries
-    retry_delay = INITIAL_RETRY_DELAY
-    
-    for attempt in range(MAX_RETRIES):
-        try:
-            # Add delay on retries - exponential backoff with jitter
-            if attempt > 0:
-                jitter = random.uniform(0, 0.1 * retry_delay)  # Add 0-10% jitter
-                actual_delay = retry_delay + jitter
-                logger.info(f"Semantic Scholar retry {attempt+1}/{MAX_RETRIES}, waiting {actual_delay:.2f}s")
-                await asyncio.sleep(actual_delay)
-                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)  # Double delay, but cap at MAX_RETRY_DELAY
-            
-            logger.info(f"Making Semantic Scholar API request (attempt {attempt+1}/{MAX_RETRIES})")
-            
-            async with httpx.AsyncClient() as client:
-                # More direct way of making the request with better timeout handling
-                response = await client.get(
-                    SEMANTIC_SCHOLAR_API_URL,
-                    params=params,
-                    headers=headers,
-                    timeout=TIMEOUT_SECONDS
-                )
-                
-                # Handle rate limiting explicitly
-                if response.status_code == 429:
-                    retry_after = int(response.headers.get('retry-after', retry_delay))
-                    logger.warning(f"Semantic Scholar API rate limit hit. Retrying after {retry_after}s")
-                    await asyncio.sleep(retry_after + random.random())
-                    continue
-                
-                # Check for other errors
-                if response.status_code != 200:
-                    logger.error(f"Error fetching from Semantic Scholar. Status: {response.status_code}")
-                    if response.status_code >= 500:  # Server error, retry
-                        continue
-                    else:  # Client error, don't retry
-                        break
-                
-                # Parse JSON response
-                data = response.json()
-                papers = data.get("data", [])
-                
-                if not papers:
-                    logger.warning(f"No results found from Semantic Scholar for query: {query}")
-                    break
-                
-                logger.info(f"Received {len(papers)} results from Semantic Scholar")
-                
-                # Process results
-                results: List[SearchResult] = []
-                
-                for rank, paper in enumerate(papers, 1):
-                    try:
-                        # Extract author names (maximum 3 to match other engines)
-                        authors = []
-                        if paper.get("authors"):
-                            for author in paper["authors"][:3]:
-                                name = author.get("name")
-                                if name:
-                                    authors.append(name)
-                        
-                        # Extract DOI if available
-                        doi = None
-                        if paper.get("externalIds") and paper["externalIds"].get("DOI"):
-                            doi = paper["externalIds"]["DOI"]
-                        
-                        # Create URL (paper URL or DOI URL)
-                        url = paper.get("url", "")
-                        if not url and doi:
-                            url = f"https://doi.org/{doi}"
-                        
-                        # Create result object
-                        result = SearchResult(
-                            title=paper.get("title", ""),
-                            author=authors,
-                            abstract=paper.get("abstract", ""),
-                            doi=doi,
-                            year=paper.get("year"),
-                            url=url,
-                            source="semanticScholar",
-                            rank=rank,
-                            citation_count=paper.get("citationCount", 0)
-                        )
-                        results.append(result)
-                    except Exception as e:
-                        logger.error(f"Error processing Semantic Scholar result {rank}: {str(e)}")
-                        continue
+    request_succeeded = False
+    try:
+        async with shared_http_client("semanticScholar") as client:
+            logger.info("Making Semantic Scholar API request")
+            data = await safe_api_request(
+                client,
+                "GET",
+                SEMANTIC_SCHOLAR_API_URL,
+                max_retries=MAX_RETRIES,
+                retry_delay=INITIAL_RETRY_DELAY,
+                max_retry_delay=MAX_RETRY_DELAY,
+                source="semanticScholar",
+                params=params,
+                headers=headers,
+                timeout=TIMEOUT_SECONDS
+            )
+        
+        request_succeeded = True
+        papers = data.get("data", [])
+        logger.info(f"Received {len(papers)} results from Semantic Scholar")
+        
+        # Process results
+        results: List[SearchResult] = []
+        
+        for rank, paper in enumerate(papers, 1):
+            try:
+                # Extract author names (maximum 3 to match other engines)
+                authors = []
+                if paper.get("authors"):
+                    for author in paper["authors"][:3]:
+                        name = author.get("name")
+                        if name:
+                            authors.append(name)
                 
-                # Save to cache and return if we have results
-                if results:
-                    logger.info(f"Retrieved {len(results)} results from Semantic Scholar")
-                    save_to_cache(cache_key, results)
-                    return results
+                # Extract DOI if available
+                doi = None
+                if paper.get("externalIds") and paper["externalIds"].get("DOI"):
+                    doi = paper["externalIds"]["DOI"]
                 
-                # No results found after successful request
-                break
+                # Create URL (paper URL or DOI URL)
+                url = paper.get("url", "")
+                if not url and doi:
+                    url = f"https://doi.org/{doi}"
                 
-        except httpx.TimeoutException:
-            logger.warning(f"Semantic Scholar API timeout (attempt {attempt+1})")
-            # Continue to next retry
-        except Exception as e:
-            logger.error(f"Error retrieving results from Semantic Scholar (attempt {attempt+1}): {str(e)}")
-            # Continue to next retry
+                # Create result object
+                result = SearchResult(
+                    title=paper.get("title", ""),
+                    author=authors,
+                    abstract=paper.get("abstract", ""),
+                    doi=doi,
+                    year=paper.get("year"),
+                    url=url,
+                    source="semanticScholar",
+                    rank=rank,
+                    citation_count=paper.get("citationCount", 0)
+                )
+                results.append(result)
+            except Exception as e:
+                logger.error(f"Error processing Semantic Scholar result {rank}: {str(e)}")
+                continue
+        
+        # Save to cache and return if we have results
+        if results:
+            logger.info(f"Retrieved {len(results)} results from Semantic Scholar")
+            save_to_cache(cache_key, results)
+            return results
+        
+    except Exception as e:
+        logger.error(f"Error retrieving results from Semantic Scholar: {str(e)}")
     
-    # If we reach here, all attempts failed or returned no results
-    logger.warning(f"No results found in Semantic Scholar for '{query}' after {MAX_RETRIES} attempts")
+    # If we reach here, the request failed or returned no results
+    logger.warning(f"No results found in Semantic Scholar for '{query}'")
     
     # Create a placeholder result
     no_results_msg = f"The term '{query}' did not match any documents in Semantic Scholar, or the API rate limit was exceeded."
@@ -216,8 +178,9 @@ async def get_semantic_scholar_results(
     )
     results = [placeholder]
     
-    # Save to cache
-    save_to_cache(cache_key, results)
+    # Only cache a genuine empty answer; failures (rate limits, open circuit) should be retried
+    if request_succeeded:
+        save_to_cache(cache_key, results)
     return results
 
 
@@ -254,7 +217,7 @@ async def get_paper_details_by_doi(doi: str) -> Optional[Dict[str, Any]]:
     ]
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client("semanticScholar") as client:
             # Set headers with API key if available
             headers = {
                 "Content-Type": "application/json",
@@ -274,6 +237,7 @@ async def get_paper_details_by_doi(doi: str) -> Optional[Dict[str, Any]]:
                 client, 
                 "GET", 
                 api_url, 
+                source="semanticScholar",
                 headers=headers, 
                 params=params,
                 timeout=TIMEOUT_SECONDS
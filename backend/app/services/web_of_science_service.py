@@ -11,7 +11,7 @@ from typing import List, Dict, Any, Optional, Union
 import httpx
 
 from ..api.models import SearchResult
-from ..utils.http import safe_api_request
+from ..utils.http import safe_api_request, shared_http_client
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -111,18 +111,19 @@ async def get_web_of_science_results(
     logger.info(f"Request parameters: {params}")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                base_url,
-                headers=headers,
-                params=params,
-                timeout=TIMEOUT_SECONDS
-            )
-            
-            # Log response status
-            logger.info(f"Web of Science API response status: {response.status_code}")
-            
-            if response.status_code != 200:
+        async with shared_http_client("webOfScience") as client:
+            try:
+                data = await safe_api_request(
+                    client,
+                    "GET",
+                    base_url,
+                    source="webOfScience",
+                    headers=headers,
+                    params=params,
+                    timeout=TIMEOUT_SECONDS
+                )
+            except httpx.HTTPStatusError as e:
+                response = e.response
                 logger.warning(f"WoS API error: Status {response.status_code}")
                 logger.debug(f"Response: {response.text[:500]}")
                 # Return placeholder for error case
@@ -140,8 +141,6 @@ async def get_web_of_science_results(
                 )
                 return [placeholder]
             
-            data = response.json()
-            
             # Log the API response structure for debugging
             if 'hits' in data and len(data['hits']) > 0:
                 first_hit = data['hits'][0]
@@ -340,7 +339,7 @@ async def get_wos_paper_details(doi: str) -> Optional[Dict[str, Any]]:
     logger.info(f"Request parameters: {params}")
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client("webOfScience") as client:
             response = await client.get(
                 base_url,
                 headers=headers,
@@ -4,14 +4,23 @@ Caching utilities for the search-comparisons application.
 This module provides functions for caching search results to reduce API calls
 and improve performance. It handles generating cache keys, saving results to
 the cache, and loading results from the cache.
+
+Results are stored through a pluggable backend. The default backend is tiered:
+an in-process LRU of ready-made SearchResult lists sits in front of a single
+SQLite file holding compressed binary payloads. Both tiers are size-bounded,
+a background sweeper drops entries that are past their stale grace period,
+and each tier keeps hit/miss counters.
 """
 import os
-import json
 import time
+import pickle
+import sqlite3
+import zlib
 import hashlib
 import logging
-from typing import List, Optional, Dict, Any
-from pathlib import Path
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple
 
 from ..api.models import SearchResult
 
@@ -21,6 +30,472 @@ logger = logging.getLogger(__name__)
 # Cache configuration
 CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'cache'))
 CACHE_EXPIRY = int(os.environ.get('CACHE_EXPIRY', 86400))  # Default: 1 day in seconds
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'tiered')  # tiered, memory or sqlite
+CACHE_MEMORY_ENTRIES = int(os.environ.get('CACHE_MEMORY_ENTRIES', 512))  # Max keys held in memory
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 256 * 1024 * 1024))  # Max on-disk payload size
+CACHE_STALE_TTL = int(os.environ.get('CACHE_STALE_TTL', 86400))  # How long expired entries are kept for stale reads
+CACHE_SWEEP_INTERVAL = int(os.environ.get('CACHE_SWEEP_INTERVAL', 600))  # Seconds between expiry sweeps
+
+# Cache lookup statuses
+CACHE_HIT = "hit"
+CACHE_STALE = "stale"
+CACHE_MISS = "miss"
+
+
+class CacheEntry:
+    """
+    A cached list of search results with its freshness metadata.
+    
+    Attributes:
+        results: The cached search results
+        timestamp: Time the entry was written (seconds since the epoch)
+        expiry: Number of seconds the entry stays fresh
+    """
+    __slots__ = ("results", "timestamp", "expiry")
+    
+    def __init__(self, results: List[SearchResult], timestamp: float, expiry: int):
+        self.results = results
+        self.timestamp = timestamp
+        self.expiry = expiry
+    
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        """
+        Check whether the entry is past its expiry time.
+        
+        Args:
+            now: Current time (defaults to time.time())
+        
+        Returns:
+            bool: True if the entry is expired
+        """
+        return (now or time.time()) - self.timestamp > self.expiry
+    
+    def is_purgeable(self, now: Optional[float] = None) -> bool:
+        """
+        Check whether the entry is past its stale grace period and can be dropped.
+        
+        Args:
+            now: Current time (defaults to time.time())
+        
+        Returns:
+            bool: True if the entry can be removed from the cache
+        """
+        return (now or time.time()) - self.timestamp > self.expiry + CACHE_STALE_TTL
+
+
+class CacheStats:
+    """
+    Hit/miss counters for a single cache tier.
+    
+    Attributes:
+        hits: Lookups that found an entry
+        misses: Lookups that found nothing
+        sets: Entries written
+        evictions: Entries dropped to stay within the size bound
+        expired: Entries dropped by expiry sweeps
+    """
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expired = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the counters and the derived hit rate.
+        
+        Returns:
+            Dict[str, Any]: Counter values and hit_rate in the range [0, 1]
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class CacheBackend:
+    """
+    Interface for result cache backends.
+    
+    Backends store CacheEntry objects by key. Freshness is decided by the
+    caller from the entry metadata, so backends may return expired entries
+    until they are swept.
+    """
+    name = "base"
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for key, or None if not present."""
+        raise NotImplementedError
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry under key, evicting older entries if needed."""
+        raise NotImplementedError
+    
+    def delete(self, key: str) -> None:
+        """Remove the entry for key if present."""
+        raise NotImplementedError
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        raise NotImplementedError
+    
+    def sweep(self) -> int:
+        """Remove entries past their stale grace period and return how many were removed."""
+        raise NotImplementedError
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and size information."""
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process LRU cache of ready-made SearchResult lists.
+    
+    Entries are held as model objects, so hits pay no deserialization or
+    validation cost. Callers must treat returned results as read-only.
+    
+    Attributes:
+        max_entries: Maximum number of keys held before the least recently used is evicted
+    """
+    name = "memory"
+    
+    def __init__(self, max_entries: int = CACHE_MEMORY_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._stats.sets += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def sweep(self) -> int:
+        now = time.time()
+        with self._lock:
+            purgeable = [key for key, entry in self._entries.items() if entry.is_purgeable(now)]
+            for key in purgeable:
+                del self._entries[key]
+            self._stats.expired += len(purgeable)
+        return len(purgeable)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats.to_dict(),
+                "entries": len(self._entries),
+                "max_entries": self.max_entries
+            }
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    On-disk cache stored in a single SQLite file.
+    
+    Results are serialized as zlib-compressed pickles of plain dictionaries and
+    rebuilt with SearchResult.model_construct, skipping validation of data we
+    wrote ourselves. The total payload size is bounded; once it is exceeded the
+    least recently accessed entries are evicted.
+    
+    Attributes:
+        path: Path to the SQLite database file
+        max_bytes: Maximum total payload size in bytes
+    """
+    name = "sqlite"
+    
+    def __init__(self, path: Optional[str] = None, max_bytes: int = CACHE_MAX_BYTES) -> None:
+        self.path = path or os.path.join(CACHE_DIR, "results.sqlite3")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+        self._conn: Optional[sqlite3.Connection] = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database lazily so importing this module never touches disk."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, "
+                "timestamp REAL NOT NULL, "
+                "expiry INTEGER NOT NULL, "
+                "last_access REAL NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "payload BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)")
+            self._conn = conn
+        return self._conn
+    
+    @staticmethod
+    def _serialize(results: List[SearchResult]) -> bytes:
+        """Serialize results to a compact binary payload."""
+        data = [result.model_dump(exclude_none=True) for result in results]
+        return zlib.compress(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), 1)
+    
+    @staticmethod
+    def _deserialize(payload: bytes) -> List[SearchResult]:
+        """Rebuild results from a binary payload without re-validating them."""
+        return [SearchResult.model_construct(**item) for item in pickle.loads(zlib.decompress(payload))]
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT timestamp, expiry, payload FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats.misses += 1
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._stats.hits += 1
+        timestamp, expiry, payload = row
+        return CacheEntry(self._deserialize(payload), timestamp, expiry)
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        payload = self._serialize(entry.results)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, timestamp, expiry, last_access, size, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, entry.timestamp, entry.expiry, time.time(), len(payload), sqlite3.Binary(payload))
+            )
+            self._stats.sets += 1
+            self._evict_over_budget(conn)
+    
+    def _evict_over_budget(self, conn: sqlite3.Connection) -> None:
+        """Evict least recently accessed entries until the payload budget is met."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self._stats.evictions += evicted
+        logger.debug(f"Evicted {evicted} cache entries to stay under {self.max_bytes} bytes")
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM entries")
+    
+    def sweep(self) -> int:
+        with self._lock:
+            cursor = self._connect().execute(
+                "DELETE FROM entries WHERE ? - timestamp > expiry + ?", (time.time(), CACHE_STALE_TTL)
+            )
+            self._stats.expired += cursor.rowcount
+        return cursor.rowcount
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            return {
+                **self._stats.to_dict(),
+                "entries": count,
+                "bytes": total,
+                "max_bytes": self.max_bytes
+            }
+    
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class TieredCacheBackend(CacheBackend):
+    """
+    Two-tier cache: an in-process LRU in front of a persistent backend.
+    
+    Reads check memory first and promote disk hits into memory; writes go to
+    both tiers.
+    
+    Attributes:
+        memory: The in-process tier
+        disk: The persistent tier
+    """
+    name = "tiered"
+    
+    def __init__(
+        self,
+        memory: Optional[MemoryCacheBackend] = None,
+        disk: Optional[CacheBackend] = None
+    ) -> None:
+        self.memory = memory or MemoryCacheBackend()
+        self.disk = disk or SQLiteCacheBackend()
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry
+        entry = self.disk.get(key)
+        if entry is not None:
+            self.memory.set(key, entry)
+        return entry
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        self.memory.set(key, entry)
+        self.disk.set(key, entry)
+    
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        self.disk.delete(key)
+    
+    def clear(self) -> None:
+        self.memory.clear()
+        self.disk.clear()
+    
+    def sweep(self) -> int:
+        self.memory.sweep()
+        return self.disk.sweep()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"memory": self.memory.stats(), "disk": self.disk.stats()}
+
+
+def create_cache_backend(name: str = CACHE_BACKEND) -> CacheBackend:
+    """
+    Create a cache backend by name.
+    
+    Args:
+        name: One of "tiered", "memory" or "sqlite"
+    
+    Returns:
+        CacheBackend: The configured backend (tiered for unknown names)
+    """
+    if name == "memory":
+        return MemoryCacheBackend()
+    if name == "sqlite":
+        return SQLiteCacheBackend()
+    if name != "tiered":
+        logger.warning(f"Unknown cache backend '{name}', using tiered")
+    return TieredCacheBackend()
+
+
+_backend: CacheBackend = create_cache_backend()
+_sweeper_thread: Optional[threading.Thread] = None
+_sweeper_stop = threading.Event()
+
+
+def get_cache_backend() -> CacheBackend:
+    """
+    Get the active cache backend.
+    
+    Returns:
+        CacheBackend: The backend used by save_to_cache and lookup_cache
+    """
+    return _backend
+
+
+def set_cache_backend(backend: CacheBackend) -> None:
+    """
+    Replace the active cache backend.
+    
+    Args:
+        backend: The backend to use from now on
+    """
+    global _backend
+    _backend = backend
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    Get hit/miss counters and size information for the active backend.
+    
+    Returns:
+        Dict[str, Any]: Backend name and its statistics
+    """
+    return {"backend": _backend.name, "stats": _backend.stats()}
+
+
+def sweep_expired_entries() -> int:
+    """
+    Remove entries that are past their stale grace period.
+    
+    Returns:
+        int: Number of entries removed
+    """
+    try:
+        removed = _backend.sweep()
+        if removed:
+            logger.info(f"Cache sweep removed {removed} expired entries")
+        return removed
+    except Exception as e:
+        logger.error(f"Error sweeping cache: {str(e)}")
+        return 0
+
+
+def start_cache_sweeper(interval: int = CACHE_SWEEP_INTERVAL) -> None:
+    """
+    Start the background thread that periodically sweeps expired entries.
+    
+    Args:
+        interval: Seconds between sweeps
+    """
+    global _sweeper_thread
+    if _sweeper_thread is not None and _sweeper_thread.is_alive():
+        return
+    
+    def _run() -> None:
+        while not _sweeper_stop.wait(interval):
+            sweep_expired_entries()
+    
+    _sweeper_stop.clear()
+    _sweeper_thread = threading.Thread(target=_run, name="cache-sweeper", daemon=True)
+    _sweeper_thread.start()
+
+
+def stop_cache_sweeper() -> None:
+    """Stop the background expiry sweeper if it is running."""
+    global _sweeper_thread
+    _sweeper_stop.set()
+    if _sweeper_thread is not None:
+        _sweeper_thread.join(timeout=5)
+        _sweeper_thread = None
 
 
 def get_cache_key(
@@ -74,8 +549,8 @@ def save_to_cache(key: str, data: List[SearchResult], expiry: int = CACHE_EXPIRY
     """
     Save search results to the cache.
     
-    Writes the search results to a JSON file in the cache directory with the
-    specified expiration time.
+    Writes the search results to the active cache backend with the specified
+    expiration time.
     
     Args:
         key: The cache key (from get_cache_key)
@@ -86,26 +561,7 @@ def save_to_cache(key: str, data: List[SearchResult], expiry: int = CACHE_EXPIRY
         bool: True if successful, False otherwise
     """
     try:
-        # Ensure cache directory exists
-        os.makedirs(CACHE_DIR, exist_ok=True)
-        
-        # Prepare cache path
-        cache_path = Path(CACHE_DIR) / f"{key}.json"
-        
-        # Convert SearchResult objects to dictionaries
-        serializable_data = [result.dict() for result in data]
-        
-        # Prepare cache content with metadata
-        cache_content = {
-            "timestamp": time.time(),
-            "expiry": expiry,
-            "results": serializable_data
-        }
-        
-        # Write to cache file
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(cache_content, f, ensure_ascii=False, indent=2)
-        
+        _backend.set(key, CacheEntry(list(data), time.time(), expiry))
         logger.debug(f"Saved {len(data)} results to cache with key {key}")
         return True
         
@@ -114,47 +570,48 @@ def save_to_cache(key: str, data: List[SearchResult], expiry: int = CACHE_EXPIRY
         return False
 
 
-def load_from_cache(key: str) -> Optional[List[SearchResult]]:
+def lookup_cache(key: str) -> Tuple[Optional[List[SearchResult]], str]:
     """
-    Load search results from the cache if available and not expired.
+    Look up search results in the cache and report the cache status.
     
-    Checks if a cache file exists for the given key and whether it has expired.
-    If valid, loads and returns the cached results.
+    Unlike load_from_cache, expired entries are still returned (flagged as
+    stale) so that callers can decide whether to serve them when a refresh
+    fails.
     
     Args:
         key: The cache key (from get_cache_key)
     
     Returns:
-        Optional[List[SearchResult]]: List of SearchResult objects if cache hit,
-                                     None if cache miss or expired
+        Tuple[Optional[List[SearchResult]], str]: The cached results (None on a
+            miss) and one of "hit", "stale" or "miss"
     """
     try:
-        # Prepare cache path
-        cache_path = Path(CACHE_DIR) / f"{key}.json"
+        entry = _backend.get(key)
+        if entry is None:
+            logger.debug(f"Cache miss: No cache entry found for key {key}")
+            return None, CACHE_MISS
         
-        # Check if cache file exists
-        if not cache_path.exists():
-            logger.debug(f"Cache miss: No cache file found for key {key}")
-            return None
-        
-        # Read cache file
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            cache_content = json.load(f)
-        
-        # Check if cache has expired
-        timestamp = cache_content.get("timestamp", 0)
-        expiry = cache_content.get("expiry", CACHE_EXPIRY)
-        
-        if time.time() - timestamp > expiry:
-            logger.debug(f"Cache expired for key {key}")
-            return None
-        
-        # Convert dictionaries back to SearchResult objects
-        results = [SearchResult(**item) for item in cache_content.get("results", [])]
-        
-        logger.debug(f"Cache hit: Loaded {len(results)} results for key {key}")
-        return results
+        status = CACHE_STALE if entry.is_expired() else CACHE_HIT
+        logger.debug(f"Cache {status}: Loaded {len(entry.results)} results for key {key}")
+        return list(entry.results), status
         
     except Exception as e:
         logger.error(f"Error loading from cache: {str(e)}")
-        return None 
\ No newline at end of file
+        return None, CACHE_MISS
+
+
+def load_from_cache(key: str) -> Optional[List[SearchResult]]:
+    """
+    Load search results from the cache if available and not expired.
+    
+    Args:
+        key: The cache key (from get_cache_key)
+    
+    Returns:
+        Optional[List[SearchResult]]: List of SearchResult objects if cache hit,
+                                     None if cache miss or expired
+    """
+    results, status = lookup_cache(key)
+    if status != CACHE_HIT:
+        return None
+    return results
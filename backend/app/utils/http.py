@@ -2,17 +2,25 @@
 HTTP utility functions for the search-comparisons application.
 
 This module provides utilities for making HTTP requests, including
-a timeout context manager and a safe API request function with proper
-error handling and retry logic.
+a timeout context manager, a safe API request function with backoff,
+per-source circuit breakers and retry metrics, and the application-wide
+registry of pooled HTTP clients used to talk to upstream services.
 """
+import os
 import signal
 import time
+import asyncio
 import logging
 import random
-from contextlib import contextmanager
-from typing import Any, Dict, Optional, Union, Callable, TypeVar, cast
+import importlib.util
+from email.utils import parsedate_to_datetime
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Union, Callable, TypeVar, cast
 
 import httpx
+import aiohttp
+
+from .scheduler import throttle_source
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -20,6 +28,28 @@ logger = logging.getLogger(__name__)
 # Define a generic type variable for the return type
 T = TypeVar('T')
 
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Connection pool settings per upstream service. Each service talks to a
+# single host, so these limits are effectively per-host limits.
+HTTP_CLIENT_CONFIG: Dict[str, Dict[str, Any]] = {
+    "default": {"max_connections": 20, "max_keepalive": 10, "timeout": 5.0},
+    "ads": {"max_connections": 20, "max_keepalive": 10, "timeout": 5.0},
+    "semanticScholar": {"max_connections": 10, "max_keepalive": 5, "timeout": 5.0},
+    "webOfScience": {"max_connections": 10, "max_keepalive": 5, "timeout": 5.0},
+    "scholar": {"max_connections": 4, "max_keepalive": 2, "timeout": 5.0},
+    "quepid": {"max_connections": 10, "max_keepalive": 5, "timeout": 5.0},
+    "solr": {"max_connections": 10, "max_keepalive": 5, "timeout": 5.0},
+    "llm": {"max_connections": 4, "max_keepalive": 2, "timeout": 30.0},
+}
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "true").lower() == "true"
+
+# Circuit breaker settings shared by all sources
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", 5))
+CIRCUIT_RECOVERY_TIMEOUT = float(os.environ.get("CIRCUIT_RECOVERY_TIMEOUT", 30))
+
 
 class timeout:
     """
@@ -81,45 +111,298 @@ class timeout:
         raise TimeoutError(self.timeout_message)
 
 
+class CircuitOpenError(Exception):
+    """Raised when a request is rejected because the source's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-source circuit breaker.
+    
+    After ``failure_threshold`` consecutive failed requests the circuit opens
+    and requests fail fast with CircuitOpenError. Once ``recovery_timeout``
+    seconds have passed a single probe request is let through (half-open);
+    its outcome closes the circuit again or re-opens it.
+    
+    Attributes:
+        name: Source the breaker protects
+        failure_threshold: Consecutive failures that open the circuit
+        recovery_timeout: Seconds to wait before probing an open circuit
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout: float = CIRCUIT_RECOVERY_TIMEOUT
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+    
+    def allow_request(self) -> bool:
+        """
+        Check whether a request may be sent to the source.
+        
+        Returns:
+            bool: True if the request may proceed
+        """
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+    
+    def record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+    
+    def release_probe(self) -> None:
+        """Let another probe through without recording an outcome (e.g. after a cancelled request)."""
+        self._probe_in_flight = False
+    
+    def record_failure(self) -> None:
+        """Count a failed request, opening the circuit at the threshold."""
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                _metrics_for(self.name)["circuit_opened"] += 1
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Describe the breaker state.
+        
+        Returns:
+            Dict[str, Any]: State, consecutive failures and seconds until a probe is allowed
+        """
+        retry_in = 0.0
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+        return {"state": self.state, "failures": self.failures, "retry_in": round(retry_in, 1)}
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_request_metrics: Dict[str, Dict[str, int]] = {}
+
+
+def _metrics_for(source: str) -> Dict[str, int]:
+    metrics = _request_metrics.get(source)
+    if metrics is None:
+        metrics = {
+            "requests": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "short_circuited": 0,
+            "circuit_opened": 0,
+            "budget_exhausted": 0
+        }
+        _request_metrics[source] = metrics
+    return metrics
+
+
+def get_circuit_breaker(source: str) -> CircuitBreaker:
+    """
+    Get the circuit breaker for a source, creating it on first use.
+    
+    Args:
+        source: Source name (e.g. "ads", "semanticScholar")
+    
+    Returns:
+        CircuitBreaker: The source's breaker
+    """
+    breaker = _circuit_breakers.get(source)
+    if breaker is None:
+        breaker = CircuitBreaker(source)
+        _circuit_breakers[source] = breaker
+    return breaker
+
+
+def get_http_metrics() -> Dict[str, Any]:
+    """
+    Get retry and circuit breaker metrics for all sources.
+    
+    Returns:
+        Dict[str, Any]: Per-source request counters and breaker states
+    """
+    return {
+        source: {**counters, "circuit": get_circuit_breaker(source).to_dict()}
+        for source, counters in _request_metrics.items()
+    }
+
+
+def reset_http_metrics() -> None:
+    """Reset all retry metrics and circuit breakers."""
+    _request_metrics.clear()
+    _circuit_breakers.clear()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header value.
+    
+    Args:
+        value: Header value, either delay seconds or an HTTP date
+    
+    Returns:
+        Optional[float]: Seconds to wait, or None if absent or unparseable
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def compute_backoff(
+    attempt: int,
+    retry_delay: float,
+    max_retry_delay: float,
+    retry_after: Optional[float] = None
+) -> float:
+    """
+    Compute the wait before a retry.
+    
+    Uses the server's Retry-After when given; otherwise exponential backoff
+    with jitter (50-150% of the nominal delay) to avoid synchronized retries.
+    
+    Args:
+        attempt: Retry number, starting at 1
+        retry_delay: Base delay in seconds
+        max_retry_delay: Upper bound on the delay
+        retry_after: Server-requested delay in seconds, if any
+    
+    Returns:
+        float: Seconds to wait
+    """
+    if retry_after is not None:
+        return min(retry_after, max_retry_delay)
+    delay = retry_delay * (2 ** (attempt - 1)) * (0.5 + random.random())
+    return min(delay, max_retry_delay)
+
+
 async def safe_api_request(
     client: httpx.AsyncClient, 
     method: str, 
     url: str, 
     max_retries: int = 3,
     retry_delay: float = 1.5,
+    source: Optional[str] = None,
+    max_retry_delay: float = 30.0,
+    retry_budget: Optional[float] = None,
     **kwargs: Any
 ) -> Dict[str, Any]:
     """
     Make a safe API request with retries and error handling.
     
-    Attempts to make the request multiple times before giving up, with
-    exponential backoff between retries. Handles common HTTP errors and
-    timeouts appropriately.
+    Attempts to make the request multiple times before giving up, sleeping
+    with jittered exponential backoff (or the server's Retry-After) between
+    retries. When a source is given, requests go through that source's
+    circuit breaker and are counted in the retry metrics, and a 429 pauses
+    the source's request scheduler for the backoff so that other callers
+    back off too.
     
     Args:
         client: The HTTPX client to use for the request
         method: HTTP method (GET, POST, etc.)
         url: URL to request
-        max_retries: Maximum number of retry attempts
+        max_retries: Maximum number of attempts
         retry_delay: Base delay between retries (with exponential backoff)
+        source: Source name for circuit breaking and metrics
+        max_retry_delay: Upper bound on a single backoff delay
+        retry_budget: Maximum total seconds to spend waiting between retries
         **kwargs: Additional arguments to pass to the client request method
     
     Returns:
         Dict[str, Any]: Response data as a dictionary
     
     Raises:
+        CircuitOpenError: If the source's circuit is open
         httpx.HTTPError: If the request fails after all retries
     """
+    breaker = get_circuit_breaker(source) if source else None
+    metrics = _metrics_for(source or "default")
+    metrics["requests"] += 1
+    
+    if breaker is not None and not breaker.allow_request():
+        metrics["short_circuited"] += 1
+        raise CircuitOpenError(f"Circuit for {source} is open; skipping request to {url}")
+    probing = breaker is not None and breaker.state == breaker.HALF_OPEN
+    
+    try:
+        return await _request_with_retries(
+            client, method, url, max_retries, retry_delay, source, max_retry_delay,
+            retry_budget, breaker, metrics, **kwargs
+        )
+    finally:
+        # A probe that ends without an outcome (cancelled, or a client error
+        # that says nothing about the source) must not block later probes
+        if probing:
+            breaker.release_probe()
+
+
+async def _request_with_retries(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    max_retries: int,
+    retry_delay: float,
+    source: Optional[str],
+    max_retry_delay: float,
+    retry_budget: Optional[float],
+    breaker: Optional[CircuitBreaker],
+    metrics: Dict[str, int],
+    **kwargs: Any
+) -> Dict[str, Any]:
+    """Send a request with retries, recording outcomes on the breaker and metrics."""
     attempt = 0
-    last_error = None
+    waited = 0.0
+    last_error: Optional[Exception] = None
+    retry_after: Optional[float] = None
+    rate_limited = False
     
     while attempt < max_retries:
         try:
-            # Add jitter to avoid thundering herd issues
             if attempt > 0:
-                delay = retry_delay * (2 ** (attempt - 1)) * (0.5 + random.random())
+                delay = compute_backoff(attempt, retry_delay, max_retry_delay, retry_after)
+                if retry_budget is not None and waited + delay > retry_budget:
+                    metrics["budget_exhausted"] += 1
+                    logger.warning(f"Retry budget of {retry_budget}s exhausted for {url}")
+                    break
                 logger.info(f"Retry attempt {attempt} for {url}. Waiting {delay:.2f}s")
-                await client.timeout(delay)
+                metrics["retries"] += 1
+                if rate_limited and source:
+                    # Hold back every caller of this source, not just this retry
+                    throttle_source(source, delay)
+                await asyncio.sleep(delay)
+                waited += delay
             
             # Make the request
             logger.debug(f"Making {method} request to {url}")
@@ -128,7 +411,11 @@ async def safe_api_request(
             response.raise_for_status()
             
             # Return successful response as dictionary
-            return response.json()
+            data = response.json()
+            metrics["successes"] += 1
+            if breaker is not None:
+                breaker.record_success()
+            return data
             
         except httpx.HTTPStatusError as e:
             status_code = e.response.status_code
@@ -138,25 +425,203 @@ async def safe_api_request(
             if status_code == 429 or (500 <= status_code < 600):
                 # These are retryable errors
                 last_error = e
+                retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+                rate_limited = status_code == 429
                 attempt += 1
             else:
-                # Client errors are not retryable
+                # Client errors are not retryable, and say nothing about the source's health
+                metrics["failures"] += 1
                 raise
                 
-        except (httpx.ConnectError, httpx.ReadTimeout, httpx.WriteTimeout) as e:
+        except httpx.TransportError as e:
             logger.warning(f"Connection/timeout error for {url}: {e}")
             last_error = e
+            retry_after = None
+            rate_limited = False
             attempt += 1
             
         except Exception as e:
             logger.error(f"Unexpected error during API request to {url}: {e}")
-            last_error = e
+            metrics["failures"] += 1
+            if breaker is not None:
+                breaker.record_failure()
             raise
     
     # If we've exhausted retries, raise the last error
-    logger.error(f"Failed after {max_retries} attempts to {url}")
+    logger.error(f"Failed after {attempt} attempts to {url}")
+    metrics["failures"] += 1
+    if breaker is not None:
+        breaker.record_failure()
     if last_error:
         raise last_error
     
     # This should never happen, but just in case
-    raise httpx.RequestError("Request failed for unknown reasons") 
\ No newline at end of file
+    raise httpx.RequestError("Request failed for unknown reasons")
+
+
+class HTTPClientRegistry:
+    """
+    Registry of pooled HTTP clients shared across requests.
+    
+    One httpx.AsyncClient (and, for the LLM service, one aiohttp session) is
+    kept per upstream service so that connections and TLS sessions are reused
+    instead of being set up for every call. Clients are created lazily and
+    are bound to the event loop that created them; if the loop changes (e.g.
+    in scripts or tests that start a new loop) a fresh client is created.
+    """
+    
+    def __init__(self) -> None:
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._loops: Dict[str, asyncio.AbstractEventLoop] = {}
+    
+    @staticmethod
+    def _config(name: str) -> Dict[str, Any]:
+        return HTTP_CLIENT_CONFIG.get(name, HTTP_CLIENT_CONFIG["default"])
+    
+    def _is_current(self, key: str, client: Any) -> bool:
+        """Check that a cached client is open and belongs to the running loop."""
+        if client is None:
+            return False
+        # httpx clients expose is_closed, aiohttp sessions expose closed
+        if getattr(client, "is_closed", None) or getattr(client, "closed", False):
+            return False
+        try:
+            return self._loops.get(key) is asyncio.get_running_loop()
+        except RuntimeError:
+            return True
+    
+    def _remember_loop(self, key: str) -> None:
+        try:
+            self._loops[key] = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loops.pop(key, None)
+    
+    def get_client(self, name: str = "default") -> httpx.AsyncClient:
+        """
+        Get the shared httpx client for a service.
+        
+        Args:
+            name: Service name (key of HTTP_CLIENT_CONFIG)
+        
+        Returns:
+            httpx.AsyncClient: Pooled client for the service
+        """
+        client = self._clients.get(name)
+        if self._is_current(f"httpx:{name}", client):
+            return client
+        
+        config = self._config(name)
+        client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED and HTTP2_AVAILABLE,
+            timeout=config["timeout"],
+            limits=httpx.Limits(
+                max_connections=config["max_connections"],
+                max_keepalive_connections=config["max_keepalive"],
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+        self._clients[name] = client
+        self._remember_loop(f"httpx:{name}")
+        logger.debug(f"Created pooled HTTP client for {name}")
+        return client
+    
+    def get_session(self, name: str = "llm") -> aiohttp.ClientSession:
+        """
+        Get the shared aiohttp session for a service.
+        
+        Must be called from a running event loop.
+        
+        Args:
+            name: Service name (key of HTTP_CLIENT_CONFIG)
+        
+        Returns:
+            aiohttp.ClientSession: Pooled session for the service
+        """
+        session = self._sessions.get(name)
+        if self._is_current(f"aiohttp:{name}", session):
+            return session
+        
+        config = self._config(name)
+        connector = aiohttp.TCPConnector(
+            limit=config["max_connections"],
+            limit_per_host=config["max_connections"],
+            keepalive_timeout=HTTP_KEEPALIVE_EXPIRY
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=config["timeout"])
+        )
+        self._sessions[name] = session
+        self._remember_loop(f"aiohttp:{name}")
+        logger.debug(f"Created pooled aiohttp session for {name}")
+        return session
+    
+    async def start(self) -> None:
+        """Create the clients for all configured services up front."""
+        for name in HTTP_CLIENT_CONFIG:
+            if name != "llm":
+                self.get_client(name)
+        logger.info(f"HTTP client pool ready (http2={HTTP2_ENABLED and HTTP2_AVAILABLE})")
+    
+    async def aclose(self) -> None:
+        """Close all clients and sessions, letting in-flight requests finish."""
+        for name, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing HTTP client for {name}: {str(e)}")
+        for name, session in list(self._sessions.items()):
+            try:
+                await session.close()
+            except Exception as e:
+                logger.warning(f"Error closing aiohttp session for {name}: {str(e)}")
+        self._clients.clear()
+        self._sessions.clear()
+        self._loops.clear()
+
+
+http_clients = HTTPClientRegistry()
+
+
+def get_http_client(name: str = "default") -> httpx.AsyncClient:
+    """
+    Get the shared, pooled httpx client for an upstream service.
+    
+    Args:
+        name: Service name (key of HTTP_CLIENT_CONFIG)
+    
+    Returns:
+        httpx.AsyncClient: Pooled client; callers must not close it
+    """
+    return http_clients.get_client(name)
+
+
+@asynccontextmanager
+async def shared_http_client(name: str = "default") -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Context manager yielding the pooled client for a service.
+    
+    Drop-in replacement for ``async with httpx.AsyncClient() as client`` that
+    leaves the client open for reuse when the block exits.
+    
+    Args:
+        name: Service name (key of HTTP_CLIENT_CONFIG)
+    
+    Yields:
+        httpx.AsyncClient: Pooled client for the service
+    """
+    yield http_clients.get_client(name)
+
+
+def get_aiohttp_session(name: str = "llm") -> aiohttp.ClientSession:
+    """
+    Get the shared, pooled aiohttp session for an upstream service.
+    
+    Args:
+        name: Service name (key of HTTP_CLIENT_CONFIG)
+    
+    Returns:
+        aiohttp.ClientSession: Pooled session; callers must not close it
+    """
+    return http_clients.get_session(name)
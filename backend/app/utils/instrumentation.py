@@ -0,0 +1,148 @@
+"""
+Logging instrumentation utilities for the search-comparisons application.
+
+This module provides a level-gated logging surface for hot paths: per-request
+correlation IDs carried in context variables, a per-request debug override,
+and lazy payload wrappers (samples, JSON dumps) that are only formatted when a
+record is actually emitted. At the default INFO level, debug calls cost a
+level check and nothing else.
+"""
+import os
+import json
+import uuid
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterable, Iterator, Optional
+
+# Number of items shown in sampled debug payloads
+DEBUG_SAMPLE_SIZE = int(os.environ.get("DEBUG_SAMPLE_SIZE", 3))
+
+# Correlation ID of the request being handled (propagates into asyncio tasks)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Whether debug logging is forced on for the request being handled
+debug_override_var: ContextVar[bool] = ContextVar("debug_override", default=False)
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Logging filter that stamps each record with the current request ID."""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+def new_request_id() -> str:
+    """
+    Generate a new correlation ID.
+    
+    Returns:
+        str: A short random hexadecimal ID
+    """
+    return uuid.uuid4().hex[:16]
+
+
+def get_request_id() -> Optional[str]:
+    """
+    Get the correlation ID of the current request.
+    
+    Returns:
+        Optional[str]: The request ID, or None outside a request
+    """
+    return request_id_var.get()
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None, debug: bool = False) -> Iterator[str]:
+    """
+    Bind a correlation ID (and optional debug override) for the enclosed code.
+    
+    Args:
+        request_id: ID to bind (a new one is generated if omitted)
+        debug: Force debug logging on for this request
+    
+    Yields:
+        str: The bound request ID
+    """
+    request_id = request_id or new_request_id()
+    id_token = request_id_var.set(request_id)
+    debug_token = debug_override_var.set(debug)
+    try:
+        yield request_id
+    finally:
+        request_id_var.reset(id_token)
+        debug_override_var.reset(debug_token)
+
+
+def debug_enabled(logger: logging.Logger) -> bool:
+    """
+    Check whether debug records would be emitted for the current request.
+    
+    Args:
+        logger: Logger to check
+    
+    Returns:
+        bool: True if the logger is at DEBUG or the request forces debug
+    """
+    return logger.isEnabledFor(logging.DEBUG) or debug_override_var.get()
+
+
+def log_debug(logger: logging.Logger, msg: str, *args: Any) -> None:
+    """
+    Emit a lazily formatted debug record.
+    
+    Arguments are only formatted (with %-style formatting) when the record is
+    emitted. A per-request debug override emits the record even if the logger
+    is configured above DEBUG.
+    
+    Args:
+        logger: Logger to emit on
+        msg: %-style format string
+        *args: Format arguments (may be Sample or LazyJSON wrappers)
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, *args, stacklevel=2)
+    elif debug_override_var.get():
+        logger.handle(logger.makeRecord(
+            logger.name, logging.DEBUG, "(instrumentation)", 0, msg, args, None
+        ))
+
+
+class Sample:
+    """
+    Lazy preview of a collection for debug payloads.
+    
+    Formats as the first few items plus a count of the rest, and only when
+    the log record is rendered.
+    """
+    __slots__ = ("items", "limit")
+    
+    def __init__(self, items: Iterable[Any], limit: int = DEBUG_SAMPLE_SIZE):
+        self.items = items
+        self.limit = limit
+    
+    def __str__(self) -> str:
+        items = list(self.items)
+        preview = items[:self.limit]
+        if len(items) > self.limit:
+            return f"{preview} (+{len(items) - self.limit} more)"
+        return str(preview)
+    
+    __repr__ = __str__
+
+
+class LazyJSON:
+    """Lazy compact JSON rendering of a payload for debug records."""
+    __slots__ = ("payload",)
+    
+    def __init__(self, payload: Any):
+        self.payload = payload
+    
+    def __str__(self) -> str:
+        try:
+            return json.dumps(self.payload, default=str, sort_keys=True)
+        except (TypeError, ValueError):
+            return repr(self.payload)
+    
+    __repr__ = __str__
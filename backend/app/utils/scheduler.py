@@ -0,0 +1,376 @@
+"""
+Upstream request scheduling for the search-comparisons application.
+
+This module rate-limits calls to each upstream source with a token bucket and
+orders waiting calls by traffic lane: interactive requests are always served
+before batch requests, and batch requests are additionally capped in how many
+can be in flight per source. Throttling responses (HTTP 429, blocks) pause a
+source's bucket so every caller backs off, not just the one that was refused.
+
+Buckets are configured from SERVICE_CONFIG (``rate``, ``burst`` and
+``batch_concurrency``) when the search service is imported; unconfigured
+sources are not limited.
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Traffic lanes, highest priority first
+INTERACTIVE = "interactive"
+BATCH = "batch"
+LANES = (INTERACTIVE, BATCH)
+
+# Lane of the code being run (propagates into asyncio tasks)
+_traffic_lane: ContextVar[str] = ContextVar("traffic_lane", default=INTERACTIVE)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at ``rate`` tokens per second up to ``burst``.
+    
+    A bucket can be paused, during which no tokens are handed out.
+    """
+    
+    def __init__(self, rate: float, burst: float = 1.0):
+        """
+        Initialize a full bucket.
+        
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+    
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, now: float) -> float:
+        """
+        Seconds until a token can be taken.
+        
+        Args:
+            now: Current monotonic time
+        
+        Returns:
+            float: 0 if a token is available now
+        """
+        if self.paused_until > now:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    def take(self) -> None:
+        """Consume one token."""
+        self.tokens -= 1
+    
+    def pause(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for a while.
+        
+        Args:
+            seconds: Pause length (extends, never shortens, an active pause)
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class SourceScheduler:
+    """
+    Token bucket and priority lanes for one upstream source.
+    
+    Waiting calls are granted tokens strictly by lane: a batch call only
+    gets a token when no interactive call is waiting, and only while fewer
+    than ``batch_concurrency`` batch calls are in flight.
+    """
+    
+    def __init__(self, source: str, rate: float, burst: float = 1.0, batch_concurrency: int = 1):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            source: Source name
+            rate: Upstream calls per second
+            burst: Calls allowed back to back after an idle period
+            batch_concurrency: Maximum batch calls in flight
+        """
+        self.source = source
+        self.bucket = TokenBucket(rate, burst)
+        self.batch_concurrency = max(1, batch_concurrency)
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = {lane: 0 for lane in LANES}
+        self.granted = {lane: 0 for lane in LANES}
+        self.wait_seconds = {lane: 0.0 for lane in LANES}
+        self.max_queue_depth = {lane: 0 for lane in LANES}
+        self.throttled = 0
+    
+    def _bind_loop(self) -> None:
+        """Drop waiters and timers left over from a previous event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._timer = None
+            for lane in LANES:
+                self._waiters[lane].clear()
+                self.in_flight[lane] = 0
+    
+    def queue_depth(self, lane: str) -> int:
+        """Number of calls waiting in a lane."""
+        return sum(1 for waiter in self._waiters[lane] if not waiter.done())
+    
+    def _next_waiter(self) -> Optional[str]:
+        """Pick the lane whose head waiter should be served next."""
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            while waiters and waiters[0].done():
+                waiters.popleft()
+            if not waiters:
+                continue
+            if lane == BATCH and self.in_flight[BATCH] >= self.batch_concurrency:
+                return None
+            return lane
+        return None
+    
+    def _dispatch(self) -> None:
+        """Grant tokens to waiting calls, or arm a timer for the next token."""
+        self._timer = None
+        while True:
+            lane = self._next_waiter()
+            if lane is None:
+                return
+            wait = self.bucket.wait_time(time.monotonic())
+            if wait > 0:
+                self._timer = self._loop.call_later(wait, self._dispatch)
+                return
+            self.bucket.take()
+            self.in_flight[lane] += 1
+            self._waiters[lane].popleft().set_result(None)
+    
+    def _wake(self) -> None:
+        """Re-run dispatch now, replacing any pending timer."""
+        try:
+            self._bind_loop()
+        except RuntimeError:
+            # No running loop: waiters are dispatched on the next acquire
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._dispatch()
+    
+    async def acquire(self, lane: str = INTERACTIVE) -> None:
+        """
+        Wait for permission to make one upstream call.
+        
+        Args:
+            lane: Traffic lane of the call
+        """
+        self._bind_loop()
+        start = time.perf_counter()
+        if not any(self._waiters[name] for name in LANES[:LANES.index(lane) + 1]):
+            # Fast path: nothing ahead of us in this or a higher lane
+            wait = self.bucket.wait_time(time.monotonic())
+            lane_open = lane != BATCH or self.in_flight[BATCH] < self.batch_concurrency
+            if wait == 0 and lane_open:
+                self.bucket.take()
+                self.in_flight[lane] += 1
+                self.granted[lane] += 1
+                return
+        
+        waiter = self._loop.create_future()
+        self._waiters[lane].append(waiter)
+        self.max_queue_depth[lane] = max(self.max_queue_depth[lane], self.queue_depth(lane))
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we were cancelled: give the slot back
+                self.release(lane)
+            raise
+        self.granted[lane] += 1
+        self.wait_seconds[lane] += time.perf_counter() - start
+    
+    def release(self, lane: str = INTERACTIVE) -> None:
+        """
+        Mark a call as finished.
+        
+        Args:
+            lane: Traffic lane of the call
+        """
+        self.in_flight[lane] = max(0, self.in_flight[lane] - 1)
+        if lane == BATCH:
+            self._wake()
+    
+    def throttle(self, seconds: float) -> None:
+        """
+        Pause the source after an upstream throttling response.
+        
+        Args:
+            seconds: How long to stop sending requests
+        """
+        self.throttled += 1
+        self.bucket.pause(seconds)
+        logger.warning(f"Throttling {self.source} for {seconds:.1f}s")
+        self._wake()
+    
+    def blocked_for(self) -> float:
+        """Seconds left in an active pause (0 if not paused)."""
+        return max(0.0, self.bucket.paused_until - time.monotonic())
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Describe the scheduler state.
+        
+        Returns:
+            Dict[str, Any]: Bucket settings and level, pause, and per-lane
+                queue depth, in-flight calls, grants and average wait
+        """
+        self.bucket._refill(time.monotonic())
+        return {
+            "rate": self.bucket.rate,
+            "burst": self.bucket.burst,
+            "tokens": round(self.bucket.tokens, 2),
+            "paused_for": round(self.blocked_for(), 1),
+            "throttled": self.throttled,
+            "batch_concurrency": self.batch_concurrency,
+            "lanes": {
+                lane: {
+                    "queue_depth": self.queue_depth(lane),
+                    "max_queue_depth": self.max_queue_depth[lane],
+                    "in_flight": self.in_flight[lane],
+                    "granted": self.granted[lane],
+                    "avg_wait_ms": round(
+                        1000 * self.wait_seconds[lane] / self.granted[lane], 1
+                    ) if self.granted[lane] else 0.0
+                }
+                for lane in LANES
+            }
+        }
+
+
+_schedulers: Dict[str, SourceScheduler] = {}
+
+
+def configure_source_schedulers(service_config: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Create schedulers for every source with a ``rate`` in its configuration.
+    
+    Args:
+        service_config: Per-source settings (SERVICE_CONFIG)
+    """
+    for source, config in service_config.items():
+        if config.get("rate"):
+            _schedulers[source] = SourceScheduler(
+                source,
+                rate=config["rate"],
+                burst=config.get("burst", 1),
+                batch_concurrency=config.get("batch_concurrency", 1)
+            )
+
+
+def get_source_scheduler(source: str) -> Optional[SourceScheduler]:
+    """
+    Get the scheduler for a source.
+    
+    Args:
+        source: Source name
+    
+    Returns:
+        Optional[SourceScheduler]: The scheduler, or None if the source is not limited
+    """
+    return _schedulers.get(source)
+
+
+def get_scheduler_metrics() -> Dict[str, Any]:
+    """
+    Get bucket and queue metrics for all scheduled sources.
+    
+    Returns:
+        Dict[str, Any]: Per-source scheduler state
+    """
+    return {source: scheduler.to_dict() for source, scheduler in _schedulers.items()}
+
+
+def current_lane() -> str:
+    """Traffic lane of the code being run."""
+    return _traffic_lane.get()
+
+
+@contextmanager
+def traffic_lane(lane: str) -> Iterator[str]:
+    """
+    Run the enclosed code's upstream calls in a traffic lane.
+    
+    Args:
+        lane: INTERACTIVE or BATCH
+    
+    Yields:
+        str: The lane
+    """
+    token = _traffic_lane.set(lane)
+    try:
+        yield lane
+    finally:
+        _traffic_lane.reset(token)
+
+
+@asynccontextmanager
+async def request_slot(source: Optional[str]) -> AsyncIterator[None]:
+    """
+    Hold a scheduler slot for one upstream call to a source.
+    
+    Args:
+        source: Source about to be called (None or unscheduled sources pass straight through)
+    """
+    scheduler = _schedulers.get(source) if source else None
+    if scheduler is None:
+        yield
+        return
+    lane = _traffic_lane.get()
+    await scheduler.acquire(lane)
+    try:
+        yield
+    finally:
+        scheduler.release(lane)
+
+
+def throttle_source(source: str, seconds: float) -> None:
+    """
+    Pause all calls to a source after it throttled or blocked us.
+    
+    Args:
+        source: Source name
+        seconds: Pause length
+    """
+    scheduler = _schedulers.get(source)
+    if scheduler is not None:
+        scheduler.throttle(seconds)
+
+
+def source_blocked_for(source: str) -> float:
+    """
+    Seconds left before a paused source accepts calls again.
+    
+    Args:
+        source: Source name
+    
+    Returns:
+        float: Remaining pause (0 if the source is not paused or not scheduled)
+    """
+    scheduler = _schedulers.get(source)
+    return scheduler.blocked_for() if scheduler is not None else 0.0
@@ -3,12 +3,16 @@ Similarity calculation utilities for the search-comparisons application.
 
 This module provides functions for calculating similarity between texts
 and result sets, including Jaccard similarity, rank-based overlap (RBO),
-and cosine similarity.
+and cosine similarity, plus batched NumPy variants that score every pair
+of sources in one matrix operation over a shared vocabulary.
 """
 import math
 import logging
-import rbo
-from typing import Dict, List, Set, Tuple, Any, Union, Optional
+from typing import Dict, Iterable, List, Set, Tuple, Any, Union, Optional
+
+import numpy as np
+
+from .instrumentation import log_debug, Sample
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -31,8 +35,6 @@ def calculate_jaccard_similarity(set1: Set[Any], set2: Set[Any]) -> float:
     if not set1 and not set2:
         return 1.0  # Both sets empty => identical
     
-    logger.info(f"Calculating Jaccard similarity between sets of size {len(set1)} and {len(set2)}")
-    
     # Normalize string elements for better matching
     norm_set1 = set()
     norm_set2 = set()
@@ -60,146 +62,300 @@ def calculate_jaccard_similarity(set1: Set[Any], set2: Set[Any]) -> float:
     intersection = norm_set1.intersection(norm_set2)
     union = norm_set1.union(norm_set2)
     
-    logger.info(f"Found intersection of size {len(intersection)} out of union of size {len(union)}")
-    
-    if len(intersection) > 0:
-        logger.debug(f"Sample of intersection: {list(intersection)[:3]}")
-    
-    if union == 0:
+    if not union:
         return 0.0
     
     jaccard = len(intersection) / len(union)
-    logger.info(f"Jaccard similarity: {jaccard}")
+    log_debug(
+        logger, "Jaccard similarity %.4f (intersection %d of union %d, sample %s)",
+        jaccard, len(intersection), len(union), Sample(intersection)
+    )
     
     return jaccard
 
 
+def _rank_groups(ranking: List[Any]) -> List[List[Any]]:
+    """
+    Normalize a ranking into groups of tied items.
+
+    Each element of the ranking is either a single item or a set/tuple of
+    items tied at that rank. String items are lowercased and stripped, and an
+    item that appears more than once keeps only its first (highest) rank.
+
+    Args:
+        ranking: Ranked list of items or tie groups
+
+    Returns:
+        List[List[Any]]: Non-empty groups of distinct items, in rank order
+    """
+    seen: Set[Any] = set()
+    groups: List[List[Any]] = []
+    for entry in ranking:
+        members = entry if isinstance(entry, (set, frozenset, tuple)) else (entry,)
+        group = []
+        for item in members:
+            if isinstance(item, str):
+                item = item.lower().strip()
+            if item not in seen:
+                seen.add(item)
+                group.append(item)
+        if group:
+            groups.append(group)
+    return groups
+
+
+class _RankProfile:
+    """
+    Positions of the items in a normalized ranking.
+
+    Attributes:
+        groups: Tie groups in rank order
+        start: Item -> 1-based position where its tie group starts
+        size: Item -> size of its tie group
+        length: Total number of distinct items
+        has_ties: Whether any group holds more than one item
+    """
+
+    def __init__(self, ranking: List[Any], depth: Optional[int] = None):
+        self.groups = _rank_groups(ranking)
+        self.start: Dict[Any, int] = {}
+        self.size: Dict[Any, int] = {}
+        position = 1
+        kept = []
+        for group in self.groups:
+            # A depth cutoff never splits a tie group
+            if depth is not None and position > depth:
+                break
+            kept.append(group)
+            for item in group:
+                self.start[item] = position
+                self.size[item] = len(group)
+            position += len(group)
+        self.groups = kept
+        self.length = position - 1
+        self.has_ties = any(len(group) > 1 for group in kept)
+
+    def inclusion(self, item: Any, depth: int) -> float:
+        """Probability that the item is within the top `depth` under random tie-breaking."""
+        start = self.start.get(item)
+        if start is None or start > depth:
+            return 0.0
+        return min(1.0, (depth - start + 1) / self.size[item])
+
+
+def _overlap_profile(profile1: _RankProfile, profile2: _RankProfile, depth: int) -> List[float]:
+    """
+    Calculate the overlap X_d of two rankings at every depth d = 1..depth.
+
+    Runs in a single pass with set-increment bookkeeping: each item is
+    counted when it first appears in the prefix of the second ranking. Tied
+    items count by their expected overlap over random tie-breaking, so only
+    the (at most one per ranking) tie group straddling depth d needs extra work.
+
+    Args:
+        profile1: First ranking
+        profile2: Second ranking
+        depth: Deepest depth to evaluate
+
+    Returns:
+        List[float]: X_d for d = 1..depth (index 0 holds depth 1)
+    """
+    overlaps: List[float] = []
+    full1: Set[Any] = set()
+    full2: Set[Any] = set()
+    both = 0
+    group_index1 = group_index2 = 0
+    position1 = position2 = 1  # start of the next group not yet fully included
+
+    for d in range(1, depth + 1):
+        # Groups whose last position is d become fully included
+        while group_index1 < len(profile1.groups) and position1 + len(profile1.groups[group_index1]) - 1 <= d:
+            for item in profile1.groups[group_index1]:
+                full1.add(item)
+                if item in full2:
+                    both += 1
+            position1 += len(profile1.groups[group_index1])
+            group_index1 += 1
+        while group_index2 < len(profile2.groups) and position2 + len(profile2.groups[group_index2]) - 1 <= d:
+            for item in profile2.groups[group_index2]:
+                full2.add(item)
+                if item in full1:
+                    both += 1
+            position2 += len(profile2.groups[group_index2])
+            group_index2 += 1
+
+        overlap = float(both)
+
+        # Expected contribution of tie groups that straddle depth d
+        straddle1: List[Any] = []
+        if group_index1 < len(profile1.groups) and position1 <= d:
+            straddle1 = profile1.groups[group_index1]
+            fraction1 = (d - position1 + 1) / len(straddle1)
+            overlap += sum(fraction1 * profile2.inclusion(item, d) for item in straddle1)
+        if group_index2 < len(profile2.groups) and position2 <= d:
+            straddle2 = profile2.groups[group_index2]
+            fraction2 = (d - position2 + 1) / len(straddle2)
+            overlap += sum(
+                fraction2 * profile1.inclusion(item, d)
+                for item in straddle2 if item not in straddle1
+            )
+
+        overlaps.append(overlap)
+
+    return overlaps
+
+
+def _rbo_from_profiles(profile1: _RankProfile, profile2: _RankProfile, p: float) -> Dict[str, float]:
+    """
+    Calculate extrapolated RBO and its bounds for two non-empty rankings.
+
+    Implements Webber, Moffat and Zobel (2010) for rankings of uneven
+    length: RBO_ext (eq. 32), RBO_min evaluated to the longer ranking's depth
+    and the matching residual RBO_res (eq. 30), with RBO_max = RBO_min + RBO_res.
+
+    Args:
+        profile1: First ranking
+        profile2: Second ranking
+        p: Persistence parameter
+
+    Returns:
+        Dict[str, float]: ext, min, max and res values
+    """
+    short, long_ = sorted((profile1, profile2), key=lambda profile: profile.length)
+    s, l = short.length, long_.length
+    overlaps = _overlap_profile(profile1, profile2, l)
+    x_s = overlaps[s - 1]
+    x_l = overlaps[l - 1]
+
+    weight = 1.0  # p ** d
+    agreement_sum = 0.0  # sum of X_d / d * p^d for d <= l
+    weight_sum = 0.0  # sum of p^d / d for d <= l
+    extrapolation_sum = 0.0  # sum of X_s * (d - s) / (s * d) * p^d for s < d <= l
+    for d in range(1, l + 1):
+        weight *= p
+        agreement_sum += overlaps[d - 1] / d * weight
+        weight_sum += weight / d
+        if d > s:
+            extrapolation_sum += x_s * (d - s) / (s * d) * weight
+
+    scale = (1 - p) / p
+    ext = scale * (agreement_sum + extrapolation_sum) + ((x_l - x_s) / l + x_s / s) * p ** l
+    # Minimum for uneven lists: the overlap seen down to depth l is all there
+    # is, so X_d stays at X_l beyond l (the residual below is relative to this)
+    rbo_min = scale * (agreement_sum - x_l * weight_sum - x_l * math.log(1 - p))
+
+    # Residual: the most the unseen tails could still add
+    f = int(round(l + s - x_l))
+    tail_s = tail_l = harmonic = 0.0
+    weight = 1.0
+    for d in range(1, f + 1):
+        weight *= p
+        harmonic += weight / d
+        if d > s:
+            tail_s += weight / d
+        if d > l:
+            tail_l += weight / d
+    res = p ** s + p ** l - p ** f - scale * (
+        s * tail_s + l * tail_l + x_l * (math.log(1 / (1 - p)) - harmonic)
+    )
+    res = max(res, 0.0)
+    rbo_min = max(rbo_min, 0.0)
+
+    return {
+        "ext": min(max(ext, 0.0), 1.0),
+        "min": min(rbo_min, 1.0),
+        "max": min(rbo_min + res, 1.0),
+        "res": res
+    }
+
+
+def calculate_rbo(
+    list1: List[Any],
+    list2: List[Any],
+    p: float = 0.98,
+    depth: Optional[int] = None
+) -> Dict[str, float]:
+    """
+    Calculate rank-biased overlap with its lower and upper bounds.
+
+    Elements of a list may be sets or tuples of items tied at the same rank;
+    ties are scored by their expected overlap over random tie-breaking.
+
+    Args:
+        list1: First ranked list
+        list2: Second ranked list
+        p: Persistence parameter (default: 0.98)
+        depth: Only evaluate the top `depth` ranks of each list (tie groups
+            crossing the cutoff are kept whole)
+
+    Returns:
+        Dict[str, float]: Extrapolated RBO ("ext"), the "min" and "max" bounds
+            and the residual ("res")
+    """
+    return _rbo_between(_RankProfile(list1, depth), _RankProfile(list2, depth), p)
+
+
+def _rbo_between(profile1: _RankProfile, profile2: _RankProfile, p: float) -> Dict[str, float]:
+    if not profile1.length or not profile2.length:
+        value = 1.0 if not profile1.length and not profile2.length else 0.0
+        return {"ext": value, "min": value, "max": value, "res": 0.0}
+    return _rbo_from_profiles(profile1, profile2, p)
+
+
 def calculate_rank_based_overlap(
-    list1: List[Any], 
-    list2: List[Any], 
-    p: float = 0.98
+    list1: List[Any],
+    list2: List[Any],
+    p: float = 0.98,
+    depth: Optional[int] = None
 ) -> float:
     """
     Calculate Rank-Based Overlap (RBO) between two ranked lists.
-    
+
     RBO is designed for comparing ranked lists when:
     - Not all items may be present in both lists
     - The order of items matters, with higher ranks more important
     - The lists may be of different lengths
-    
+
     Args:
         list1: First ranked list
         list2: Second ranked list
         p: Persistence parameter (default: 0.98) - higher values give
            more weight to agreement at higher ranks
-    
+        depth: Only evaluate the top `depth` ranks of each list
+
     Returns:
-        float: RBO similarity in the range [0, 1]
+        float: Extrapolated RBO similarity in the range [0, 1]
     """
-    if not list1 or not list2:
-        if not list1 and not list2:
-            return 1.0  # Both lists empty => identical
-        return 0.0  # One list empty, other not => no overlap
-    
-    logger.info(f"Calculating RBO for list1 (len={len(list1)}) and list2 (len={len(list2)})")
-    logger.debug(f"List1 samples (first 3): {list1[:3]}")
-    logger.debug(f"List2 samples (first 3): {list2[:3]}")
-    
-    # Create normalized versions of lists where we only keep the identifier part
-    # and handle both "doi:" and "title:" prefixes for more flexible matching
-    norm_list1 = []
-    norm_list2 = []
-    
-    # Create a mapping of normalized item to original position
-    norm_to_pos1 = {}
-    norm_to_pos2 = {}
-    
-    for i, item in enumerate(list1):
-        if isinstance(item, str):
-            # Strip prefixes and whitespace
-            norm_item = item.lower().strip()
-            if norm_item.startswith("doi:"):
-                norm_item = "doi:" + norm_item[4:].strip()
-            elif norm_item.startswith("title:"):
-                norm_item = "title:" + norm_item[6:].strip()
-            
-            norm_list1.append(norm_item)
-            norm_to_pos1[norm_item] = i
-    
-    for i, item in enumerate(list2):
-        if isinstance(item, str):
-            # Strip prefixes and whitespace
-            norm_item = item.lower().strip()
-            if norm_item.startswith("doi:"):
-                norm_item = "doi:" + norm_item[4:].strip()
-            elif norm_item.startswith("title:"):
-                norm_item = "title:" + norm_item[6:].strip()
-            
-            norm_list2.append(norm_item)
-            norm_to_pos2[norm_item] = i
-    
-    # Log matching information
-    # Find items that match exactly
-    exact_matches = set(norm_list1) & set(norm_list2)
-    logger.info(f"Found {len(exact_matches)} exact matches out of {len(norm_list1)} and {len(norm_list2)} items")
-    
-    # Alternate matching for items that may be identified differently
-    # (e.g., doi vs title for the same paper)
-    doi_to_title1 = {}
-    doi_to_title2 = {}
-    
-    # Extract DOI and title mappings from list1
-    for item in list1:
-        if isinstance(item, str):
-            if item.startswith("doi:"):
-                doi = item[4:].lower().strip()
-                for t_item in list1:
-                    if t_item.startswith("title:"):
-                        title = t_item[6:].lower().strip()
-                        doi_to_title1[doi] = title
-    
-    # Extract DOI and title mappings from list2
-    for item in list2:
-        if isinstance(item, str):
-            if item.startswith("doi:"):
-                doi = item[4:].lower().strip()
-                for t_item in list2:
-                    if t_item.startswith("title:"):
-                        title = t_item[6:].lower().strip()
-                        doi_to_title2[doi] = title
-    
-    # Check for DOI-title matches
-    add_matches = 0
-    for doi1, title1 in doi_to_title1.items():
-        if doi1 in doi_to_title2:
-            continue  # Already counted in exact matches
-        for doi2, title2 in doi_to_title2.items():
-            if title1 == title2 and doi1 != doi2:
-                add_matches += 1
-                break
-    
-    logger.info(f"Found {add_matches} additional matches by cross-referencing DOIs and titles")
-    
-    try:
-        # Convert lists to dictionaries with item: rank
-        # Note: RBO package expects rank to start at 1, not 0
-        dict1 = {item: i+1 for i, item in enumerate(norm_list1)}
-        dict2 = {item: i+1 for i, item in enumerate(norm_list2)}
-        
-        # Calculate RBO
-        result = rbo.RankingSimilarity(dict1, dict2).rbo(p=p)
-        logger.info(f"RBO calculation result: {result}")
-        return max(result, 0.0)  # Ensure we don't return negative values
-    except Exception as e:
-        logger.error(f"Error calculating RBO: {str(e)}")
-        
-        # Fallback to a simpler measure if RBO fails
-        logger.warning("Falling back to Jaccard similarity for rank-based overlap")
-        set1 = set(norm_list1)
-        set2 = set(norm_list2)
-        jaccard = calculate_jaccard_similarity(set1, set2)
-        logger.info(f"Fallback Jaccard similarity: {jaccard}")
-        return jaccard
+    return calculate_rbo(list1, list2, p, depth)["ext"]
+
+
+def calculate_pairwise_rank_based_overlap(
+    lists: List[List[Any]],
+    p: float = 0.98,
+    depth: Optional[int] = None,
+    bound: str = "ext"
+) -> np.ndarray:
+    """
+    Calculate RBO between every pair of ranked lists.
+
+    Each list is normalized once and reused for all of its pairs.
+
+    Args:
+        lists: Ranked lists to compare
+        p: Persistence parameter (default: 0.98)
+        depth: Only evaluate the top `depth` ranks of each list
+        bound: Which value to return: "ext", "min" or "max"
+
+    Returns:
+        np.ndarray: Symmetric matrix of RBO values
+    """
+    profiles = [_RankProfile(ranking, depth) for ranking in lists]
+    similarities = np.ones((len(profiles), len(profiles)), dtype=np.float64)
+    for i in range(len(profiles)):
+        for j in range(i + 1, len(profiles)):
+            value = _rbo_between(profiles[i], profiles[j], p)[bound]
+            similarities[i, j] = similarities[j, i] = value
+    return similarities
 
 
 def calculate_cosine_similarity(
@@ -242,4 +398,115 @@ def calculate_cosine_similarity(
     # Calculate cosine similarity
     similarity = dot_product / (magnitude1 * magnitude2)
     
-    return similarity 
\ No newline at end of file
+    return similarity 
+
+
+def build_vocabulary(term_collections: Iterable[Iterable[Any]]) -> Dict[Any, int]:
+    """
+    Build a shared vocabulary mapping each distinct term to a column index.
+    
+    Args:
+        term_collections: Collections of terms (e.g. one term-count dict per source)
+    
+    Returns:
+        Dict[Any, int]: Term -> column index
+    """
+    vocabulary: Dict[Any, int] = {}
+    for terms in term_collections:
+        for term in terms:
+            if term not in vocabulary:
+                vocabulary[term] = len(vocabulary)
+    return vocabulary
+
+
+def build_term_matrix(
+    term_weights: List[Dict[Any, float]], 
+    vocabulary: Dict[Any, int]
+) -> np.ndarray:
+    """
+    Stack term-weight dictionaries into a dense matrix over a shared vocabulary.
+    
+    Args:
+        term_weights: One term -> weight dictionary per row
+        vocabulary: Term -> column index (from build_vocabulary)
+    
+    Returns:
+        np.ndarray: Matrix of shape (len(term_weights), len(vocabulary))
+    """
+    matrix = np.zeros((len(term_weights), len(vocabulary)), dtype=np.float64)
+    for row, weights in enumerate(term_weights):
+        if weights:
+            columns = np.fromiter((vocabulary[term] for term in weights), dtype=np.intp, count=len(weights))
+            matrix[row, columns] = np.fromiter(weights.values(), dtype=np.float64, count=len(weights))
+    return matrix
+
+
+def calculate_idf_weights(
+    document_frequencies: Dict[Any, int], 
+    num_documents: int, 
+    vocabulary: Dict[Any, int]
+) -> np.ndarray:
+    """
+    Calculate smoothed inverse document frequencies for a vocabulary.
+    
+    Uses idf = ln((1 + N) / (1 + df)) + 1, so terms found in every document
+    keep a weight of 1 instead of vanishing.
+    
+    Args:
+        document_frequencies: Term -> number of documents containing it
+        num_documents: Total number of documents
+        vocabulary: Term -> column index
+    
+    Returns:
+        np.ndarray: IDF weight per vocabulary column
+    """
+    df = np.zeros(len(vocabulary), dtype=np.float64)
+    for term, column in vocabulary.items():
+        df[column] = document_frequencies.get(term, 0)
+    return np.log((1.0 + num_documents) / (1.0 + df)) + 1.0
+
+
+def calculate_pairwise_cosine_similarity(matrix: np.ndarray) -> np.ndarray:
+    """
+    Calculate cosine similarity between every pair of rows.
+    
+    Follows calculate_cosine_similarity for empty vectors: two empty rows
+    score 1.0 and an empty row against a non-empty one scores 0.0.
+    
+    Args:
+        matrix: Matrix with one term-weight vector per row
+    
+    Returns:
+        np.ndarray: Symmetric matrix of similarities in the range [0, 1]
+    """
+    norms = np.linalg.norm(matrix, axis=1)
+    empty = norms == 0
+    unit = matrix / np.where(empty, 1.0, norms)[:, None]
+    similarities = np.clip(unit @ unit.T, 0.0, 1.0)
+    similarities[np.ix_(empty, empty)] = 1.0
+    return similarities
+
+
+def calculate_pairwise_jaccard_similarity(
+    sets: List[Set[Any]], 
+    empty_value: float = 1.0
+) -> np.ndarray:
+    """
+    Calculate Jaccard similarity between every pair of sets.
+    
+    Builds a binary incidence matrix over the union of all items, so every
+    intersection size comes out of a single matrix product.
+    
+    Args:
+        sets: Sets to compare (items must already be normalized)
+        empty_value: Similarity assigned when both sets are empty
+    
+    Returns:
+        np.ndarray: Symmetric matrix of similarities in the range [0, 1]
+    """
+    vocabulary = build_vocabulary(sets)
+    incidence = build_term_matrix([dict.fromkeys(items, 1.0) for items in sets], vocabulary)
+    intersections = incidence @ incidence.T
+    sizes = incidence.sum(axis=1)
+    unions = sizes[:, None] + sizes[None, :] - intersections
+    return np.where(unions > 0, intersections / np.where(unions > 0, unions, 1.0), empty_value)
@@ -0,0 +1,112 @@
+"""
+Script to compare search engines over a set of queries.
+
+This script runs a batch comparison in-process (sharing the API's result
+cache and per-source limits), writes one JSON row per query as queries
+finish, and prints the aggregated overlap, Jaccard and rank-biased overlap
+distributions. Queries are read from a text file (one per line) or a .jsonl
+file with a "query" key per line.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import List
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.services.batch_comparison import (
+    BatchSummary,
+    iter_batch_comparison,
+    BATCH_QUERY_CONCURRENCY
+)
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def read_queries(path: str) -> List[str]:
+    """
+    Read queries from a text or JSONL file.
+    
+    Args:
+        path: Path to the query file
+    
+    Returns:
+        List[str]: Non-empty queries in file order
+    """
+    queries = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                line = json.loads(line).get("query", "").strip()
+            if line:
+                queries.append(line)
+    return queries
+
+
+async def run(args: argparse.Namespace) -> None:
+    """
+    Run the batch and write rows and the summary.
+    
+    Args:
+        args: Parsed command-line arguments
+    """
+    queries = read_queries(args.queries)
+    logger.info(f"Comparing {args.sources} over {len(queries)} queries")
+    
+    summary = BatchSummary()
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        async for row in iter_batch_comparison(
+            queries,
+            args.sources,
+            args.metrics,
+            args.fields,
+            max_results=args.max_results,
+            use_cache=not args.no_cache,
+            query_concurrency=args.concurrency,
+            summary=summary
+        ):
+            output.write(json.dumps(row, default=str) + "\n")
+            output.flush()
+    finally:
+        if args.output:
+            output.close()
+    
+    summary_json = json.dumps(summary.to_dict(), indent=2)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            f.write(summary_json)
+        logger.info(f"Summary written to {args.summary}")
+    else:
+        logger.info(f"Summary:\n{summary_json}")
+
+
+def main() -> None:
+    """Parse arguments and run the batch."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("queries", help="Query file (.txt with one query per line, or .jsonl)")
+    parser.add_argument("--sources", nargs="+", default=["ads", "semanticScholar"], help="Sources to compare")
+    parser.add_argument("--metrics", nargs="+", default=["jaccard", "rankBiased"], help="Similarity metrics")
+    parser.add_argument("--fields", nargs="+", default=["title"], help="Fields to retrieve and compare")
+    parser.add_argument("--max-results", type=int, default=20, help="Results per source")
+    parser.add_argument("--concurrency", type=int, default=BATCH_QUERY_CONCURRENCY, help="Queries in flight")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the result cache")
+    parser.add_argument("--output", help="File for per-query rows (JSONL, default stdout)")
+    parser.add_argument("--summary", help="File for the aggregated summary (JSON)")
+    args = parser.parse_args()
+    
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Script to build the citation distribution tables used for citation boosts.
+
+This script reads a local snapshot of search results (ADS documents or dumped
+SearchResult records, as .jsonl or .json files), computes per-collection and
+per-year citation percentiles, and saves them where the API loads them at
+startup.
+"""
+import argparse
+import logging
+import os
+import sys
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.services.citation_distributions import (
+    build_citation_distributions,
+    CITATION_DISTRIBUTIONS_PATH,
+    CITATION_DISTRIBUTION_MIN_COUNT
+)
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """Parse arguments and build the tables."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("snapshots", nargs="+", help="Snapshot files (.jsonl or .json)")
+    parser.add_argument("--output", default=CITATION_DISTRIBUTIONS_PATH, help="Output .npz file")
+    parser.add_argument(
+        "--min-count",
+        type=int,
+        default=CITATION_DISTRIBUTION_MIN_COUNT,
+        help="Minimum papers per collection/year distribution"
+    )
+    args = parser.parse_args()
+    
+    table = build_citation_distributions(args.snapshots, args.output, args.min_count)
+    logger.info(f"Citation distributions: {table.summary()}")
+
+
+if __name__ == "__main__":
+    main()
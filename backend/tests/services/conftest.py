@@ -0,0 +1,77 @@
+"""
+Pytest configuration for the service tests.
+
+This module defines the in-memory judgement database and judgement factory
+shared by the judgement service and enrichment tests.
+"""
+from typing import Any, Callable, Dict, Generator, Optional
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+
+
+@pytest.fixture
+def db_engine() -> Generator[Engine, None, None]:
+    """
+    Fresh in-memory database with all tables.
+    
+    A single shared connection (StaticPool) keeps the database alive across
+    sessions and lets it be used from the database thread pool.
+    
+    Yields:
+        Engine: Engine bound to the database
+    """
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def db(db_engine: Engine) -> Generator[Session, None, None]:
+    """
+    Session on the in-memory database.
+    
+    Yields:
+        Session: Database session
+    """
+    session = sessionmaker(bind=db_engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_judgement() -> Callable[..., Dict[str, Any]]:
+    """
+    Factory for the fields of one judgement.
+    
+    Returns:
+        Callable[..., Dict[str, Any]]: Builds fields from a query, bibcode and
+            score, with any field overridden by keyword
+    """
+    def _make(query: str, bibcode: Optional[str], score: float, **overrides: Any) -> Dict[str, Any]:
+        data = {
+            "query": query,
+            "information_need": "find papers",
+            "record_title": f"Title of {bibcode}",
+            "publication_year": 2020,
+            "record_bibcode": bibcode,
+            "record_source": "ADS",
+            "judgement_score": score,
+            "judgement_note": None,
+        }
+        data.update(overrides)
+        return data
+    
+    return _make
@@ -0,0 +1,95 @@
+"""
+Tests for the batch comparison service.
+
+This module contains tests for running comparisons over query sets: per-source
+batch limits, cache reuse, and the aggregated metric distributions.
+"""
+import asyncio
+from typing import Dict
+from unittest.mock import patch
+
+import pytest
+
+from app.api.models import SearchResult
+from app.services import search_service
+from app.services.batch_comparison import run_batch_comparison
+from app.utils import scheduler
+from app.utils.scheduler import configure_source_schedulers
+
+
+def fake_upstream(in_flight: Dict[str, int], peak: Dict[str, int]):
+    """Create a stand-in for _query_source that tracks concurrent calls per source."""
+    async def _fake(source, query, fields, num_results, attempt_count, qf=None, field_boosts=None):
+        in_flight[source] = in_flight.get(source, 0) + 1
+        peak[source] = max(peak.get(source, 0), in_flight[source])
+        await asyncio.sleep(0.01)
+        in_flight[source] -= 1
+        # The two sources share the first five papers
+        offset = 0 if source == "ads" else 5
+        return [
+            SearchResult(title=f"{query} paper {i}", author=[], source=source, rank=rank, doi=f"10.1/{query}.{i}")
+            for rank, i in enumerate(range(offset, offset + 10), start=1)
+        ]
+
+    return _fake
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Keep tests away from the on-disk result cache."""
+    with patch.object(search_service, "save_to_cache", return_value=True), \
+            patch.object(search_service, "lookup_cache", return_value=(None, "miss")):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_batch_respects_source_limits_and_aggregates() -> None:
+    """Batch calls stay within each source's batch concurrency and metrics are summarized."""
+    in_flight: Dict[str, int] = {}
+    peak: Dict[str, int] = {}
+    limits = {
+        "ads": {"rate": 1000, "burst": 100, "batch_concurrency": 2},
+        "webOfScience": {"rate": 1000, "burst": 100, "batch_concurrency": 1}
+    }
+    queries = [f"q{i}" for i in range(12)]
+    with patch.object(search_service, "_query_source", fake_upstream(in_flight, peak)), \
+            patch.dict(scheduler._schedulers):
+        configure_source_schedulers(limits)
+        batch = await run_batch_comparison(
+            queries, ["ads", "webOfScience"], ["jaccard", "rankBiased"], ["title"], query_concurrency=6
+        )
+
+    assert peak == {"ads": 2, "webOfScience": 1}
+    assert [row["index"] for row in batch["rows"]] == list(range(12))
+    assert batch["rows"][3]["pairs"]["ads_vs_webOfScience"]["overlap"] == 5
+
+    summary = batch["summary"]
+    assert summary["queries"] == 12
+    assert summary["sources"]["ads"] == {"ok": 12}
+    overlap = summary["pairs"]["ads_vs_webOfScience"]["overlap_ratio"]
+    assert overlap["count"] == 12
+    assert overlap["mean"] == pytest.approx(0.5)
+    assert summary["pairs"]["ads_vs_webOfScience"]["jaccard"]["p50"] == pytest.approx(5 / 15)
+
+
+@pytest.mark.asyncio
+async def test_batch_cache_hits_bypass_source_limits() -> None:
+    """Cached queries are answered without taking an upstream slot."""
+    cached = [SearchResult(title=f"paper {i}", author=[], source="ads", rank=i) for i in range(1, 11)]
+    with patch.object(search_service, "lookup_cache", return_value=(cached, "hit")), \
+            patch.object(search_service, "_query_source", side_effect=AssertionError("upstream called")):
+        batch = await run_batch_comparison(["a", "b"], ["ads", "webOfScience"], ["jaccard"], ["title"])
+
+    assert batch["summary"]["cache"] == {"hit": 4}
+    assert batch["summary"]["pairs"]["ads_vs_webOfScience"]["jaccard"]["mean"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_batch_page_keeps_query_indexes() -> None:
+    """A page of a larger query set is numbered from its offset and summarized on its own."""
+    with patch.object(search_service, "_query_source", fake_upstream({}, {})), \
+            patch.dict(scheduler._schedulers):
+        batch = await run_batch_comparison(["q5", "q6"], ["ads", "webOfScience"], ["jaccard"], ["title"], start_index=5)
+
+    assert [(row["index"], row["query"]) for row in batch["rows"]] == [(5, "q5"), (6, "q6")]
+    assert batch["summary"]["queries"] == 2
@@ -0,0 +1,114 @@
+"""
+Tests for the boost service module.
+
+This module contains tests for the columnar boosting path, checking it
+against the scalar boost helpers and the shape of the boosted results.
+"""
+import math
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.api.models import SearchResult
+from app.services.boost_service import (
+    apply_all_boosts,
+    calculate_recency_boost,
+    calculate_recency_boosts,
+    decode_pubdate,
+    combine_boost_arrays,
+    combine_boost_factors,
+    sweep_boost_configs
+)
+
+
+@pytest.mark.parametrize(
+    "method", ["weighted_sum", "simple_sum", "simple_product", "weighted_geometric_mean"]
+)
+def test_combine_boost_arrays_matches_scalar(method: str) -> None:
+    """Batch combination agrees with combine_boost_factors row by row."""
+    boosts = {
+        "citation": np.array([0.5, 0.0, -1.0, np.nan]),
+        "recency": np.array([np.nan, 0.2, 0.3, np.nan]),
+        "doctype": np.array([1.0, 0.5, 0.0, np.nan])
+    }
+    combined = combine_boost_arrays(boosts, None, method)
+    
+    for i in range(4):
+        row = {k: float(v[i]) for k, v in boosts.items() if not math.isnan(v[i])}
+        assert combined[i] == pytest.approx(combine_boost_factors(row, None, method))
+
+
+def test_recency_boosts_share_reference_clock() -> None:
+    """Batch recency boosts match the scalar version and mark unknown dates."""
+    now = datetime(2024, 6, 15)
+    boosts = calculate_recency_boosts(["2024-01-01", None, "not a date"], 0.5, now=now)
+    
+    assert boosts[0] == pytest.approx(1.0 / (1.0 + 0.5 * 5))
+    assert math.isnan(boosts[1])
+    assert boosts[2] == 0.0
+    assert calculate_recency_boost("not a date") == 0.0
+
+
+def test_decode_pubdate_handles_ads_patterns() -> None:
+    """ADS dates with 00 month/day decode without a general-purpose parse."""
+    assert decode_pubdate("2020-05-00") == 2020 * 12 + 4
+    assert decode_pubdate("2020-00-00") == decode_pubdate("2020") == 2020 * 12
+    assert decode_pubdate("May 17 2020") == 2020 * 12 + 4
+    assert decode_pubdate("2020-13-00") is None
+
+
+def test_recency_honours_reference_year() -> None:
+    """A reference year measures ages from its December, ignoring the clock."""
+    boosts = calculate_recency_boosts(["2019-12-00", "2019-01-00", "2021-06-00"], 1.0, reference_year=2019)
+    
+    assert boosts.tolist() == [1.0, 1.0 / 12, 1.0]
+    assert calculate_recency_boost("2019-06-00", 0.5, reference_year=2019) == pytest.approx(1.0 / 4)
+
+
+@pytest.mark.asyncio
+async def test_apply_all_boosts_reranks_without_deep_copies() -> None:
+    """Boosted results are re-ranked shallow copies; the inputs are untouched."""
+    authors = ["Doe, J."]
+    results = [
+        SearchResult(title="Obscure", author=authors, source="ads", rank=1, doctype="abstract"),
+        SearchResult(title="Classic", author=authors, source="ads", rank=2, doctype="article"),
+    ]
+    boosted = await apply_all_boosts(results, {
+        "doctype_boosts": {"article": 1, "abstract": 5, "other": 8},
+        "boost_weights": {"doctype": 2.0}
+    })
+    
+    assert [r.title for r in boosted] == ["Classic", "Obscure"]
+    assert [r.rank for r in boosted] == [1, 2]
+    assert boosted[0].original_rank == 2 and boosted[0].rank_change == 1
+    assert boosted[0].boost_factors["doctype"] == 1.0
+    assert boosted[0].boosted_score == pytest.approx(0.5 * math.exp(2.0))
+    assert boosted[0].source_id == "boosted"
+    assert boosted[0].author is results[1].author
+    assert results[0].rank == 1 and results[0].boost_factors is None
+
+
+@pytest.mark.asyncio
+async def test_sweep_matches_apply_all_boosts_per_config() -> None:
+    """Each sweep row orders candidates exactly as apply_all_boosts would."""
+    results = [
+        SearchResult(title=f"Paper {i}", author=["x"] * (i % 3), source="ads", rank=i + 1,
+                     doctype=["article", "abstract", "misc"][i % 3], citation_count=i * 7)
+        for i in range(12)
+    ]
+    doctype_ranks = {"article": 1, "abstract": 5, "other": 8}
+    configs = [
+        {},
+        {"doctype_boosts": doctype_ranks, "boost_weights": {"doctype": 3.0}},
+        {"field_boosts": {"author": 0.5, "citation_count": 0.05}, "boost_weights": {"field": 1.0}},
+        {"doctype_boosts": {"article": 1}},  # no 'other' rank: keeps the original order
+    ]
+    orders = sweep_boost_configs(results, configs)
+    
+    assert orders.shape == (4, 12)
+    for config, order in zip(configs, orders):
+        boosted = await apply_all_boosts(results, config)
+        assert [r.title for r in boosted] == [results[i].title for i in order]
+    assert orders[0].tolist() == list(range(12))
+    assert orders[3].tolist() == list(range(12))
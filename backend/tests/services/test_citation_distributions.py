@@ -0,0 +1,66 @@
+"""
+Tests for the citation distribution tables.
+
+This module contains tests for building percentile tables from snapshots,
+persisting them, and feeding them to citation boosts.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from app.api.models import SearchResult
+from app.services import citation_distributions
+from app.services.boost_service import apply_all_boosts
+from app.services.citation_distributions import (
+    CitationDistributionTable,
+    build_citation_distributions
+)
+
+
+@pytest.fixture
+def snapshot(tmp_path) -> str:
+    """Write a small ADS-style snapshot: 2020 papers cite 0..99, astronomy only the evens."""
+    docs = [
+        {"year": "2020", "citation_count": i, "database": ["astronomy"] if i % 2 == 0 else ["physics"]}
+        for i in range(100)
+    ]
+    path = tmp_path / "snapshot.jsonl"
+    path.write_text("\n".join(json.dumps(doc) for doc in docs))
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def reset_active_table():
+    """Keep tests from leaking the installed table into each other."""
+    yield
+    citation_distributions.set_citation_distribution_table(None)
+
+
+def test_tables_round_trip_and_look_up_percentiles(snapshot: str, tmp_path) -> None:
+    """Built tables persist compactly and answer percentile lookups."""
+    output = str(tmp_path / "tables.npz")
+    build_citation_distributions([snapshot], output, min_count=10)
+    table = CitationDistributionTable.load(output)
+    
+    assert set(table.collections) == {"general", "astronomy", "physics"}
+    assert table.median("general", 2020) == pytest.approx(np.median(range(100)))
+    assert table.median("astronomy", 2020) == pytest.approx(np.median(range(0, 100, 2)))
+    assert table.percentile("general", 2020, 90) == pytest.approx(np.percentile(range(100), 90))
+    assert table.percentile_rank("general", 2020, 49.5) == 50
+    assert table.median("general", 1999) is None
+    assert table.as_distributions()["astronomy"][2020]["count"] == 50
+
+
+@pytest.mark.asyncio
+async def test_citation_boost_uses_loaded_tables(snapshot: str, tmp_path) -> None:
+    """Without explicit distributions, citation boosts use the active tables."""
+    build_citation_distributions([snapshot], str(tmp_path / "tables.npz"), min_count=10)
+    results = [
+        SearchResult(title="Rarely cited", author=[], source="ads", rank=1, year=2020, citation_count=1),
+        SearchResult(title="Highly cited", author=[], source="ads", rank=2, year=2020, citation_count=400),
+    ]
+    boosted = await apply_all_boosts(results, {"citation_boost": 1.0})
+    
+    assert [r.title for r in boosted] == ["Highly cited", "Rarely cited"]
+    assert boosted[0].boost_factors["citation"] == pytest.approx(np.log1p(400 / 49.5))
@@ -0,0 +1,68 @@
+"""
+Tests for judgement enrichment of search results.
+
+This module contains tests for annotating results with aggregated judgements
+through one batched lookup and the in-process summary cache.
+"""
+from typing import Any, Callable, Dict, Generator, List
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.models import SearchResult
+from app.services import judgement_enrichment
+from app.services.judgement_enrichment import JudgementSummaryCache, annotate_with_judgements
+from app.services.judgement_service import JudgementService
+
+
+@pytest.fixture
+def selects(
+    db_engine: Engine, make_judgement: Callable[..., Dict[str, Any]]
+) -> Generator[List[str], None, None]:
+    """Seed the in-memory judgement database and record the SELECTs run against it."""
+    session_factory = sessionmaker(bind=db_engine)
+    with session_factory() as db:
+        service = JudgementService(db)
+        service.upsert_judgements(uuid4(), [
+            make_judgement("dark matter", "2020ApJ...1A", 0.5, record_title="Halo Paper"),
+            make_judgement("dark matter", None, 1.0, record_title="Preprint")
+        ])
+        service.upsert_judgements(uuid4(), [
+            make_judgement("dark matter", "2020ApJ...1A", 1.0, record_title="Halo Paper")
+        ])
+
+    statements: List[str] = []
+    event.listen(db_engine, "before_cursor_execute",
+                 lambda conn, cursor, sql, params, context, many: statements.append(sql))
+    with patch.object(judgement_enrichment, "SessionLocal", session_factory), \
+            patch.object(judgement_enrichment, "_summary_cache", JudgementSummaryCache(ttl=60)):
+        yield statements
+
+
+@pytest.mark.asyncio
+async def test_results_annotated_with_one_lookup_then_cache(selects: List[str]) -> None:
+    """All sources are annotated from one aggregate query; repeats are served from the cache."""
+    ads = SearchResult(title="Halo Paper (ADS)", author=[], source="ads", rank=1,
+                       url="https://ui.adsabs.harvard.edu/abs/2020ApJ...1A/abstract")
+    scholar = SearchResult(title="Preprint", author=[], source="scholar", rank=1)
+    unjudged = SearchResult(title="Unrated", author=[], source="scholar", rank=2)
+    results = {"ads": [ads], "scholar": [scholar, unjudged]}
+
+    meta = await annotate_with_judgements(results)
+
+    assert meta["annotated"] == 2
+    assert len(selects) == 1
+    assert results["ads"][0].judgement == {"mean_score": 0.75, "count": 2}
+    assert results["scholar"][0].judgement == {"mean_score": 1.0, "count": 1}
+    assert results["scholar"][1].judgement is None
+    # Cached result objects are left untouched
+    assert ads.judgement is None
+
+    again = {"ads": [ads], "scholar": [scholar, unjudged]}
+    await annotate_with_judgements(again)
+    assert len(selects) == 1
+    assert again["ads"][0].judgement["count"] == 2
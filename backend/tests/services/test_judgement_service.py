@@ -0,0 +1,163 @@
+"""
+Tests for the judgement service.
+
+This module contains tests for bulk judgement submission, SQL-side
+statistics and index migration against an in-memory SQLite database, and
+for running database work off the event loop.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.database import run_in_db, shutdown_db
+from app.core.init_db import create_missing_indexes
+from app.models.judgement import Judgement
+from app.services.judgement_service import JudgementService
+
+
+def test_upsert_judgements_batches_statements(
+    db: Session, make_judgement: Callable[..., Dict[str, Any]]
+) -> None:
+    """A batch is written with a few executemany statements and a single commit."""
+    rater_id = uuid4()
+    service = JudgementService(db)
+    statements = []
+    commits = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, sql, params, context, many: statements.append(sql.split()[0]))
+    event.listen(db, "after_commit", lambda session: commits.append(True))
+
+    stored = service.upsert_judgements(
+        rater_id, [make_judgement("dark matter", f"2020ApJ...{i}", 0.5) for i in range(10)], chunk_size=4
+    )
+
+    assert [j.record_bibcode for j in stored] == [f"2020ApJ...{i}" for i in range(10)]
+    assert len(commits) == 1
+    # Three chunks, each one lookup and one insert, then one read back per chunk
+    assert statements.count("INSERT") == 3
+    assert db.query(Judgement).count() == 10
+
+
+def test_upsert_judgements_replaces_by_rater_query_bibcode(
+    db: Session, make_judgement: Callable[..., Dict[str, Any]]
+) -> None:
+    """Existing judgements are updated in place; other raters and unkeyed rows are untouched."""
+    rater_id, other_rater = uuid4(), uuid4()
+    service = JudgementService(db)
+    first = service.upsert_judgements(
+        rater_id, [make_judgement("q", "A", 0.2), make_judgement("q", "B", 0.4)]
+    )
+    service.upsert_judgements(other_rater, [make_judgement("q", "A", 1.0)])
+
+    stored = service.upsert_judgements(rater_id, [
+        make_judgement("q", "A", 0.9, judgement_note="changed my mind"),
+        make_judgement("q", None, 0.3),
+        make_judgement("q", None, 0.3),
+        make_judgement("q", "C", 0.1),
+        make_judgement("q", "C", 0.6),
+    ])
+
+    assert stored[0].id == first[0].id
+    assert stored[0].judgement_score == 0.9
+    assert stored[0].judgement_note == "changed my mind"
+    # The repeated bibcode collapses to its last value; rows without a bibcode are kept
+    assert [j.judgement_score for j in stored[1:]] == [0.3, 0.3, 0.6]
+    mine = db.query(Judgement).filter(Judgement.rater_id == rater_id).all()
+    assert len(mine) == 5
+    assert db.query(Judgement).filter(Judgement.rater_id == other_rater).one().judgement_score == 1.0
+
+
+def test_upsert_judgements_retries_after_concurrent_insert(
+    db: Session, make_judgement: Callable[..., Dict[str, Any]]
+) -> None:
+    """A judgement inserted by a concurrent batch after the lookup is updated on retry, not duplicated."""
+    rater_id = uuid4()
+    service = JudgementService(db)
+    first = service.upsert_judgements(rater_id, [make_judgement("q", "A", 0.2)])
+    existing = service._find_existing_judgements(rater_id, [("q", "A")])
+
+    # The first lookup misses the row, as if the other batch committed just after it
+    with patch.object(service, "_find_existing_judgements", side_effect=[{}, existing]) as find:
+        stored = service.upsert_judgements(rater_id, [make_judgement("q", "A", 0.9)])
+
+    assert find.call_count == 2
+    assert stored[0].id == first[0].id
+    assert db.query(Judgement).filter(Judgement.rater_id == rater_id).one().judgement_score == 0.9
+    # A repeat single judgement updates the row too
+    assert service.create_judgement(rater_id=rater_id, **make_judgement("q", "A", 0.4)).id == first[0].id
+
+
+def test_judgement_stats_are_aggregated_in_sql(
+    db: Session, make_judgement: Callable[..., Dict[str, Any]]
+) -> None:
+    """Stats and averages come from aggregate queries over the matching rows."""
+    service = JudgementService(db)
+    rater_id, other_rater = uuid4(), uuid4()
+    service.upsert_judgements(rater_id, [
+        make_judgement("q", "A", 0.2),
+        make_judgement("q", "B", 0.4, record_source="Scholar"),
+        make_judgement("other", "A", 1.0),
+    ])
+    service.upsert_judgements(other_rater, [make_judgement("q", "A", 0.6)])
+
+    stats = service.get_judgement_stats("q")
+
+    assert stats["total_judgements"] == 3
+    assert stats["average_score"] == pytest.approx(0.4)
+    assert stats["unique_raters"] == 2
+    assert stats["source_distribution"] == {"ADS": 2, "Scholar": 1}
+    assert service.get_average_score("q", "A") == pytest.approx(0.4)
+    assert service.get_average_score("missing") is None
+    assert service.get_judgement_stats("missing")["total_judgements"] == 0
+
+
+def test_create_missing_indexes_migrates_existing_table() -> None:
+    """Indexes declared on the model are added to a table created without them."""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        Judgement.__table__.create(conn)
+        for index in Judgement.__table__.indexes:
+            index.drop(conn)
+
+    create_missing_indexes(engine)
+    create_missing_indexes(engine)
+
+    names = {index["name"] for index in inspect(engine).get_indexes("judgements")}
+    assert {index.name for index in Judgement.__table__.indexes} <= names
+
+
+@pytest.mark.asyncio
+async def test_run_in_db_keeps_event_loop_responsive(db: Session) -> None:
+    """Blocking database work runs on the database threads while the loop keeps ticking."""
+    ticks = []
+
+    async def ticker() -> None:
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    def slow_stats(query: str) -> Dict[str, Any]:
+        time.sleep(0.1)
+        return {"thread": threading.current_thread().name, **JudgementService(db).get_judgement_stats(query)}
+
+    stats, _ = await asyncio.gather(run_in_db(slow_stats, "q"), ticker())
+
+    assert stats["thread"].startswith("db")
+    assert stats["total_judgements"] == 0
+    assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.1
+
+
+@pytest.mark.asyncio
+async def test_run_in_db_after_shutdown() -> None:
+    """The database thread pool is recreated after shutdown, e.g. for a second app lifespan."""
+    await run_in_db(time.sleep, 0)
+    shutdown_db()
+
+    assert await run_in_db(threading.current_thread) is not threading.current_thread()
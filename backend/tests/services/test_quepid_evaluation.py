@@ -0,0 +1,106 @@
+"""
+Tests for the multi-engine Quepid evaluation.
+
+This module contains tests for batched nDCG, judgment alignment, the
+vectorized metric matrix and for evaluating several sources over a query
+set against one loaded case.
+"""
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+from app.api.models import SearchResult
+from app.services import quepid_evaluation
+from app.services.quepid_evaluation import evaluate_rankings, evaluate_sources, metric_columns
+from app.services.quepid_service import (
+    QuepidCase,
+    align_judgment_ratings,
+    calculate_ndcg,
+    calculate_ndcg_batch
+)
+
+
+def result(bibcode: str, rank: int) -> SearchResult:
+    """Build an ADS-style result whose URL carries a bibcode."""
+    return SearchResult(
+        title=f"Paper {bibcode}", author=[], source="ads", rank=rank,
+        url=f"https://ui.adsabs.harvard.edu/abs/{bibcode}/abstract"
+    )
+
+
+def test_calculate_ndcg_batch_matches_scalar() -> None:
+    """Batched nDCG agrees with calculate_ndcg for every ranking."""
+    rankings = np.array([[3, 0, 2, 1], [0, 0, 0, 0], [1, 2, 3, 0]])
+    
+    batch = calculate_ndcg_batch(rankings, 3)
+    
+    for row, value in zip(rankings.tolist(), batch):
+        assert value == pytest.approx(calculate_ndcg(row[:3], 3))
+
+
+def test_align_judgment_ratings_by_id_then_title() -> None:
+    """Ratings are matched by document ID first and title second."""
+    results = [
+        result("2020ApJ...1A", 1),
+        SearchResult(title="Judged By Title", author=[], source="ads", rank=2),
+        SearchResult(title="Unjudged", author=[], source="ads", rank=3),
+    ]
+    judgments = {"20201": 3, "999": {"rating": 2, "title": "judged by title"}}
+    
+    assert align_judgment_ratings(results, judgments).tolist() == [3.0, 2.0, 0.0]
+
+
+def test_evaluate_rankings_matches_scalar_metrics() -> None:
+    """Every cutoff of every ranking is scored in one matrix."""
+    ratings = np.array([[3, 0, 2, 1, 0, 0], [0, 1, 0, 0, 0, 0]], dtype=float)
+    judged = np.array([[1, 1, 1, 1, 0, 0], [0, 1, 0, 0, 0, 0]], dtype=bool)
+    counts = np.array([6, 2])
+
+    matrix = evaluate_rankings(ratings, judged, counts, [2, 4], total_relevant=4)
+    values = dict(zip(metric_columns([2, 4]), matrix[0]))
+
+    assert values["ndcg@4"] == pytest.approx(calculate_ndcg([3, 0, 2, 1], 4))
+    assert values["p@2"] == 0.5
+    assert values["recall@4"] == 0.75
+    assert values["coverage@4"] == 1.0
+    # The second ranking returned two results: coverage is over what was returned
+    assert dict(zip(metric_columns([2, 4]), matrix[1]))["coverage@4"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_evaluate_sources_loads_case_once() -> None:
+    """The case is loaded once and every query scores every source."""
+    case = QuepidCase(7, "Lensing", ["q1", "q2"], {
+        "q1": {"2020001": 3, "2020002": 0},
+        "q2": {"2020003": {"rating": 2, "title": "paper 2020004"}}
+    })
+    # Sources that failed or returned too few results are absent from the results
+    responses = {"ads": [result("2020001", 1), result("2020004", 2)]}
+
+    async def fake_results(query, sources, fields, **kwargs):
+        meta = {
+            "ads": {"status": "ok", "count": 2},
+            "scholar": {"status": "error", "count": 0},
+            "semanticScholar": {"status": "insufficient", "count": 1}
+        }
+        return responses, {"sources": meta}
+
+    load_case = AsyncMock(return_value=case)
+    with patch.object(quepid_evaluation, "load_case_with_judgments", load_case), \
+            patch.object(quepid_evaluation, "get_results_with_metadata", side_effect=fake_results):
+        evaluation = await evaluate_sources(
+            7, ["q1", "q2"], ["ads", "scholar", "semanticScholar"], ks=[1, 2]
+        )
+
+    load_case.assert_awaited_once_with(7)
+    assert evaluation["columns"] == metric_columns([1, 2])
+    q1, q2 = [dict(zip(evaluation["columns"], row["matrix"]["ads"])) for row in evaluation["rows"]]
+    assert q1["p@1"] == 1.0 and q1["recall@2"] == 1.0 and q1["coverage@2"] == 0.5
+    # Matched by title when the ID is not judged
+    assert q2["ndcg@2"] == pytest.approx(calculate_ndcg([0, 2], 2)) and q2["coverage@2"] == 0.5
+    assert evaluation["rows"][0]["matrix"]["scholar"] is None
+    assert evaluation["rows"][0]["matrix"]["semanticScholar"] is None
+    assert evaluation["summary"]["queries"] == {"ads": 2, "scholar": 0, "semanticScholar": 0}
+    assert evaluation["summary"]["matrix"]["semanticScholar"] is None
+    assert evaluation["summary"]["matrix"]["ads"][0] == pytest.approx(0.5)
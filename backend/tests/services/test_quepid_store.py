@@ -0,0 +1,123 @@
+"""
+Tests for the Quepid judgment store.
+
+This module contains tests for serving cases from memory and SQLite,
+conditional revalidation, incremental rewrites, stale fallbacks, and the
+cached judged-document lookup.
+"""
+from typing import Any, Dict, List, Optional
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.quepid_service import QuepidService
+from app.services.quepid_store import QuepidJudgmentStore
+
+
+CASE = {"case_id": 7, "case_name": "Lensing", "tries": [{"args": {"q": ["weak lensing"]}}]}
+
+
+def ratings_export(ratings: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+    """Build a ratings export payload from ratings by query."""
+    return {"queries": [{"query": query, "ratings": docs} for query, docs in ratings.items()]}
+
+
+class FakeQuepid:
+    """Stand-in for fetch_case_payloads that answers 304 when the ETag matches."""
+
+    def __init__(self, ratings: Dict[str, Dict[str, int]]):
+        self.ratings = ratings
+        self.version = 1
+        self.calls: List[Optional[str]] = []
+        self.fail = False
+
+    async def __call__(self, case_id: int, case_etag: Optional[str], ratings_etag: Optional[str]) -> Dict[str, Any]:
+        self.calls.append(ratings_etag)
+        if self.fail:
+            raise RuntimeError("Quepid unavailable")
+        etag = f'"v{self.version}"'
+        return {
+            "case": None if case_etag == '"case"' else CASE,
+            "case_etag": '"case"',
+            "ratings": None if ratings_etag == etag else ratings_export(self.ratings),
+            "ratings_etag": etag
+        }
+
+
+@pytest.mark.asyncio
+async def test_repeated_lookups_cost_no_round_trips(tmp_path) -> None:
+    """Fresh cases are served from memory, then from SQLite after a restart."""
+    quepid = FakeQuepid({"weak lensing": {"doc1": 3, "doc2": 0}})
+    path = str(tmp_path / "judgments.sqlite3")
+    store = QuepidJudgmentStore(quepid, path=path, ttl=600)
+
+    first = await store.get_case(7)
+    second = await store.get_case(7)
+    restarted = await QuepidJudgmentStore(quepid, path=path, ttl=600).get_case(7)
+
+    assert len(quepid.calls) == 1
+    assert second is first
+    assert restarted.name == "Lensing"
+    assert restarted.queries == ["weak lensing"]
+    assert restarted.judgments == {"weak lensing": {"doc1": 3, "doc2": 0}}
+
+
+@pytest.mark.asyncio
+async def test_revalidation_is_conditional_and_incremental(tmp_path) -> None:
+    """Expired cases revalidate with ETags and only changed queries are rewritten."""
+    quepid = FakeQuepid({"weak lensing": {"doc1": 3}, "dark matter": {"doc9": 1}})
+    store = QuepidJudgmentStore(quepid, path=str(tmp_path / "judgments.sqlite3"), ttl=0)
+
+    await store.get_case(7)
+    await store.get_case(7)
+    assert quepid.calls == [None, '"v1"']
+    assert store.stats["not_modified"] == 1
+
+    quepid.version = 2
+    quepid.ratings = {"weak lensing": {"doc1": 2}, "dark matter": {"doc9": 1}}
+    digests = dict(store._cases[7].digests)
+    record = await store.get_case(7)
+
+    assert record.judgments["weak lensing"] == {"doc1": 2}
+    assert record.digests["dark matter"] == digests["dark matter"]
+    assert record.digests["weak lensing"] != digests["weak lensing"]
+    assert store._read(7).judgments == record.judgments
+
+
+@pytest.mark.asyncio
+async def test_stored_case_served_when_quepid_fails(tmp_path) -> None:
+    """A failed revalidation falls back to the stored judgments."""
+    quepid = FakeQuepid({"weak lensing": {"doc1": 3}})
+    store = QuepidJudgmentStore(quepid, path=str(tmp_path / "judgments.sqlite3"), ttl=0)
+    await store.get_case(7)
+
+    quepid.fail = True
+    record = await store.get_case(7)
+
+    assert record.judgments == {"weak lensing": {"doc1": 3}}
+    assert store.stats["stale_served"] == 1
+    assert await QuepidJudgmentStore(quepid, path=str(tmp_path / "other.sqlite3")).get_case(7) is None
+
+
+@pytest.mark.asyncio
+async def test_get_judged_documents_indexes_book_and_caches() -> None:
+    """Judged documents are joined through the book index and the snapshot is reused."""
+    responses = {
+        "cases/5": {"book_id": 9},
+        "books/9/judgements": {"judgements": [
+            {"doc_id": "d1", "title": "First"},
+            {"doc_id": "d2", "title": "Second"},
+            {"doc_id": "d1", "title": "Duplicate"}
+        ]},
+        "cases/5/snapshots/latest": {"queries": [
+            {"query_id": 1, "query": "dark energy", "ratings": {"d2": 1, "d1": {"rating": 3}, "missing": 2}}
+        ]}
+    }
+    service = QuepidService()
+    with patch.object(service, "_make_request", AsyncMock(side_effect=lambda url: responses[url])) as request:
+        first = await service.get_judged_documents(5)
+        second = await service.get_judged_documents(5, query_id=1)
+
+    assert [(doc["id"], doc["title"], doc["judgment"]) for doc in first] == [("d2", "Second", 1), ("d1", "First", 3)]
+    assert second == first
+    assert request.await_count == 3
@@ -0,0 +1,77 @@
+"""
+Tests for the Google Scholar service.
+
+This module contains tests for running scholarly searches on the worker
+pool: the event loop stays responsive and slow searches are cancelled.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List
+from unittest.mock import patch
+
+import pytest
+
+from app.services import scholar_service
+from app.services.scholar_service import get_scholar_results_scholarly
+
+
+def slow_scholarly(delay: float, produced: List[int]) -> SimpleNamespace:
+    """Create a stand-in for the scholarly client whose search blocks before each result."""
+    def _search(query: str) -> Iterator[Dict[str, Any]]:
+        for i in range(50):
+            time.sleep(delay)
+            produced.append(i)
+            yield {"bib": {"title": f"{query} {i}", "author": ["A. Author"], "pub_year": "2020"}}
+
+    return SimpleNamespace(search_pubs=_search)
+
+
+def patch_scholarly(client: SimpleNamespace):
+    """Swap in a scholarly client for the duration of a test."""
+    return patch.multiple(scholar_service, scholarly=client, SCHOLARLY_AVAILABLE=True, create=True)
+
+
+@pytest.mark.asyncio
+async def test_scholarly_search_runs_off_the_event_loop() -> None:
+    """The loop keeps running while scholarly blocks, and results are returned."""
+    produced: List[int] = []
+    ticks: List[float] = []
+
+    async def ticker() -> None:
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    with patch_scholarly(slow_scholarly(0.02, produced)):
+        results, _ = await asyncio.gather(get_scholar_results_scholarly("galaxies", ["title"], 3), ticker())
+
+    assert [r.title for r in results] == ["galaxies 0", "galaxies 1", "galaxies 2"]
+    assert results[0].year == 2020 and results[0].rank == 1
+    assert ticks[-1] - ticks[0] < 0.1
+
+
+@pytest.mark.asyncio
+async def test_scholarly_search_cancelled_on_timeout() -> None:
+    """A search that outlives the timeout returns nothing and stops its worker."""
+    produced: List[int] = []
+    with patch_scholarly(slow_scholarly(0.05, produced)), \
+            patch.object(scholar_service, "TIMEOUT_SECONDS", 0.12):
+        results = await get_scholar_results_scholarly("galaxies", ["title"], 50)
+        stopped_at = len(produced)
+        await asyncio.sleep(0.15)
+
+    assert results == []
+    # The worker finishes the page in flight, then notices the cancellation
+    assert len(produced) <= stopped_at + 1
+
+
+@pytest.mark.asyncio
+async def test_scholarly_search_after_executor_shutdown() -> None:
+    """The worker pool is recreated after shutdown, e.g. for a second app lifespan."""
+    with patch_scholarly(slow_scholarly(0, [])):
+        await get_scholar_results_scholarly("galaxies", ["title"], 1)
+        scholar_service.shutdown_scholarly_executor()
+        results = await get_scholar_results_scholarly("galaxies", ["title"], 1)
+
+    assert [r.title for r in results] == ["galaxies 0"]
@@ -0,0 +1,248 @@
+"""
+Tests for the search service module.
+
+This module contains tests for the multi-source fan-out in the search service,
+including concurrency, request deadlines, read-through caching, request
+coalescing, and per-source metadata.
+"""
+import asyncio
+import time
+from typing import List, Optional, Dict
+from unittest.mock import patch
+
+import pytest
+
+from app.api.models import SearchResult
+from app.services import search_service
+from app.services.search_service import (
+    get_results_with_metadata,
+    get_results_with_fallback,
+    stream_results_with_metadata
+)
+from app.utils.scheduler import BATCH, traffic_lane
+
+
+def make_results(source: str, count: int) -> List[SearchResult]:
+    """Build a list of placeholder results for a source."""
+    return [
+        SearchResult(title=f"{source} paper {i}", author=[], source=source, rank=i)
+        for i in range(1, count + 1)
+    ]
+
+
+def fake_query_source(delays: Dict[str, float], counts: Optional[Dict[str, int]] = None):
+    """Create a stand-in for _query_source that sleeps per source."""
+    counts = counts or {}
+
+    async def _fake(source, query, fields, num_results, attempt_count, qf=None, field_boosts=None):
+        await asyncio.sleep(delays.get(source, 0))
+        return make_results(source, counts.get(source, 10))
+
+    return _fake
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Keep tests away from the on-disk result cache."""
+    with patch.object(search_service, "save_to_cache", return_value=True), \
+            patch.object(search_service, "lookup_cache", return_value=(None, "miss")):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_concurrent_fan_out_costs_slowest_source() -> None:
+    """Sources run concurrently, so total time tracks the slowest source."""
+    delays = {"ads": 0.2, "semanticScholar": 0.2, "webOfScience": 0.2}
+    with patch.object(search_service, "_query_source", fake_query_source(delays)):
+        start = time.perf_counter()
+        results, metadata = await get_results_with_metadata(
+            "dark matter", list(delays), ["title"]
+        )
+        elapsed = time.perf_counter() - start
+
+    assert set(results) == set(delays)
+    assert elapsed < 0.5
+    for source in delays:
+        assert metadata["sources"][source]["status"] == "ok"
+        assert metadata["sources"][source]["attempts"] == 1
+        assert metadata["sources"][source]["elapsed_ms"] >= 150
+
+
+@pytest.mark.asyncio
+async def test_deadline_returns_partial_results() -> None:
+    """Sources that miss the request deadline are cancelled and reported."""
+    delays = {"ads": 0.01, "webOfScience": 5}
+    with patch.object(search_service, "_query_source", fake_query_source(delays)):
+        results, metadata = await get_results_with_metadata(
+            "dark matter", ["ads", "webOfScience"], ["title"], deadline=0.2
+        )
+
+    assert list(results) == ["ads"]
+    assert metadata["sources"]["ads"]["status"] == "ok"
+    assert metadata["sources"]["webOfScience"]["status"] == "deadline_exceeded"
+    assert "elapsed_ms" in metadata["sources"]["webOfScience"]
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_sources_in_completion_order() -> None:
+    """Fast sources are streamed before slow ones finish."""
+    delays = {"ads": 0.3, "webOfScience": 0.01}
+    arrivals = []
+    start = time.perf_counter()
+    with patch.object(search_service, "_query_source", fake_query_source(delays)):
+        async for source, results, meta in stream_results_with_metadata(
+            "dark matter", ["unknown", "ads", "webOfScience"], ["title"]
+        ):
+            arrivals.append((source, meta["status"], time.perf_counter() - start))
+
+    assert [(source, status) for source, status, _ in arrivals] == [
+        ("unknown", "disabled"), ("webOfScience", "ok"), ("ads", "ok")
+    ]
+    assert arrivals[1][2] < 0.2
+
+
+@pytest.mark.asyncio
+async def test_insufficient_results_exhaust_attempts() -> None:
+    """A source that never reaches min_results is retried and then dropped."""
+    with patch.object(
+        search_service, "_query_source", fake_query_source({}, {"ads": 1})
+    ):
+        results, metadata = await get_results_with_metadata(
+            "dark matter", ["ads", "unknown"], ["title"], attempts=2
+        )
+
+    assert results == {}
+    assert metadata["sources"]["ads"]["status"] == "insufficient"
+    assert metadata["sources"]["ads"]["attempts"] == 2
+    assert metadata["sources"]["unknown"]["status"] == "disabled"
+
+
+@pytest.mark.asyncio
+async def test_sequential_mode_matches_concurrent() -> None:
+    """Sequential mode still returns the same results as the fan-out."""
+    with patch.object(search_service, "_query_source", fake_query_source({})):
+        concurrent = await get_results_with_fallback("q", ["ads", "webOfScience"], ["title"])
+        sequential = await get_results_with_fallback(
+            "q", ["ads", "webOfScience"], ["title"], concurrent=False
+        )
+
+    assert list(concurrent) == list(sequential) == ["ads", "webOfScience"]
+
+
+@pytest.mark.asyncio
+async def test_fresh_cache_entry_skips_upstream() -> None:
+    """A fresh cache entry is served without querying the source."""
+    cached = make_results("ads", 10)
+    calls = []
+
+    async def _fail(*args, **kwargs):
+        calls.append(args)
+        return []
+
+    with patch.object(search_service, "lookup_cache", return_value=(cached, "hit")), \
+            patch.object(search_service, "_query_source", _fail):
+        results, metadata = await get_results_with_metadata("q", ["ads"], ["title"])
+
+    assert results["ads"] == cached
+    assert calls == []
+    assert metadata["sources"]["ads"]["cache"] == "hit"
+    assert metadata["cache"] == {"hit": 1}
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_served_when_refresh_fails() -> None:
+    """Expired entries are refreshed, but served if the refresh fails."""
+    stale = make_results("ads", 10)
+    with patch.object(search_service, "lookup_cache", return_value=(stale, "stale")), \
+            patch.object(search_service, "_query_source", fake_query_source({}, {"ads": 0})):
+        results, metadata = await get_results_with_metadata("q", ["ads"], ["title"], attempts=1)
+
+    assert results["ads"] == stale
+    assert metadata["sources"]["ads"]["cache"] == "stale"
+    assert metadata["sources"]["ads"]["served_stale"] is True
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_are_coalesced() -> None:
+    """Identical in-flight requests share a single upstream call."""
+    calls = []
+
+    async def _slow(source, *args, **kwargs):
+        calls.append(source)
+        await asyncio.sleep(0.1)
+        return make_results(source, 10)
+
+    with patch.object(search_service, "_query_source", _slow):
+        (first, first_meta), (second, second_meta) = await asyncio.gather(
+            get_results_with_metadata("q", ["ads"], ["title"]),
+            get_results_with_metadata("q", ["ads"], ["title"]),
+        )
+
+    assert calls == ["ads"]
+    assert first["ads"] == second["ads"]
+    assert second_meta["sources"]["ads"].get("coalesced") is True
+    assert second_meta["sources"]["ads"]["status"] == "ok"
+
+
+@pytest.mark.asyncio
+async def test_interactive_request_does_not_join_batch_fetch() -> None:
+    """An interactive request makes its own call instead of waiting on a batch-lane fetch."""
+    calls = []
+
+    async def _slow(source, *args, **kwargs):
+        calls.append(source)
+        await asyncio.sleep(0.1)
+        return make_results(source, 10)
+
+    async def batch_request():
+        with traffic_lane(BATCH):
+            return await get_results_with_metadata("q", ["ads"], ["title"])
+
+    with patch.object(search_service, "_query_source", _slow):
+        _, (_, interactive_meta) = await asyncio.gather(
+            batch_request(),
+            get_results_with_metadata("q", ["ads"], ["title"]),
+        )
+
+    assert calls == ["ads", "ads"]
+    assert "coalesced" not in interactive_meta["sources"]["ads"]
+
+
+def test_compare_results_overlap_matches_by_doi_then_title() -> None:
+    """Overlap counts DOI matches once and adds title-only matches."""
+    ads = [
+        SearchResult(title="Dark Matter Halos", author=[], doi="10.1/A", source="ads", rank=1),
+        SearchResult(title="Galaxy  Rotation", author=[], source="ads", rank=2),
+        SearchResult(title="Only In ADS", author=[], doi="10.1/x", source="ads", rank=3),
+    ]
+    scholar = [
+        {"title": ["dark matter halos"], "doi": "https://doi.org/10.1/a", "rank": 1},
+        {"title": "galaxy rotation", "doi": None, "rank": 5},
+        {"title": "Only In Scholar", "doi": None, "rank": 3},
+    ]
+
+    comparison = search_service.compare_results({"ads": ads, "scholar": scholar}, [], ["title"])
+    overlap = comparison["overlap"]["ads_vs_scholar"]
+
+    assert overlap["overlap"] == 2
+    assert overlap["source1_only"] == 1
+    assert overlap["source2_only"] == 1
+    assert overlap["matching_dois"] == ["10.1/a"]
+    assert overlap["matching_titles"] == ["galaxy rotation"]
+    assert overlap["unique_title_matches"] == ["galaxy rotation"]
+    assert overlap["same_rank_count"] == 1
+    assert overlap["same_rank_matches"][0]["doi"] == "10.1/a"
+
+
+def test_source_features_are_normalized_once() -> None:
+    """Feature records unify dict/SearchResult access and cache per-field values."""
+    features = search_service.SourceFeatures([
+        SearchResult(title="Dark Matter", author=["Doe, J.", "Roe, R."], doi="10.1/A", source="ads", rank=1),
+        {"title": ["Galaxy Rotation "], "author": "Doe, J.", "rank": 2},
+    ])
+
+    assert features.ranked_ids == ["doi:10.1/a", "title:galaxy rotation"]
+    assert features.match_ids == {"doi:10.1/a", "title:dark matter", "title:galaxy rotation"}
+    assert features.ranks == [1, 2]
+    assert features.field_values("author") == {"doe, j.", "roe, r."}
+    assert features.field_values("author") is features.field_values("author")